@@ -22,12 +22,14 @@
 """
 
 import bisect
+import heapq
 import keyword
 import sys
 import typing as t
 from dataclasses import asdict, dataclass, field
 
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
 from django.utils.functional import Promise
 
 VERSION = (1, 7, 1)
@@ -57,6 +59,8 @@
 
 ROUTINE_SETTING = "DJANGO_ROUTINES"
 
+LAZY_SETTING = "DJANGO_ROUTINES_LAZY"
+
 
 R = t.TypeVar("R")
 CommandTypes = t.Union[t.Type["ManagementCommand"], t.Type["SystemCommand"]]
@@ -94,7 +98,7 @@
 :type options: typing.Dict[str, typing.Any]
 """
 
-FinalizeCallback = t.Union[str, t.Callable[["Routine", t.List[t.Any]], None]]
+FinalizeCallback = t.Union[str, t.Callable[["Routine", t.Iterable[t.Any]], None]]
 """
 A callable or import string to a callable that will be run just after the routine's
 last command is run. 
@@ -107,8 +111,11 @@
 :param routine: An instance of the running routine command.
 :type routine:
     :class:`RoutineCommand <django_routines.management.commands.routine.Command>`
-:param results: The results of the commands that were run in the routine.
-:type results: list
+:param results: The results of the commands that were run in the routine. This is a
+    list unless the routine's :attr:`~django_routines.Routine.retain` policy keeps the
+    last few results (a :class:`~collections.deque`) or spills them to disk (a lazy
+    iterable).
+:type results: typing.Iterable
 """
 
 Hook = t.Callable[
@@ -227,6 +234,58 @@ class _RoutineCommand:
     May be the callable function or an import string to the callable function.
     """
 
+    label: t.Optional[str] = None
+    """
+    An optional name other commands may use to declare that they must run
+    :attr:`after` this command. Commands may also be referred to by their command name.
+    """
+
+    after: t.Optional[t.Sequence[str]] = None
+    """
+    The labels or command names of the commands that must finish before this command
+    may start when the routine is run with more than one :attr:`~Routine.jobs`. Only
+    commands that are ordered before this command are considered. The default (None)
+    waits for all preceding commands to finish, an empty sequence allows the command
+    to start right away.
+    """
+
+    inputs: t.Sequence[str] = ()
+    """
+    Glob patterns (``**`` matches any number of directories) of the files the command
+    reads. If the command declares any inputs, a content hash of the inputs is stored
+    after it succeeds and the command is skipped on later runs for as long as the
+    hash does not change. Requires :setting:`DJANGO_ROUTINES_CACHE_DIR`, routines can
+    be forced to run all commands with ``--force``.
+    """
+
+    input_settings: t.Sequence[str] = ()
+    """
+    The names of the settings the command depends on, see :attr:`inputs`.
+    """
+
+    input_env: t.Sequence[str] = ()
+    """
+    The names of the environment variables the command depends on, see :attr:`inputs`.
+    """
+
+    outputs: t.Sequence[str] = ()
+    """
+    The files or directories the command writes. If the command also declares
+    :attr:`inputs`, its outputs are stored in the :setting:`DJANGO_ROUTINES_ARTIFACT_DIR`
+    after it succeeds and are restored from there instead of running the command when
+    its inputs have not changed. See :mod:`django_routines.artifacts`.
+    """
+
+    timeout: t.Optional[float] = None
+    """
+    The number of seconds the command may run for. A command that runs longer is
+    stopped and fails with :exc:`~django_routines.exceptions.CommandTimeout`.
+    Subprocesses are terminated and management commands run in process are
+    interrupted, see :mod:`django_routines.timeouts`. Management commands run in
+    process with more than one job are not interrupted, they fail once they finish.
+    Hooks do not count toward the timeout.
+    """
+
     result: t.Any = None
     """
     The result of the command run. This will either be the value returned by
@@ -239,6 +298,13 @@ class _RoutineCommand:
 
     def __post_init__(self):
         self.switches = tuple([to_symbol(switch) for switch in self.switches])
+        if self.after is not None:
+            self.after = (
+                (self.after,) if isinstance(self.after, str) else tuple(self.after)
+            )
+        for attr in ("inputs", "input_settings", "input_env", "outputs"):
+            value = getattr(self, attr)
+            setattr(self, attr, (value,) if isinstance(value, str) else tuple(value))
         assert self.command, f"`{self.kind}` must be set for {self.__class__.__name__}."
 
     @property
@@ -336,17 +402,104 @@ def system(self) -> t.Union[str, t.Tuple[str, ...]]:
     kind: t.ClassVar[str] = "system"
 
 
-def _insort_right_with_key(a: t.List[R], x: R, key: t.Callable[[R], t.Any]) -> None:
+def _priority(command: t.Union[Command, t.Dict[str, t.Any]]) -> int:
+    """
+    Get the priority of a command object or its dictionary representation.
+    """
+    if isinstance(command, dict):
+        return command.get("priority", 0) or 0
+    return command.priority or 0
+
+
+def _modifies(method: t.Callable[..., t.Any]) -> t.Callable[..., t.Any]:
+    def modify(self: "_CommandList", *args, **kwargs):
+        self._keys = None
+        self._version += 1
+        return method(self, *args, **kwargs)
+
+    return modify
+
+
+class _CommandList(list):
+    """
+    A list of commands (or their dictionary representations) that is kept in priority
+    order as commands are inserted. The priorities are tracked alongside the list so
+    each insertion is a binary search instead of a rebuild of the routine. Any other
+    modification of the list discards the priorities and the list is sorted again on
+    the next insertion. Every modification bumps the list's version so indexes built
+    from it can tell they are stale.
     """
-    A function that implements bisect.insort_right with a key callable on items.
 
-    todo: remove this and replace with key argument to bisect.insort_right when support
-    for python <3.10 dropped.
+    def __init__(self, commands: t.Iterable[t.Any] = ()):
+        super().__init__(sorted(commands, key=_priority))
+        self._keys: t.Optional[t.List[int]] = [_priority(cmd) for cmd in self]
+        self._version = 0
+
+    __setitem__ = _modifies(list.__setitem__)
+    __delitem__ = _modifies(list.__delitem__)
+    __iadd__ = _modifies(list.__iadd__)
+    __imul__ = _modifies(list.__imul__)
+    append = _modifies(list.append)
+    extend = _modifies(list.extend)
+    insert = _modifies(list.insert)
+    remove = _modifies(list.remove)
+    pop = _modifies(list.pop)
+    clear = _modifies(list.clear)
+    sort = _modifies(list.sort)
+    reverse = _modifies(list.reverse)
+
+    def insort(self, command: t.Any) -> None:
+        if self._keys is None:
+            # the list was modified directly, resort it
+            list.sort(self, key=_priority)
+            self._keys = [_priority(cmd) for cmd in self]
+        self._version += 1
+        key = _priority(command)
+        idx = bisect.bisect_right(self._keys, key)
+        self._keys.insert(idx, key)
+        list.insert(self, idx, command)
+
+
+class _PlanIndex:
     """
-    transformed_list = [key(item) for item in a]
-    transformed_x = key(x)
-    insert_point = bisect.bisect_right(transformed_list, transformed_x)
-    a.insert(insert_point, x)
+    An inverted index of the positions of a routine's commands by switch. The plan for
+    a set of active switches is a merge of the precomputed position lists and is
+    memoized per set of switches. Only indexes of :class:`_CommandList` command lists
+    are kept, they are rebuilt when the list is replaced or modified.
+    """
+
+    __slots__ = ("always", "commands", "plans", "switched", "version")
+
+    def __init__(self, commands: t.List[Command]):
+        self.commands = commands
+        self.version = getattr(commands, "_version", None)
+        self.always: t.List[int] = []
+        self.switched: t.Dict[str, t.List[int]] = {}
+        self.plans: t.Dict[t.FrozenSet[str], t.List[Command]] = {}
+        for idx, command in enumerate(commands):
+            for switch in command.switches:
+                self.switched.setdefault(switch, []).append(idx)
+            if not command.switches:
+                self.always.append(idx)
+
+    def current(self, commands: t.List[Command]) -> bool:
+        return self.commands is commands and self.version == commands._version
+
+    def plan(self, switches: t.Iterable[str]) -> t.List[Command]:
+        active = frozenset(switches).intersection(self.switched)
+        plan = self.plans.get(active)
+        if plan is None:
+            plan = []
+            last = -1
+            for idx in heapq.merge(
+                self.always, *(self.switched[switch] for switch in active)
+            ):
+                # commands with more than one active switch appear more than once
+                if idx != last:
+                    plan.append(self.commands[idx])
+                    last = idx
+            self.plans[active] = plan
+        return plan
 
 
 @dataclass
@@ -382,6 +535,23 @@ class Routine:
     If true run each of the commands in a subprocess.
     """
 
+    fork: bool = False
+    """
+    If true, management commands that run in a subprocess are run in a child forked
+    from the routine process instead of a fresh ``manage.py`` invocation. The child
+    inherits the loaded Django project which avoids paying interpreter and Django
+    startup costs for each command. Only available on platforms that support
+    :func:`os.fork` and only used when commands are run one at a time.
+    """
+
+    batch: bool = False
+    """
+    If true, runs of adjacent management commands that do not have hooks are run
+    together in a single subprocess instead of one subprocess each, so Django is only
+    set up once for each batch. Only used when commands are run one at a time as
+    subprocesses that are not forked.
+    """
+
     atomic: bool = False
     """
     Run all commands in the same transaction.
@@ -392,6 +562,53 @@ class Routine:
     Keep going if a command fails.
     """
 
+    jobs: int = 1
+    """
+    The maximum number of commands to run concurrently. Commands are started on a pool
+    of worker threads as soon as the commands they are declared to run
+    :attr:`~django_routines.ManagementCommand.after` have finished.
+    """
+
+    retain: t.Union[str, int] = "all"
+    """
+    Which command results to keep for the :attr:`finalize` callback: ``all``, only
+    the return ``codes`` of subprocesses, ``spill`` results to a temporary file as
+    they are produced or a number of most recent results to keep. With any policy
+    other than ``all`` a command's result is only available on the command to its
+    post hook. See :mod:`django_routines.retention`.
+    """
+
+    log_dir: t.Optional[str] = None
+    """
+    If set, the stdout and stderr of each command run as a subprocess are written to
+    log files in this directory instead of the terminal, as they are produced. The
+    files are named after the command's plan index and label or command name and
+    are overwritten on each run. The output is still written to the terminal at
+    verbosity levels above one. Management commands are not batched or forked when
+    their output is logged.
+    """
+
+    log_max_bytes: t.Optional[int] = None
+    """
+    The size at which each log file is rotated. A few rotated files are kept, see
+    :data:`django_routines.logs.BACKUPS`. By default log files are not rotated.
+    """
+
+    log_tail: int = 0
+    """
+    The number of last lines of each logged stream to keep in memory and attach to
+    the result of the command as its ``stdout`` and ``stderr``, for failure reports.
+    """
+
+    time_budget: t.Optional[float] = None
+    """
+    The number of seconds the whole routine may run for. No command may run past the
+    end of the budget, a command that would is stopped and fails with
+    :exc:`~django_routines.exceptions.CommandTimeout` as do any commands that have not
+    started. Unlike the failure of a single command, running out of time stops the
+    routine even if it continues on errors.
+    """
+
     initialize: t.Optional[InitializeCallback] = None
     """
     A function to run before the routine is run.
@@ -436,39 +653,33 @@ def __post_init__(self):
     def __len__(self):
         return len(self.commands)
 
+    def _index(self) -> _PlanIndex:
+        if not isinstance(self.commands, _CommandList):
+            # plain lists may be modified without notice, so they are not memoized
+            return _PlanIndex(self.commands)
+        index: t.Optional[_PlanIndex] = self.__dict__.get("_plan_index")
+        if index is None or not index.current(self.commands):
+            index = self.__dict__["_plan_index"] = _PlanIndex(self.commands)
+        return index
+
     @property
     def switches(self) -> t.List[str]:
-        switches: t.Set[str] = set()
-        for command in self.commands:
-            if command.switches:
-                switches.update(command.switches)
-        return sorted(switches)
-
-    def plan(self, switches: t.Set[str]) -> t.List[Command]:
-        def set_hooks(
-            command: Command,
-            pre_hook: t.Optional[PreHook],
-            post_hook: t.Optional[PostHook],
-        ) -> Command:
-            if pre_hook and not command.pre_hook:
-                command.pre_hook = pre_hook
-            if post_hook and not command.post_hook:
-                command.post_hook = post_hook
-            return command
-
-        return [
-            set_hooks(command, self.pre_hook, self.post_hook)
-            for command in self.commands
-            if not command.switches
-            or any(switch in switches for switch in command.switches)
-        ]
+        return sorted(self._index().switched)
+
+    def plan(self, switches: t.Iterable[str]) -> t.List[Command]:
+        """
+        The commands that will be run given the active switches, in order. The
+        commands are not modified, the routine's hooks are applied to the copies made
+        for each run.
+
+        Plans are memoized for routines loaded from settings, if a command's switches
+        are changed in place after the routine has been planned the command list must be
+        modified or replaced.
+        """
+        return list(self._index().plan(switches))
 
     def add(self, command: Command):
-        # python >= 3.10
-        # bisect.insort(self.commands, command, key=lambda cmd: cmd.priority)
-        _insort_right_with_key(
-            self.commands, command, key=lambda cmd: cmd.priority or 0
-        )
+        bisect.insort_right(self.commands, command, key=_priority)
         return command
 
     @classmethod
@@ -478,13 +689,10 @@ def from_dict(cls, obj: t.Union["Routine", t.Dict[str, t.Any]]) -> "Routine":
         """
         if isinstance(obj, Routine):
             return obj
-        commands: t.List[Command] = []
-        for cmd in obj.get("commands", []):
-            _insort_right_with_key(
-                commands,
-                _RoutineCommand.from_dict(cmd),
-                key=lambda cmd: cmd.priority or 0,
-            )
+        # sorting is stable so priority ties are kept in insertion order
+        commands: t.List[Command] = _CommandList(
+            _RoutineCommand.from_dict(cmd) for cmd in obj.get("commands", [])
+        )
         return Routine(
             **{attr: val for attr, val in obj.items() if attr != "commands"},
             commands=commands,
@@ -497,8 +705,16 @@ def to_dict(self) -> t.Dict[str, t.Any]:
             "commands": [cmd.to_dict() for cmd in self.commands],
             "switch_helps": self.switch_helps,
             "subprocess": self.subprocess,
+            "fork": self.fork,
+            "batch": self.batch,
             "atomic": self.atomic,
             "continue_on_error": self.continue_on_error,
+            "jobs": self.jobs,
+            "retain": self.retain,
+            "log_dir": self.log_dir,
+            "log_max_bytes": self.log_max_bytes,
+            "log_tail": self.log_tail,
+            "time_budget": self.time_budget,
             "initialize": self.initialize,
             "finalize": self.finalize,
             "pre_hook": self.pre_hook,
@@ -511,8 +727,16 @@ def routine(
     help_text: t.Union[str, Promise] = "",
     *commands: Command,
     subprocess: bool = False,
+    fork: bool = False,
+    batch: bool = False,
     atomic: bool = False,
     continue_on_error: bool = False,
+    jobs: int = 1,
+    retain: t.Union[str, int] = "all",
+    log_dir: t.Optional[str] = None,
+    log_max_bytes: t.Optional[int] = None,
+    log_tail: int = 0,
+    time_budget: t.Optional[float] = None,
     initialize: t.Optional[InitializeCallback] = None,
     finalize: t.Optional[FinalizeCallback] = None,
     pre_hook: t.Optional[PreHook] = None,
@@ -526,8 +750,17 @@ def routine(
     :param help_text: The help text to display for the routine by the routines command.
     :param commands: The commands to run in the routine.
     :param subprocess: If true run each of the commands in a subprocess.
+    :param fork: If true fork management command subprocesses from the routine process.
+    :param batch: If true run adjacent management commands in the same subprocess.
     :param atomic: Run all commands in the same transaction.
     :param continue_on_error: Keep going if a command fails.
+    :param jobs: The maximum number of commands to run concurrently.
+    :param retain: Which command results to keep: ``all``, ``codes``, ``spill`` or a
+        number of most recent results.
+    :param log_dir: Write the output of subprocesses to log files in this directory.
+    :param log_max_bytes: The size at which log files are rotated.
+    :param log_tail: The number of last lines of logged output to attach to results.
+    :param time_budget: The number of seconds the whole routine may run for.
     :param initialize: A function to run before the routine is run.
         See :attr:`~django_routines.InitializeCallback`
     :param finalize: A function to run after the routine is run.
@@ -543,58 +776,145 @@ def routine(
     settings = sys._getframe(1).f_globals
     if not settings.get(ROUTINE_SETTING, {}):
         settings[ROUTINE_SETTING] = {}
+    routines = settings[ROUTINE_SETTING]
 
-    existing: t.List[Command] = []
+    existing: t.Iterable[t.Any] = []
     try:
-        routine = get_routine(name, scope=settings)
+        key = _routine_key(name, routines)
+        current = routines[key]
+        if isinstance(current, Routine):
+            current = {**current.to_dict(), "commands": current.commands}
         help_text = (
             help_text
             # don't trigger translation - we're in settings!
             if isinstance(help_text, Promise) or help_text
-            else routine.help_text
+            else current.get("help_text", "")
         )
-        switch_helps = {**routine.switch_helps, **switch_helps}
-        existing = routine.commands
+        switch_helps = {**current.get("switch_helps", {}), **switch_helps}
+        existing = current.get("commands", [])
     except KeyError:
-        pass
+        key = to_symbol(name)
     routine = Routine(
         name,
         help_text=help_text,
-        commands=existing,
         switch_helps=switch_helps,
         subprocess=subprocess,
+        fork=fork,
+        batch=batch,
         atomic=atomic,
         continue_on_error=continue_on_error,
+        jobs=jobs,
+        retain=retain,
+        log_dir=log_dir,
+        log_max_bytes=log_max_bytes,
+        log_tail=log_tail,
+        time_budget=time_budget,
         initialize=initialize,
         finalize=finalize,
         pre_hook=pre_hook,
         post_hook=post_hook,
+    ).to_dict()
+    routine["commands"] = (
+        existing if isinstance(existing, _CommandList) else _CommandList(existing)
     )
-
     for command in commands:
-        routine.add(command)
+        routine["commands"].insort(command.to_dict())
 
-    settings[ROUTINE_SETTING][routine.name] = routine.to_dict()
+    new = key not in routines
+    routines[key] = routine
+    if new:
+        _name_index(routines).add(key)
+
+
+class _NameIndex:
+    """
+    The keys of a routines dictionary indexed by their lower case symbolized names, so
+    routines may be looked up by name in constant time. Keys added with :meth:`add` are
+    indexed as they are added. The index is rebuilt if the dictionary's keys were
+    changed by other means, which is detected by its length and last key.
+    """
+
+    __slots__ = ("keys", "routines", "state")
+
+    def __init__(self, routines: t.Dict[str, t.Any]):
+        self.routines = routines
+        self.rebuild()
+
+    def _state(self) -> t.Tuple[int, t.Optional[str]]:
+        return len(self.routines), next(reversed(self.routines), None)
+
+    def rebuild(self) -> None:
+        self.keys: t.Dict[str, str] = {}
+        for key in self.routines:
+            self.keys.setdefault(to_symbol(key).lower(), key)
+        self.state = self._state()
+
+    def add(self, key: str) -> None:
+        """
+        Index a key that was just added to the routines.
+        """
+        if self.state[0] != len(self.routines) - 1:
+            self.rebuild()
+            return
+        self.keys.setdefault(to_symbol(key).lower(), key)
+        self.state = self._state()
+
+    def key(self, routine_name: str, refresh: bool = False) -> str:
+        """
+        :param refresh: Rebuild the index if the name is not found, even if the keys
+            do not appear to have changed.
+        :raises: :exc:`KeyError` if no routine matches the name.
+        """
+        symbolized = to_symbol(routine_name)
+        if symbolized in self.routines:
+            return symbolized
+        key = self.keys.get(symbolized.lower())
+        if key is None or key not in self.routines:
+            if not refresh and self.state == self._state() and key is None:
+                raise KeyError(symbolized)
+            self.rebuild()
+            key = self.keys.get(symbolized.lower())
+            if key is None:
+                raise KeyError(symbolized)
+        return key
+
+
+# the name indexes of routines dictionaries by their identity
+_name_indexes: t.Dict[int, _NameIndex] = {}
+
+
+def _name_index(routines: t.Dict[str, t.Any]) -> _NameIndex:
+    index = _name_indexes.get(id(routines))
+    if index is None or index.routines is not routines:
+        index = _name_indexes[id(routines)] = _NameIndex(routines)
+    return index
+
+
+def _routine_key(
+    routine_name: str, routines: t.Dict[str, t.Any], refresh: bool = False
+) -> str:
+    """
+    Get the key in the routines dictionary for the given routine name. Routine names
+    may undergo some normalization, we account for that here.
+
+    :param refresh: Rebuild the name index if the routine is not found.
+    :raises: :exc:`KeyError` if no routine matches the name.
+    """
+    return _name_index(routines).key(routine_name, refresh=refresh)
 
 
 def _get_routine(
-    routine_name: str, routines: t.Dict[str, t.Any]
+    routine_name: str,
+    routines: t.Dict[str, t.Any],
+    key: t.Optional[str] = None,
 ) -> t.Union[t.Dict[str, t.Any], Routine]:
     """
     Routine may undergo some normalization, we account for that here when trying
     to fetch them.
+
+    :param key: The key of the routine in the routines dictionary if it is known.
     """
-    routine = None
-    symbolized = to_symbol(routine_name)
-    try:
-        routine = routines[symbolized]
-    except KeyError:
-        for name, rt in routines.items():
-            if to_symbol(name).lower() == symbolized.lower():
-                routine = rt
-                break
-        if not routine:
-            raise
+    routine = routines[key or _routine_key(routine_name, routines)]
     if isinstance(routine, Routine):
         return routine
 
@@ -611,27 +931,47 @@ def _add_command(
     switches: t.Optional[t.Sequence[str]] = _RoutineCommand.switches,
     pre_hook: t.Optional[PreHook] = None,
     post_hook: t.Optional[PostHook] = None,
+    label: t.Optional[str] = None,
+    after: t.Optional[t.Sequence[str]] = None,
+    inputs: t.Sequence[str] = (),
+    input_settings: t.Sequence[str] = (),
+    input_env: t.Sequence[str] = (),
+    outputs: t.Sequence[str] = (),
+    timeout: t.Optional[float] = None,
     **options,
 ):
     settings = sys._getframe(2).f_globals
     settings[ROUTINE_SETTING] = settings.get(ROUTINE_SETTING, {}) or {}
-    routine_dict = settings[ROUTINE_SETTING]
-    try:
-        routine_obj = Routine.from_dict(_get_routine(routine, routine_dict))
-    except KeyError:
-        routine_obj = Routine(routine, "", [])
+    routines = settings[ROUTINE_SETTING]
     extra = {"options": options} if command_type is ManagementCommand else {}
-    new_cmd = routine_obj.add(
-        command_type(
-            t.cast(t.Tuple[str], command),
-            priority,
-            tuple(switches or []),
-            pre_hook=pre_hook,
-            post_hook=post_hook,
-            **extra,
-        )
+    new_cmd = command_type(
+        t.cast(t.Tuple[str], command),
+        priority,
+        tuple(switches or []),
+        pre_hook=pre_hook,
+        post_hook=post_hook,
+        label=label,
+        after=after,
+        inputs=inputs,
+        input_settings=input_settings,
+        input_env=input_env,
+        outputs=outputs,
+        timeout=timeout,
+        **extra,
     )
-    routine_dict[routine] = routine_obj.to_dict()
+    try:
+        key = _routine_key(routine, routines)
+    except KeyError:
+        key = routine
+        routines[key] = Routine(routine, "", []).to_dict()
+        _name_index(routines).add(key)
+    if isinstance(routines[key], Routine):
+        routines[key].add(new_cmd)
+    else:
+        commands = routines[key].get("commands", [])
+        if not isinstance(commands, _CommandList):
+            commands = routines[key]["commands"] = _CommandList(commands)
+        commands.insort(new_cmd.to_dict())
     return new_cmd
 
 
@@ -642,6 +982,13 @@ def command(
     switches: t.Optional[t.Sequence[str]] = RoutineCommand.switches,
     pre_hook: t.Optional[PreHook] = None,
     post_hook: t.Optional[PostHook] = None,
+    label: t.Optional[str] = None,
+    after: t.Optional[t.Sequence[str]] = None,
+    inputs: t.Sequence[str] = (),
+    input_settings: t.Sequence[str] = (),
+    input_env: t.Sequence[str] = (),
+    outputs: t.Sequence[str] = (),
+    timeout: t.Optional[float] = None,
     **options,
 ):
     """
@@ -663,6 +1010,17 @@ def command(
     :param pre_hook: A function to run before the command is run. See :attr:`~django_routines.PreHook`
     :param post_hook: A function to run after the command has been run. See
         :attr:`PostHook`
+    :param label: A name other commands may refer to in their ``after`` declarations.
+    :param after: The labels or command names of the commands that must finish before
+        this command may start when the routine runs more than one job.
+    :param inputs: Glob patterns of the files the command reads. The command is
+        skipped when its inputs have not changed since it last succeeded.
+    :param input_settings: The names of the settings the command depends on.
+    :param input_env: The names of the environment variables the command depends on.
+    :param outputs: The files or directories the command writes. They are restored
+        from the artifact cache instead of running the command when its inputs have
+        not changed.
+    :param timeout: The number of seconds the command may run for.
     :raises: :exc:`~django.core.exceptions.ImproperlyConfigured` if the
         :setting:`DJANGO_ROUTINES` settings variable is not valid.
     :return: The new command.
@@ -675,6 +1033,13 @@ def command(
         switches=switches,
         pre_hook=pre_hook,
         post_hook=post_hook,
+        label=label,
+        after=after,
+        inputs=inputs,
+        input_settings=input_settings,
+        input_env=input_env,
+        outputs=outputs,
+        timeout=timeout,
         **options,
     )
 
@@ -686,6 +1051,13 @@ def system(
     switches: t.Optional[t.Sequence[str]] = _RoutineCommand.switches,
     pre_hook: t.Optional[PreHook] = None,
     post_hook: t.Optional[PostHook] = None,
+    label: t.Optional[str] = None,
+    after: t.Optional[t.Sequence[str]] = None,
+    inputs: t.Sequence[str] = (),
+    input_settings: t.Sequence[str] = (),
+    input_env: t.Sequence[str] = (),
+    outputs: t.Sequence[str] = (),
+    timeout: t.Optional[float] = None,
 ):
     """
     Add a system command to the named routine in settings to be run.
@@ -704,6 +1076,17 @@ def system(
     :param pre_hook: A function to run before the command is run. See :attr:`~django_routines.PreHook`
     :param post_hook: A function to run after the command has been run. See
         :attr:`PostHook`
+    :param label: A name other commands may refer to in their ``after`` declarations.
+    :param after: The labels or command names of the commands that must finish before
+        this command may start when the routine runs more than one job.
+    :param inputs: Glob patterns of the files the command reads. The command is
+        skipped when its inputs have not changed since it last succeeded.
+    :param input_settings: The names of the settings the command depends on.
+    :param input_env: The names of the environment variables the command depends on.
+    :param outputs: The files or directories the command writes. They are restored
+        from the artifact cache instead of running the command when its inputs have
+        not changed.
+    :param timeout: The number of seconds the command may run for.
     :raises: :exc:`~django.core.exceptions.ImproperlyConfigured` if the
         :setting:`DJANGO_ROUTINES` settings variable is not valid.
     :return: The new command.
@@ -716,9 +1099,52 @@ def system(
         switches=switches,
         pre_hook=pre_hook,
         post_hook=post_hook,
+        label=label,
+        after=after,
+        inputs=inputs,
+        input_settings=input_settings,
+        input_env=input_env,
+        outputs=outputs,
+        timeout=timeout,
     )
 
 
+# The Routine objects that have been built from the DJANGO_ROUTINES setting by their
+# keys in the setting, along with the values they were built from. These are discarded
+# when the setting changes.
+_indexed: t.Optional[t.Dict[str, t.Any]] = None
+_memo: t.Dict[str, t.Tuple[t.Any, Routine]] = {}
+
+
+def _reset_index(setting: str = ROUTINE_SETTING, **_) -> None:
+    global _indexed
+    if setting == ROUTINE_SETTING:
+        _indexed = None
+        _memo.clear()
+
+
+setting_changed.connect(_reset_index, dispatch_uid="django_routines_reset_index")
+
+
+def _configured_routine(name: str, routines: t.Dict[str, t.Any]) -> Routine:
+    """
+    Get the named routine from the configured :setting:`DJANGO_ROUTINES` setting
+    using the index and memo.
+    """
+    global _indexed
+    if routines is not _indexed:
+        _reset_index()
+        _indexed = routines
+    key = _routine_key(name, routines, refresh=True)
+    value = routines[key]
+    memoized = _memo.get(key)
+    if memoized and memoized[0] is value:
+        return memoized[1]
+    routine = Routine.from_dict(_get_routine(key, routines, key))
+    _memo[key] = (value, routine)
+    return routine
+
+
 def get_routine(name: str, scope=None) -> Routine:
     """
     Get the routine by name.
@@ -728,6 +1154,11 @@ def get_routine(name: str, scope=None) -> Routine:
         If called before settings have been configured, this function must be called
         from settings.
 
+    .. note::
+
+        Routines fetched from configured settings are cached until the
+        :setting:`DJANGO_ROUTINES` setting changes and should be treated as read-only.
+
     :param name: The name of the routine to get.
     :return: The routine.
     :raises: :exc:`KeyError` if the routine does not exist, or routines have not been
@@ -744,9 +1175,7 @@ def get_routine(name: str, scope=None) -> Routine:
                     name, (scope or sys._getframe(1).f_globals).get(ROUTINE_SETTING, {})
                 )
             )
-        return Routine.from_dict(
-            _get_routine(name, getattr(settings, ROUTINE_SETTING, {}))
-        )
+        return _configured_routine(name, getattr(settings, ROUTINE_SETTING, {}) or {})
     except TypeError as err:
         raise ImproperlyConfigured(
             f"{ROUTINE_SETTING} routine {name} is malformed."
@@ -763,15 +1192,18 @@ def routines(scope=None) -> t.Generator[Routine, None, None]:
     """
     from django.conf import settings
 
+    configured = not scope and settings.configured
     routines = (
-        (scope or sys._getframe(1).f_globals).get(ROUTINE_SETTING, {})
-        if scope or not settings.configured
-        else getattr(settings, ROUTINE_SETTING, {})
+        getattr(settings, ROUTINE_SETTING, {})
+        if configured
+        else (scope or sys._getframe(1).f_globals).get(ROUTINE_SETTING, {})
     ) or {}
     for name, routine in routines.items():
         try:
             if isinstance(routine, Routine):
                 yield routine
+            elif configured:
+                yield _configured_routine(name, routines)
             else:
                 yield Routine.from_dict(
                     {
@@ -0,0 +1,320 @@
+"""
+A content addressed store of the :attr:`~django_routines.RoutineCommand.outputs` of
+commands, keyed on the :func:`~django_routines.inputs.digest` of their inputs. See
+:setting:`DJANGO_ROUTINES_ARTIFACT_DIR`.
+
+The store is laid out as:
+
+* ``objects/<sha256[:2]>/<sha256[2:]>`` - the contents of every stored file, keyed by
+  their hash so identical files are only stored once.
+* ``manifests/<key>.json`` - the files each command produced and the hashes of their
+  contents, keyed on the command and the digest of its inputs.
+
+Entries are written to temporary files and moved into place so the store may be shared
+between hosts, for example on a mounted volume. Objects are made read only and their
+hashes are verified when they are restored, a corrupted object is removed from the store.
+Manifests decide where restored files are written, so like the rest of the cache they
+are only read if they and the store are owned by the current user and are not writable
+by anyone else, and only the declared outputs of the command are restored from them.
+Like the rest of the cache the store is strictly an optimization - any failure to store
+or restore outputs is treated as a miss and the command is run.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import typing as t
+from pathlib import Path
+
+from django_routines import Command, cache
+from django_routines.inputs import CHUNK_SIZE
+
+ARTIFACT_DIR_SETTING = "DJANGO_ROUTINES_ARTIFACT_DIR"
+ARTIFACT_LINKS_SETTING = "DJANGO_ROUTINES_ARTIFACT_LINKS"
+
+READ_ONLY = 0o444
+"""
+The mode of the objects in the store.
+"""
+
+Manifest = t.Dict[str, t.List[t.Tuple[str, str]]]
+"""
+Maps each declared output to the paths of its files relative to the output and the
+hashes of their contents. A file output has a single entry with an empty path.
+"""
+
+_CONTENT = re.compile(r"[0-9a-f]{64}")
+
+
+def artifact_dir() -> t.Optional[Path]:
+    """
+    Get the configured artifact directory, if any. Defaults to an ``artifacts``
+    directory in the :setting:`DJANGO_ROUTINES_CACHE_DIR`.
+
+    :return: The artifact directory path or None if artifacts are not cached.
+    """
+    from django.conf import settings
+
+    directory = getattr(settings, ARTIFACT_DIR_SETTING, None)
+    if directory:
+        return Path(directory)
+    directory = cache.cache_dir()
+    return directory / "artifacts" if directory else None
+
+
+def links() -> bool:
+    """
+    :return: True if outputs should be hard linked from the store instead of copied,
+        see :setting:`DJANGO_ROUTINES_ARTIFACT_LINKS`.
+    """
+    from django.conf import settings
+
+    return bool(getattr(settings, ARTIFACT_LINKS_SETTING, False))
+
+
+def key(command: Command, digest: str) -> str:
+    """
+    :param digest: The :func:`~django_routines.inputs.digest` of the command's inputs.
+    :return: The key of the command's outputs for the given inputs. Keys do not depend
+        on the routine so commands shared between routines share their artifacts.
+    """
+    return cache.fingerprint(
+        command.kind,
+        command.command,
+        getattr(command, "options", None),
+        command.outputs,
+        digest,
+    )
+
+
+def _object(directory: Path, content: str) -> Path:
+    return directory / "objects" / content[:2] / content[2:]
+
+
+def _manifest(directory: Path, command: Command, digest: str) -> Path:
+    return directory / "manifests" / f"{key(command, digest)}.json"
+
+
+def _hash(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as src:
+        while chunk := src.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _files(output: Path) -> t.Iterator[t.Tuple[Path, str]]:
+    if output.is_file():
+        yield output, ""
+        return
+    for root, dirs, files in os.walk(output):
+        dirs.sort()
+        for name in sorted(files):
+            path = Path(root) / name
+            yield path, path.relative_to(output).as_posix()
+
+
+def _place(target: Path, write: t.Callable[[Path], t.Any]) -> None:
+    """
+    Write a file next to the target with the given function and move it into place.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+    os.close(fd)
+    try:
+        os.unlink(tmp)
+        write(Path(tmp))
+        os.replace(tmp, target)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class Corrupted(OSError):
+    """
+    Raised when the contents of an object do not match its hash.
+    """
+
+    def __init__(self, path: Path):
+        super().__init__(f"{path} does not match its hash")
+        self.path = path
+
+
+def _store_object(source: Path, target: Path) -> None:
+    shutil.copyfile(source, target)
+    os.chmod(target, READ_ONLY)
+
+
+def _copy(source: Path, target: Path, content: str) -> None:
+    """
+    Copy an object out of the store, verifying its hash as it is copied.
+    """
+    hasher = hashlib.sha256()
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        while chunk := src.read(CHUNK_SIZE):
+            hasher.update(chunk)
+            dst.write(chunk)
+    if hasher.hexdigest() != content:
+        raise Corrupted(source)
+
+
+def _link(source: Path, target: Path, content: str) -> None:
+    """
+    Hard link an object out of the store after verifying its hash, or copy it if it
+    can not be linked.
+    """
+    if _hash(source) != content:
+        raise Corrupted(source)
+    try:
+        os.link(source, target)
+    except OSError:
+        _copy(source, target, content)
+
+
+def store(command: Command, digest: str) -> bool:
+    """
+    Store the outputs of a command that succeeded with the given inputs.
+
+    :param digest: The :func:`~django_routines.inputs.digest` of the command's inputs
+        before it was run.
+    :return: True if the outputs were stored, False if there is no artifact directory
+        or any of the outputs do not exist.
+    """
+    directory = artifact_dir()
+    if not directory:
+        return False
+    manifest: Manifest = {}
+    try:
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        (directory / "manifests").mkdir(mode=0o700, exist_ok=True)
+        for output in command.outputs:
+            if not os.path.exists(output):
+                return False
+            manifest[output] = []
+            for path, relative in _files(Path(output)):
+                content = _hash(path)
+                obj = _object(directory, content)
+                if not obj.is_file():
+                    _place(obj, lambda tmp: _store_object(path, tmp))
+                manifest[output].append((relative, content))
+        _place(
+            _manifest(directory, command, digest),
+            lambda tmp: tmp.write_text(json.dumps(manifest)),
+        )
+    except OSError:
+        return False
+    return True
+
+
+def _valid(command: Command, manifest: t.Any) -> bool:
+    """
+    :return: True if the manifest lists exactly the command's declared outputs, and
+        every entry is a path inside its output and the hash of an object.
+    """
+    if not isinstance(manifest, dict) or set(manifest) != set(command.outputs):
+        return False
+    for entries in manifest.values():
+        if not isinstance(entries, list):
+            return False
+        for entry in entries:
+            if not (
+                isinstance(entry, list)
+                and len(entry) == 2
+                and all(isinstance(part, str) for part in entry)
+            ):
+                return False
+            relative, content = entry
+            path = Path(relative)
+            if path.is_absolute() or path.drive or ".." in path.parts:
+                return False
+            if not _CONTENT.fullmatch(content):
+                return False
+    return True
+
+
+def load(command: Command, digest: str) -> t.Optional[Manifest]:
+    """
+    :param digest: The current :func:`~django_routines.inputs.digest` of the command's
+        inputs.
+    :return: The manifest of the command's stored outputs, or None if they have not
+        been stored for these inputs, any of their files are missing from the store or
+        the manifest can not be trusted.
+    """
+    directory = artifact_dir()
+    if not directory:
+        return None
+    path = _manifest(directory, command, digest)
+    try:
+        if not all(
+            cache._trusted(trusted) for trusted in (directory, path.parent, path)
+        ):
+            return None
+        manifest = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if not _valid(command, manifest):
+        return None
+    for entries in manifest.values():
+        for _, content in entries:
+            if not _object(directory, content).is_file():
+                return None
+    return manifest
+
+
+def restore(command: Command, digest: str) -> bool:
+    """
+    Restore the stored outputs of a command. Files are copied from the store, or hard
+    linked if :setting:`DJANGO_ROUTINES_ARTIFACT_LINKS` is set, and their hashes are
+    verified. An object that does not match its hash is removed from the store and the
+    restore fails. Files in output directories that were not stored are left alone.
+
+    :param digest: The current :func:`~django_routines.inputs.digest` of the command's
+        inputs.
+    :return: True if the outputs were restored, False if they were not stored.
+    """
+    directory = artifact_dir()
+    manifest = load(command, digest)
+    if not directory or manifest is None:
+        return False
+    place = _link if links() else _copy
+    try:
+        for output, entries in manifest.items():
+            if not entries or entries[0][0]:
+                # a directory output
+                Path(output).mkdir(parents=True, exist_ok=True)
+            for relative, content in entries:
+                obj = _object(directory, content)
+                target = Path(output) / relative if relative else Path(output)
+                if target.is_file() and os.path.samefile(obj, target):
+                    continue
+                _place(target, lambda tmp: place(obj, tmp, content))
+    except Corrupted as corrupted:
+        corrupted.path.unlink(missing_ok=True)
+        return False
+    except OSError:
+        return False
+    return True
+
+
+def detach(command: Command) -> None:
+    """
+    Replace the command's output files that are hard linked to the store with writable
+    copies, so that running the command may modify its outputs in place without
+    altering the stored artifacts.
+    """
+    directory = artifact_dir()
+    if not directory:
+        return
+    try:
+        for output in command.outputs:
+            for path, _ in _files(Path(output)):
+                if path.stat().st_nlink < 2:
+                    continue
+                obj = _object(directory, _hash(path))
+                if obj.is_file() and os.path.samefile(obj, path):
+                    _place(path, lambda tmp: shutil.copyfile(obj, tmp))
+    except OSError:
+        pass
@@ -0,0 +1,154 @@
+"""
+Helpers for persisting precomputed artifacts to the :setting:`DJANGO_ROUTINES_CACHE_DIR`.
+
+Artifacts are keyed by a :func:`fingerprint` of the inputs they were computed from so
+stale entries are never loaded. The cache is strictly an optimization - any failure to
+read or write an entry is treated as a miss.
+
+Entries are pickles, and the routine registry contains compiled code, so anyone who can
+write to the cache directory could run code in the processes that read it. Entries are
+only read if they and the cache directory are owned by the current user and are not
+writable by anyone else.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import typing as t
+from contextlib import suppress
+from dataclasses import fields, is_dataclass
+from functools import partial
+from pathlib import Path
+
+from django.utils.functional import Promise
+
+CACHE_DIR_SETTING = "DJANGO_ROUTINES_CACHE_DIR"
+
+logger = logging.getLogger(__name__)
+
+
+def cache_dir() -> t.Optional[Path]:
+    """
+    Get the configured cache directory, if any.
+
+    :return: The cache directory path or None if caching is disabled.
+    """
+    from django.conf import settings
+
+    directory = getattr(settings, CACHE_DIR_SETTING, None)
+    return Path(directory) if directory else None
+
+
+def _update(digest: "hashlib._Hash", obj: t.Any) -> None:
+    digest.update(type(obj).__qualname__.encode())
+    if isinstance(obj, dict):
+        digest.update(b"{")
+        for key, value in obj.items():
+            _update(digest, key)
+            _update(digest, value)
+        digest.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b"[")
+        for item in obj:
+            _update(digest, item)
+        digest.update(b"]")
+    elif isinstance(obj, (set, frozenset)):
+        _update(digest, sorted(repr(item) for item in obj))
+    elif is_dataclass(obj) and not isinstance(obj, type):
+        _update(digest, {fld.name: getattr(obj, fld.name) for fld in fields(obj)})
+    elif isinstance(obj, Promise):
+        digest.update(str(obj).encode())
+    elif isinstance(obj, partial):
+        _update(digest, (obj.func, obj.args, obj.keywords))
+    elif callable(obj):
+        digest.update(
+            f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', '')}".encode()
+        )
+    else:
+        digest.update(repr(obj).encode())
+
+
+def fingerprint(*objs: t.Any) -> str:
+    """
+    Compute a stable content hash of the given objects. Callables are hashed by their
+    import path and lazy translations are rendered in the active language.
+
+    :param objs: The objects to hash, typically settings structures.
+    :return: A hex digest string.
+    """
+    digest = hashlib.sha256()
+    for obj in objs:
+        _update(digest, obj)
+    return digest.hexdigest()
+
+
+def _trusted(path: Path) -> bool:
+    """
+    :return: True if the path is owned by the current user and is not writable by
+        other users. Always True where users are not available.
+    """
+    if not hasattr(os, "getuid"):  # pragma: no cover - windows
+        return True
+    info = path.stat()
+    return info.st_uid == os.getuid() and not info.st_mode & 0o022
+
+
+def read(name: str) -> t.Any:
+    """
+    Load an artifact from the cache directory.
+
+    :param name: The file name of the artifact.
+    :return: The unpickled artifact or None if it is not present, could not be read or
+        the cache directory or artifact could have been written by another user.
+    """
+    directory = cache_dir()
+    if not directory:
+        return None
+    try:
+        if not (_trusted(directory) and _trusted(directory / name)):
+            return None
+        with open(directory / name, "rb") as cached:
+            # only trusted entries written by this user are unpickled, see above
+            return pickle.load(cached)  # noqa: S301
+    except (
+        OSError,
+        EOFError,
+        pickle.UnpicklingError,
+        ValueError,
+        AttributeError,
+        ImportError,
+        IndexError,
+    ) as err:
+        logger.debug("Could not read %s from the cache: %s", name, err)
+        return None
+
+
+def write(name: str, obj: t.Any, prune: t.Optional[str] = None) -> None:
+    """
+    Atomically write an artifact to the cache directory. Failures, including objects
+    that can not be pickled, are ignored and nothing is written.
+
+    :param name: The file name of the artifact.
+    :param obj: The picklable object to store.
+    :param prune: A glob pattern of stale artifacts to remove from the cache
+        directory once the new artifact is written.
+    """
+    directory = cache_dir()
+    if not directory:
+        return
+    tmp = directory / f".{name}.{os.getpid()}"
+    try:
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "wb") as cached:
+            pickle.dump(obj, cached, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, directory / name)
+        for stale in directory.glob(prune) if prune else []:
+            if stale.name != name:
+                stale.unlink(missing_ok=True)
+    except (OSError, pickle.PicklingError, TypeError, AttributeError) as err:
+        logger.debug("Could not write %s to the cache: %s", name, err)
+    finally:
+        with suppress(OSError):
+            tmp.unlink(missing_ok=True)
@@ -1,4 +1,33 @@
+from django.core.management import CommandError
+from django.utils.translation import gettext as _
+
+
 class ExitEarly(Exception):
     """
     Raise this exception to exit a routine early.
     """
+
+
+class CommandTimeout(CommandError):
+    """
+    Raised when a command runs longer than its
+    :attr:`~django_routines.RoutineCommand.timeout` or than the time left in its
+    routine's :attr:`~django_routines.Routine.time_budget`. This is the exception
+    :data:`~django_routines.signals.routine_failed` receivers get for the command.
+
+    :param command: The command string of the command that timed out.
+    :param seconds: The command's timeout or the routine's time budget in seconds.
+    :param budget: True if the routine's time budget was exceeded.
+    """
+
+    def __init__(self, command: str, seconds: float, budget: bool = False):
+        self.command = command
+        self.seconds = seconds
+        self.budget = budget
+        super().__init__(
+            (
+                _("{command} exceeded the routine's time budget of {seconds} seconds.")
+                if budget
+                else _("{command} timed out after {seconds} seconds.")
+            ).format(command=command, seconds=f"{seconds:g}")
+        )
@@ -0,0 +1,101 @@
+"""
+Track the declared inputs of commands so that commands whose inputs have not changed
+since they last succeeded may be skipped. See
+:attr:`~django_routines.RoutineCommand.inputs`.
+
+The digest of a command's inputs is stored in the :setting:`DJANGO_ROUTINES_CACHE_DIR`
+under a key derived from the routine and the command itself, so changing a command's
+arguments or options also causes it to run again.
+"""
+
+import glob
+import hashlib
+import os
+import typing as t
+from pathlib import Path
+
+from django_routines import Command, cache
+
+CHUNK_SIZE = 1024 * 1024
+"""
+The number of bytes of an input file that are hashed at a time.
+"""
+
+
+def declared(command: Command) -> bool:
+    """
+    :return: True if the command declares any inputs.
+    """
+    return bool(command.inputs or command.input_settings or command.input_env)
+
+
+def files(patterns: t.Iterable[str]) -> t.List[Path]:
+    """
+    :return: The sorted paths of the files matched by the glob patterns.
+    """
+    return sorted(
+        {
+            Path(path)
+            for pattern in patterns
+            for path in glob.iglob(pattern, recursive=True)
+            if os.path.isfile(path)
+        }
+    )
+
+
+def digest(command: Command) -> str:
+    """
+    Hash the contents and paths of the command's input files along with the values of
+    its input settings and environment variables.
+
+    :return: A hex digest string.
+    """
+    from django.conf import settings
+
+    hasher = hashlib.sha256()
+    for path in files(command.inputs):
+        hasher.update(f"{path}\0".encode())
+        with open(path, "rb") as src:
+            while chunk := src.read(CHUNK_SIZE):
+                hasher.update(chunk)
+        hasher.update(b"\0")
+    hasher.update(
+        cache.fingerprint(
+            {
+                name: (hasattr(settings, name), getattr(settings, name, None))
+                for name in command.input_settings
+            },
+            {name: os.environ.get(name) for name in command.input_env},
+        ).encode()
+    )
+    return hasher.hexdigest()
+
+
+def _stamp(routine: str, command: Command) -> str:
+    return "inputs-{}.pickle".format(
+        cache.fingerprint(
+            routine,
+            command.kind,
+            command.command,
+            getattr(command, "options", None),
+        )
+    )
+
+
+def unchanged(routine: str, command: Command, current: str) -> bool:
+    """
+    :param routine: The name of the routine the command belongs to.
+    :param current: The current :func:`digest` of the command's inputs.
+    :return: True if the command last succeeded with the same inputs.
+    """
+    return cache.read(_stamp(routine, command)) == current
+
+
+def record(routine: str, command: Command, current: str) -> None:
+    """
+    Store the digest of the inputs the command succeeded with.
+
+    :param routine: The name of the routine the command belongs to.
+    :param current: The :func:`digest` of the command's inputs before it was run.
+    """
+    cache.write(_stamp(routine, command), current)
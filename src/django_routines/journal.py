@@ -0,0 +1,105 @@
+"""
+A durable record of the commands of a routine run that have completed, so that a run
+that failed part way through may be resumed with ``--resume``.
+
+Journals are stored in the :setting:`DJANGO_ROUTINES_CACHE_DIR` keyed on the routine,
+its active switches and a hash of the commands in its execution plan, so a journal is
+never applied to a different plan. The plan index of each completed command is
+appended as a line and synced to disk before the routine moves on.
+"""
+
+import os
+import threading
+import typing as t
+from contextlib import ExitStack
+from pathlib import Path
+
+from django_routines import Command, cache
+
+
+def name(routine: str, switches: t.Iterable[str], plan: t.Sequence[Command]) -> str:
+    """
+    :return: The file name of the journal of the routine run with the given switches
+        and execution plan.
+    """
+    return "journal-{}.log".format(
+        cache.fingerprint(routine, sorted(switches), list(plan))
+    )
+
+
+def read(path: Path) -> t.Set[int]:
+    """
+    :return: The plan indexes recorded in the journal at the given path. A missing
+        journal records nothing.
+    """
+    try:
+        lines = path.read_text().split("\n")
+    except FileNotFoundError:
+        return set()
+    # the last line is incomplete if the run was interrupted while writing it
+    return {int(line) for line in lines[:-1] if line.isdigit()}
+
+
+def _sync_dir(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """
+    An append only journal of the plan indexes of the commands of a routine run that
+    have completed. Appends are thread safe. The journal is closed by :meth:`close` or
+    when it is used as a context manager.
+
+    :param path: The path of the journal file.
+    :param resume: Continue the existing journal at the path, if any, instead of
+        starting a new one.
+    """
+
+    def __init__(self, path: Path, resume: bool = False):
+        self.path = path
+        self.completed: t.Set[int] = read(path) if resume else set()
+        """
+        The plan indexes that completed in previous runs.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._stack = ExitStack()
+        # closed with the exit stack
+        self._file = self._stack.enter_context(
+            open(path, "a" if resume else "w")  # noqa: SIM115
+        )
+        self._lock = threading.Lock()
+        _sync_dir(path.parent)
+
+    def record(self, index: int) -> None:
+        """
+        Durably record that the command at the given plan index has completed.
+        """
+        with self._lock:
+            self._file.write(f"{index}\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self, discard: bool = False) -> None:
+        """
+        Close the journal.
+
+        :param discard: Remove the journal, there is nothing left to resume.
+        """
+        self._stack.close()
+        if discard:
+            self.path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
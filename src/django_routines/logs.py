@@ -0,0 +1,160 @@
+"""
+Helpers for capturing the output of subprocesses to per-command log files. See
+:attr:`~django_routines.Routine.log_dir`.
+
+Output is copied in fixed size chunks as it is produced so memory use does not grow
+with the amount of output a command writes.
+"""
+
+import codecs
+import os
+import re
+import typing as t
+from collections import deque
+from contextlib import ExitStack
+from pathlib import Path
+
+BUFFER_SIZE = 64 * 1024
+"""
+The maximum number of bytes read from a subprocess pipe at a time.
+"""
+
+BACKUPS = 3
+"""
+The number of rotated log files kept for each stream when logs have a maximum size.
+"""
+
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+
+def log_name(index: int, name: str) -> str:
+    """
+    :return: The base name of the log files of the command at the given plan index.
+    """
+    return f"{index:03d}-{_UNSAFE.sub('_', name)}"
+
+
+class RotatingLog:
+    """
+    A binary log file that is truncated when it is opened and rotated when it would
+    grow beyond ``max_bytes``. Rotated logs are renamed with a numeric suffix,
+    ``.1`` being the most recent. The log is closed by :meth:`close` or when it is used
+    as a context manager.
+
+    :param path: The path of the log file.
+    :param max_bytes: The maximum size of the log file, or None for no limit.
+    :param backups: The number of rotated logs to keep.
+    """
+
+    def __init__(
+        self, path: Path, max_bytes: t.Optional[int] = None, backups: int = BACKUPS
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for backup in range(1, backups + 1):
+            self._backup(backup).unlink(missing_ok=True)
+        self._stack = ExitStack()
+        self._file = self._open()
+
+    def _open(self) -> t.BinaryIO:
+        self._size = 0
+        return self._stack.enter_context(open(self.path, "wb"))
+
+    def _backup(self, number: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{number}")
+
+    def _rotate(self) -> None:
+        self._stack.close()
+        if self.backups:
+            for backup in range(self.backups - 1, 0, -1):
+                if self._backup(backup).exists():
+                    os.replace(self._backup(backup), self._backup(backup + 1))
+            os.replace(self.path, self._backup(1))
+        self._file = self._open()
+
+    def write(self, data: bytes) -> None:
+        if self.max_bytes and self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+
+    def close(self) -> None:
+        self._stack.close()
+
+    def __enter__(self) -> "RotatingLog":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class Tail:
+    """
+    A ring buffer of the last lines written to it.
+
+    :param lines: The number of lines to keep.
+    """
+
+    def __init__(self, lines: int):
+        self._lines: t.Deque[bytes] = deque(maxlen=lines)
+        self._partial = b""
+
+    def write(self, data: bytes) -> None:
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        self._lines.extend(lines)
+
+    def text(self) -> str:
+        """
+        :return: The buffered lines decoded as text.
+        """
+        lines = [*self._lines, self._partial] if self._partial else [*self._lines]
+        return "\n".join(
+            line.decode(errors="replace")
+            for line in lines[-(self._lines.maxlen or 0) :]
+        )
+
+
+class Lines:
+    """
+    Decode chunks of output and pass it on one complete line at a time.
+
+    :param write: Called with each line, including its line ending.
+    """
+
+    def __init__(self, write: t.Callable[[str], t.Any]):
+        self._write = write
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial = ""
+
+    def write(self, data: bytes) -> None:
+        lines = (self._partial + self._decoder.decode(data)).splitlines(keepends=True)
+        self._partial = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+        for line in lines:
+            self._write(line)
+
+    def close(self) -> None:
+        """
+        Pass on the last line if it was not terminated.
+        """
+        partial = self._partial + self._decoder.decode(b"", final=True)
+        if partial:
+            self._write(f"{partial}\n")
+        self._partial = ""
+
+
+def pump(
+    source: t.BinaryIO,
+    sinks: t.Sequence[t.Callable[[bytes], t.Any]],
+    size: int = BUFFER_SIZE,
+) -> None:
+    """
+    Copy the source to each of the sinks in chunks of at most ``size`` bytes until
+    the source is exhausted. Each chunk is passed on as soon as it is read.
+    """
+    read = getattr(source, "read1", source.read)
+    while chunk := read(size):
+        for sink in sinks:
+            sink(chunk)
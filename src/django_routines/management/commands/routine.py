@@ -1,38 +1,135 @@
+import bisect
+import heapq
 import importlib
+import json
+import marshal
 import os
 import subprocess
 import sys
+import tempfile
+import threading
+import time
+import traceback
 import typing as t
-from contextlib import contextmanager
-from copy import deepcopy
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager, nullcontext
+from copy import copy
+from dataclasses import dataclass, field
+from enum import Enum
 from importlib.util import find_spec
+from pathlib import Path
 from typing import Annotated
 
 import click
 import typer
-from django.core.management import CommandError, call_command
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management import CommandError, call_command, get_commands
+from django.core.management.base import BaseCommand, OutputWrapper
+from django.db import connections, transaction
 from django.utils.module_loading import import_string
+from django.utils.translation import get_language
 from django.utils.translation import gettext as _
 from django_typer.management import TyperCommand, finalize, get_command, initialize
+from django_typer.management import command as subcommand
 from django_typer.types import Verbosity
 
 from django_routines import (
+    LAZY_SETTING,
+    ROUTINE_SETTING,
     Hook,
     ManagementCommand,
     Routine,
     SystemCommand,
+    __version__,
+    artifacts,
+    cache,
     get_routine,
-    routines,
+    inputs,
+    journal,
+    logs,
+    memory,
+    profiling,
+    retention,
+    sampling,
+    timeouts,
+    timings,
     to_cli_option,
     to_symbol,
 )
-from django_routines.exceptions import ExitEarly
-from django_routines.signals import routine_failed, routine_finished, routine_started
+from django_routines.exceptions import CommandTimeout, ExitEarly
+from django_routines.signals import (
+    command_finished,
+    command_started,
+    routine_failed,
+    routine_finished,
+    routine_started,
+)
 
 RCommand = t.Union[ManagementCommand, SystemCommand]
 
+
+class Status(str, Enum):
+    """
+    The status of a command in the execution plan of a routine run.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    SKIPPED = "skipped"
+    UNCHANGED = "unchanged"
+    RESTORED = "restored"
+    RESUMED = "resumed"
+    FAILED = "failed"
+
+
+@dataclass(slots=True)
+class CommandRun:
+    """
+    The per-run state of a command in the execution plan. Runs are kept separate from
+    the routine's configuration so the configuration can be shared between runs.
+    """
+
+    command: RCommand
+    """
+    The run's copy of the command. Hooks may modify it.
+    """
+
+    status: Status = Status.PENDING
+
+    result: t.Any = None
+    """
+    The result of the command once it has been run, see
+    :attr:`~django_routines.ManagementCommand.result`.
+    """
+
+    timing: timings.Timing = field(default_factory=timings.Timing)
+    """
+    The time the command took to run.
+    """
+
+    usage: memory.Usage = field(default_factory=memory.Usage)
+    """
+    The memory and resources the command used, if the routine is run with
+    ``--memory``.
+    """
+
+
+SWITCH_PREFIX = "_switch_"
+"""
+The prefix of the parameters of the generated routine functions that hold switches, so
+switches can not collide with the routine's options.
+"""
+
+BATCH_COMMAND = "_batch"
+"""
+The name of the hidden subcommand that runs batches of management commands.
+"""
+
+PREFIX_COLORS = ("green", "yellow", "blue", "magenta", "cyan")
+"""
+The colors cycled through for the output prefixes of concurrently running commands.
+"""
+
 width = 80
 use_rich = find_spec("rich") is not None
 if use_rich:
@@ -52,6 +149,22 @@ def {routine_func}(
             show_default=False
         )
     ] = None,
+    fork: Annotated[
+        bool,
+        typer.Option(
+            "{fork_opt}",
+            help="{fork_help}",
+            show_default=False
+        )
+    ] = None,
+    batch: Annotated[
+        bool,
+        typer.Option(
+            "{batch_opt}",
+            help="{batch_help}",
+            show_default=False
+        )
+    ] = None,
     atomic: Annotated[
         bool,
         typer.Option(
@@ -68,21 +181,85 @@ def {routine_func}(
             show_default=False
         )
     ] = None,
-    all: Annotated[bool, typer.Option("--all", help="{all_help}")] = False,
+    jobs: Annotated[
+        t.Optional[int],
+        typer.Option(
+            "{jobs_opt}",
+            min=1,
+            metavar="N",
+            help="{jobs_help}",
+            show_default=False
+        )
+    ] = None,
+    retain: Annotated[
+        t.Optional[str],
+        typer.Option(
+            "{retain_opt}",
+            metavar="POLICY",
+            help="{retain_help}",
+            show_default=False
+        )
+    ] = None,
+    log_dir: Annotated[
+        t.Optional[Path],
+        typer.Option(
+            "{log_dir_opt}",
+            file_okay=False,
+            help="{log_dir_help}",
+            show_default=False
+        )
+    ] = None,
+    time_budget: Annotated[
+        t.Optional[float],
+        typer.Option(
+            "{time_budget_opt}",
+            min=0,
+            metavar="SECONDS",
+            help="{time_budget_help}",
+            show_default=False
+        )
+    ] = None,
+    force: Annotated[bool, typer.Option("{force_opt}", help="{force_help}")] = False,
+    resume: Annotated[bool, typer.Option("{resume_opt}", help="{resume_help}")] = False,
+    timings: Annotated[bool, typer.Option("{timings_opt}", help="{timings_help}")] = False,
+    memory: Annotated[bool, typer.Option("{memory_opt}", help="{memory_help}")] = False,
+    profile: Annotated[bool, typer.Option("{profile_opt}", help="{profile_help}")] = False,
+    sample: Annotated[bool, typer.Option("{sample_opt}", help="{sample_help}")] = False,
+    profile_dir: Annotated[
+        t.Optional[Path],
+        typer.Option(
+            "{profile_dir_opt}",
+            file_okay=False,
+            help="{profile_dir_help}",
+            show_default=False
+        )
+    ] = None,
+    all: Annotated[bool, typer.Option("{all_opt}", help="{all_help}")] = False,
     {switch_args}
 ):
     self.routine = "{routine}"
     self._routine_options = {{
         **self._routine_options,
-        **ctx.params,
+        {switch_options}
+        **{{
+            name: value
+            for name, value in ctx.params.items()
+            if not name.startswith("{switch_prefix}")
+        }},
     }}
     self.switches = []
     {add_switches}
     if not ctx.invoked_subcommand:
         return self._run_routine(
             subprocess=subprocess,
+            fork=fork,
+            batch=batch,
             atomic=atomic,
-            continue_on_error=continue_on_error
+            continue_on_error=continue_on_error,
+            jobs=jobs,
+            retain=retain,
+            log_dir=log_dir,
+            time_budget=time_budget
        )
     return self.{routine_func}
 """
@@ -99,6 +276,16 @@ def load_hook(hook: t.Union[str, Hook]) -> Hook:
     return hook
 
 
+def _lazy() -> bool:
+    """
+    True if routine subcommands should only be built for the routine being invoked.
+    See :setting:`DJANGO_ROUTINES_LAZY`.
+    """
+    from django.conf import settings
+
+    return bool(getattr(settings, LAZY_SETTING, False))
+
+
 class Command(TyperCommand, rich_markup_mode="rich"):
     """
     A :class:`~django_typer.management.TyperCommand` that reads the
@@ -131,7 +318,46 @@ class Command(TyperCommand, rich_markup_mode="rich"):
     _routine_options: t.Dict[str, t.Any] = {}
     _previous_command: t.Optional[RCommand] = None
 
-    _results: t.List[t.Any] = []
+    _results: t.Union[t.List[t.Any], t.Deque[t.Any], retention.Spilled] = []
+
+    runs: t.List[CommandRun] = []
+    """
+    The state of each command in the execution plan of the current run.
+    """
+
+    _batches: t.Dict[int, t.List[ManagementCommand]] = {}
+    _batch_results: t.Dict[int, subprocess.CompletedProcess] = {}
+    _logs: t.Dict[int, str] = {}
+    _timings: t.Dict[int, timings.Timing] = {}
+    _usages: t.Dict[int, memory.Usage] = {}
+    _profiles: t.Dict[int, Path] = {}
+    _sampler: t.Optional[sampling.Sampler] = None
+    _journal: t.Optional[journal.Journal] = None
+    _deadline: t.Optional[float] = None
+
+    _hooks: t.Dict[str, t.Callable[..., t.Any]] = {}
+    """
+    The import strings of the current run's hooks and callbacks resolved to callables.
+    """
+
+    _output_lock = threading.Lock()
+    """
+    Serializes writes to the output streams from concurrently running commands.
+    """
+
+    def __init__(self, *args, **kwargs):
+        if _lazy():
+            requested = _requested_routines()
+            # batches run management commands directly, they need no routines
+            if BATCH_COMMAND not in (requested or []):
+                _register_routines(requested)
+        super().__init__(*args, **kwargs)
+
+    def create_parser(self, prog_name: str, subcommand: str, **kwargs):
+        if not getattr(self, "_called_from_command_line", False):
+            # when invoked programmatically any routine may be requested
+            _register_routines()
+        return super().create_parser(prog_name, subcommand, **kwargs)
 
     @property
     def routine(self) -> t.Optional[Routine]:
@@ -142,9 +368,7 @@ def routine(self) -> t.Optional[Routine]:
 
     @routine.setter
     def routine(self, routine: t.Union[str, Routine]):
-        # we create our own copy of the routine because run-specific data will be
-        # added to the objects
-        self._routine = deepcopy(
+        self._routine = _run_copy(
             routine if isinstance(routine, Routine) else get_routine(str(routine))
         )
 
@@ -187,25 +411,94 @@ def finished(self, results: t.List[t.Any]):
         If we have a finalize callback defined, call it
         with the results of the routine run.
         """
+        if self.routine and self.routine.finalize:
+            self._hook(self.routine.finalize)(self.routine, self._results)
+        if isinstance(self._results, retention.Spilled):
+            self._results.close()
+
+    def _hook(
+        self, hook: t.Union[str, t.Callable[..., t.Any]]
+    ) -> t.Callable[..., t.Any]:
+        """
+        Get the callable for a hook or callback, resolved by :meth:`_resolve_hooks`
+        if it is an import string.
+        """
+        if isinstance(hook, str):
+            return self._hooks.get(hook) or load_hook(hook)
+        return hook
+
+    def _call_hook(
+        self,
+        hook: t.Union[str, t.Callable[..., t.Any]],
+        command: RCommand,
+        other: t.Optional[RCommand],
+    ) -> t.Any:
+        """
+        Call a command's pre or post hook and add the time it took to the command's
+        :attr:`timing
+        <django_routines.management.commands.routine.CommandRun.timing>`.
+
+        :param other: The previous command for pre hooks, the next for post hooks.
+        :return: The value returned by the hook.
+        """
+        start = time.perf_counter()
+        try:
+            return self._hook(hook)(self.routine, command, other, self._routine_options)
+        finally:
+            timing = self._timings.get(id(command))
+            if timing:
+                timing.hooks += time.perf_counter() - start
+
+    def _resolve_hooks(self, plan: t.List[RCommand]) -> None:
+        """
+        Import the hooks of every command in the plan and the routine's callbacks so
+        that broken import strings are reported before any command is run.
+
+        :raises: :exc:`~django.core.management.CommandError` if a hook could not be
+            imported or is not callable.
+        """
         assert self.routine
-        if self.routine.finalize:
-            (
-                import_string(self.routine.finalize)
-                if isinstance(self.routine.finalize, str)
-                else self.routine.finalize
-            )(self.routine, self._results)
+        self._hooks = {}
+        for hook in (
+            self.routine.initialize,
+            self.routine.finalize,
+            *(hook for cmd in plan for hook in (cmd.pre_hook, cmd.post_hook)),
+        ):
+            if not isinstance(hook, str) or hook in self._hooks:
+                continue
+            try:
+                resolved = load_hook(hook)
+            except ImportError as err:
+                raise CommandError(
+                    _("Unable to import hook {hook}: {error}").format(
+                        hook=hook, error=err
+                    )
+                ) from err
+            if not callable(resolved):
+                raise CommandError(_("Hook {hook} is not callable.").format(hook=hook))
+            self._hooks[hook] = resolved
 
     def _run_routine(
         self,
         subprocess: t.Optional[bool] = None,
         atomic: t.Optional[bool] = None,
         continue_on_error: t.Optional[bool] = None,
+        jobs: t.Optional[int] = None,
+        fork: t.Optional[bool] = None,
+        batch: t.Optional[bool] = None,
+        retain: t.Optional[str] = None,
+        log_dir: t.Optional[Path] = None,
+        time_budget: t.Optional[float] = None,
     ):
         """
         Execute the current routine plan. If verbosity is zero, do not print the
         commands as they are run. Also use the stdout/stderr streams and color
         configuration of the routine command for each of the commands in the execution
-        plan.
+        plan. If more than one job is requested the plan is run by
+        :meth:`_run_graph`. If ``--timings`` is given a table of the slowest commands
+        is printed when the routine finishes, see :mod:`django_routines.timings`.
+        Likewise for the commands that used the most memory if ``--memory`` is given,
+        see :mod:`django_routines.memory`.
         """
         assert self.routine
 
@@ -216,80 +509,653 @@ def noop():
         subprocess = (
             not self.routine.subprocess if subprocess else self.routine.subprocess
         )
+        fork = not self.routine.fork if fork else self.routine.fork
+        batch = not self.routine.batch if batch else self.routine.batch
         is_atomic = not self.routine.atomic if atomic else self.routine.atomic
         continue_on_error = (
             not self.routine.continue_on_error
             if continue_on_error
             else self.routine.continue_on_error
         )
+        jobs = jobs or self.routine.jobs
+        try:
+            retain = retention.parse(retain or self.routine.retain)
+        except ValueError as err:
+            raise CommandError(str(err)) from err
+        if jobs > 1 and is_atomic:
+            raise CommandError(
+                _("Atomic routines cannot run more than one job at a time.")
+            )
+        if is_atomic and self._routine_options.get("resume"):
+            raise CommandError(
+                _(
+                    "Atomic routines cannot be resumed, they are rolled back when they "
+                    "fail."
+                )
+            )
         self._routine_options = {
             **self._routine_options,
             # we pass the resolved version of these options below
             # these will be based on the defaults for the routine if unspecified on the
             # CLI
             "subprocess": subprocess,
+            "fork": fork,
+            "batch": batch,
             "atomic": is_atomic,
             "continue_on_error": continue_on_error,
+            "jobs": jobs,
+            "retain": retain,
+            "log_dir": str(log_dir or self.routine.log_dir or "") or None,
+            "time_budget": (
+                time_budget if time_budget is not None else self.routine.time_budget
+            ),
         }
+        profile_dir = self._routine_options.get("profile_dir")
+        sample = self._routine_options.get("sample", False)
+        if profile_dir or sample or self._routine_options.get("profile"):
+            profile_dir = str(
+                profile_dir or tempfile.mkdtemp(prefix="routine-profiles-")
+            )
+            self._routine_options.update(profile=True, profile_dir=profile_dir)
+        time_budget = self._routine_options["time_budget"]
+        self._deadline = (
+            time.monotonic() + time_budget if time_budget is not None else None
+        )
+        self._results = retention.store(retain)
+        log_dir = self._routine_options["log_dir"]
+        plan = self.plan
+        self._resolve_hooks(plan)
+        self.runs = [CommandRun(command) for command in plan]
+        self._timings = {id(run.command): run.timing for run in self.runs}
+        self._usages = (
+            {id(run.command): run.usage for run in self.runs}
+            if self._routine_options.get("memory")
+            else {}
+        )
+        profile_name = sampling.sample_name if sample else profiling.profile_name
+        self._profiles = (
+            {
+                id(command): Path(profile_dir)
+                / profile_name(idx, command.label or command.command_name)
+                for idx, command in enumerate(plan)
+            }
+            if profile_dir
+            else {}
+        )
         routine_started.send(
             sender=self, routine=self.routine.name, **self._routine_options
         )
 
-        ctx = transaction.atomic if is_atomic else noop
-        with ctx():  # type: ignore
-            plan = self.plan
-            last = None
-            if self.routine.initialize:
-                (
-                    import_string(self.routine.initialize)
-                    if isinstance(self.routine.initialize, str)
-                    else self.routine.initialize
-                )(self.routine, plan, self.switches, self._routine_options)
-
-            for idx, command in enumerate(plan):
-                nxt = plan[idx + 1] if idx < len(plan) - 1 else None
-                try:
-                    try:
-                        if isinstance(command, SystemCommand) or subprocess:
-                            was_run = self._subprocess(command, nxt=nxt) is not None
-                        else:
-                            was_run = self._call_command(command, nxt=nxt)
-                        last = idx if was_run else last
-                    except ExitEarly:
-                        raise
-                    except Exception as routine_exc:
-                        if not continue_on_error:
-                            if any(
-                                ret
-                                for _, ret in routine_failed.send(
-                                    sender=self,
-                                    routine=self.routine.name,
-                                    failed_command=idx,
-                                    exception=routine_exc,
-                                    **self._routine_options,
-                                )
-                            ):
-                                continue
-                            raise routine_exc
-                except ExitEarly:
-                    routine_finished.send(
-                        sender=self,
-                        routine=self.routine.name,
-                        early_exit=True,
-                        last_command=idx,
-                        **self._routine_options,
+        try:
+            ctx = transaction.atomic if is_atomic else noop
+            resume = self._routine_options.get("resume", False)
+            with (
+                self._journaled(plan, resume=resume),
+                self._sampling(threaded=jobs > 1),
+                ctx(),  # type: ignore
+            ):
+                last = None
+                self._batch_results = {}
+                self._logs = (
+                    {
+                        id(command): logs.log_name(
+                            idx, command.label or command.command_name
+                        )
+                        for idx, command in enumerate(plan)
+                        if isinstance(command, SystemCommand) or subprocess
+                    }
+                    if log_dir
+                    else {}
+                )
+                self._batches = (
+                    _batches(plan)
+                    if batch
+                    and subprocess
+                    and jobs == 1
+                    and not (fork and hasattr(os, "fork"))
+                    and not log_dir
+                    and time_budget is None
+                    and not self._instrumented()
+                    else {}
+                )
+                if self.routine.initialize:
+                    self._hook(self.routine.initialize)(
+                        self.routine, plan, self.switches, self._routine_options
                     )
-                    return
+
+                if jobs > 1:
+                    last, early_exit = self._run_graph(
+                        plan, jobs, subprocess, continue_on_error
+                    )
+                    if early_exit:
+                        self._finished(early_exit=True, last_command=last)
+                        return
+                else:
+                    for idx, command in enumerate(plan):
+                        nxt = plan[idx + 1] if idx < len(plan) - 1 else None
+                        try:
+                            try:
+                                if self._run_command(
+                                    idx,
+                                    nxt=nxt,
+                                    previous=self._previous_command,
+                                    subprocess=subprocess,
+                                ):
+                                    last = idx
+                            except ExitEarly:
+                                raise
+                            except Exception as routine_exc:
+                                if not continue_on_error or _out_of_time(routine_exc):
+                                    if any(
+                                        ret
+                                        for _, ret in routine_failed.send(
+                                            sender=self,
+                                            routine=self.routine.name,
+                                            failed_command=idx,
+                                            exception=routine_exc,
+                                            **self._routine_options,
+                                        )
+                                    ):
+                                        continue
+                                    raise routine_exc
+                        except ExitEarly:
+                            self._finished(early_exit=True, last_command=idx)
+                            return
+            self._finished(early_exit=False, last_command=last)
+        finally:
+            if self._routine_options.get("timings"):
+                self._report_timings()
+            if self._usages:
+                self._report_memory()
+            if profile_dir:
+                self._report_profiles()
+
+    def _instrumented(self) -> bool:
+        """
+        :return: True if the commands of the run are measured or observed one at a
+            time, so they can not be batched. The timings, memory use and profile of a
+            batch could not be attributed to its commands and the command signals
+            would only be sent once the whole batch had run.
+        """
+        return bool(
+            self._routine_options.get("timings")
+            or self._profiles
+            or self._usages
+            or command_started.receivers
+            or command_finished.receivers
+        )
+
+    @contextmanager
+    def _sampling(self, threaded: bool = False) -> t.Iterator[None]:
+        """
+        Run a :class:`~django_routines.sampling.Sampler` for the duration of the
+        context if the routine is run with ``--sample``.
+
+        :param threaded: Sample from a background thread, commands are run on worker
+            threads.
+        """
+        if not self._routine_options.get("sample"):
+            self._sampler = None
+            yield
+            return
+        with sampling.Sampler(threaded=threaded) as self._sampler:
+            yield
+        self._sampler = None
+
+    def _profiled(self, command: RCommand, forked: bool = False):
+        """
+        :param forked: The command is run in a forked child, which must profile itself.
+        :return: A context manager that profiles or samples the code run in it on the
+            current thread and writes the results to the command's profile, if the
+            routine is profiled.
+        """
+        path = self._profiles.get(id(command))
+        if path is None or not self._routine_options.get("sample"):
+            return profiling.profiled(path, exclusive=not forked)
+        if forked:
+            return _sampled_child(path)
+        assert self._sampler
+        return self._sampler.sampled(path)
+
+    def _traced(self, command: RCommand):
+        """
+        :return: A context manager that traces the memory allocated by the code run in
+            it and records it on the command's run, if the routine is run with
+            ``--memory``.
+        """
+        usage = self._usages.get(id(command))
+        return memory.Traced(usage) if usage else nullcontext()
+
+    @contextmanager
+    def _journaled(self, plan: t.List[RCommand], resume: bool = False):
+        """
+        Record the commands of the run that complete in a :class:`journal
+        <django_routines.journal.Journal>` for the duration of the context. The
+        journal is discarded if the run finishes without any failed commands.
+        Journals require :setting:`DJANGO_ROUTINES_CACHE_DIR` and atomic routines are
+        not journaled because their changes are rolled back when they fail.
+
+        :param resume: Skip the commands that completed in the last run with the same
+            plan.
+        """
+        assert self.routine
+        directory = cache.cache_dir()
+        if resume and not directory:
+            raise CommandError(
+                _("Resuming routines requires {setting} to be set.").format(
+                    setting=cache.CACHE_DIR_SETTING
+                )
+            )
+        if not directory or self._routine_options.get("atomic"):
+            self._journal = None
+            yield
+            return
+        self._journal = journal.Journal(
+            directory / journal.name(self.routine.name, self.switches, plan),
+            resume=resume,
+        )
+        try:
+            yield
+        except BaseException:
+            self._journal.close()
+            raise
+        self._journal.close(
+            discard=not any(run.status is Status.FAILED for run in self.runs)
+        )
+
+    def _finished(self, early_exit: bool, last_command: t.Optional[int]) -> None:
+        """
+        Send the :data:`~django_routines.signals.routine_finished` signal.
+        """
+        assert self.routine
         routine_finished.send(
             sender=self,
             routine=self.routine.name,
-            early_exit=False,
-            last_command=last,
+            early_exit=early_exit,
+            last_command=last_command,
+            unchanged=[
+                idx
+                for idx, run in enumerate(self.runs)
+                if run.status in (Status.UNCHANGED, Status.RESTORED)
+            ],
+            command_timings=[run.timing for run in self.runs],
             **self._routine_options,
         )
 
+    def _report_profiles(self) -> None:
+        """
+        Print where the profiles of the commands were written and a summary of the
+        functions that took the most time across all of them.
+        """
+        if self.verbosity < 1:
+            return
+        directory = self._routine_options["profile_dir"]
+        summary = (
+            sampling.summary
+            if self._routine_options.get("sample")
+            else profiling.summary
+        )(self._profiles.values())
+        with self._output_lock:
+            self.stdout.write(
+                self._style(
+                    _("Profiles written to {directory}").format(directory=directory),
+                    bold=True,
+                )
+            )
+            if summary:
+                self.stdout.write(summary)
+
+    def _report_timings(self) -> None:
+        """
+        Print a table of the commands that were run from the slowest to the fastest.
+        """
+        if self.verbosity < 1:
+            return
+        started = [
+            (idx, run.command.command_str, run.status.value, run.timing)
+            for idx, run in enumerate(self.runs)
+            if run.status not in (Status.PENDING, Status.RESUMED)
+        ]
+        if not started:
+            return
+        header, *rows = timings.table(started)
+        with self._output_lock:
+            self.stdout.write(self._style(header, bold=True))
+            for row in rows:
+                self.stdout.write(row)
+
+    def _report_memory(self) -> None:
+        """
+        Print a table of the commands that were run from the one that used the most
+        memory to the least.
+        """
+        if self.verbosity < 1:
+            return
+        started = [
+            (idx, run.command.command_str, run.status.value, run.usage)
+            for idx, run in enumerate(self.runs)
+            if run.status not in (Status.PENDING, Status.RESUMED)
+        ]
+        if not started:
+            return
+        header, *rows = memory.table(started)
+        with self._output_lock:
+            self.stdout.write(self._style(header, bold=True))
+            for row in rows:
+                self.stdout.write(row)
+
+    def _run_graph(
+        self,
+        plan: t.List[RCommand],
+        jobs: int,
+        subprocess: bool,
+        continue_on_error: bool,
+    ) -> t.Tuple[t.Optional[int], bool]:
+        """
+        Run the plan on a pool of worker threads. Commands are started in plan order as
+        soon as the commands they must run :attr:`~django_routines.ManagementCommand.after`
+        have finished and a worker is free.
+
+        The output of commands run as subprocesses is streamed line by line, prefixed
+        with the label or name of the command. Hooks run in the worker thread along
+        with their command. The previous command passed to a pre hook is the command
+        that most recently finished, and the next command passed to a post hook is the
+        next command in the plan. Command signals are sent from the worker thread and
+        routine signals from the calling thread. Once a command fails or exits the
+        routine early no more commands are started, but the commands already running
+        are allowed to finish.
+
+        :return: A 2-tuple of the index of the last command that was run and True if
+            the routine exited early.
+        """
+        assert self.routine
+        depends = _dependencies(self.routine, plan)
+        dependents: t.Dict[int, t.List[int]] = {}
+        waiting: t.Dict[int, int] = {}
+        ready: t.List[int] = []
+        for idx, deps in enumerate(depends):
+            if deps is None:
+                continue
+            waiting[idx] = len(deps)
+            for dep in deps:
+                dependents.setdefault(dep, []).append(idx)
+            if not deps:
+                heapq.heappush(ready, idx)
+        if plan and depends[0] is None:
+            heapq.heappush(ready, 0)
+
+        done = [False] * len(plan)
+        finished = 0  # all commands before this index have finished
+        running: t.Dict[Future, int] = {}
+        previous: t.Optional[RCommand] = None
+        last: t.Optional[int] = None
+        early_exit = False
+        failure: t.Optional[BaseException] = None
+
+        names = [command.label or command.command_name for command in plan]
+        width = max((len(name) for name in names), default=0)
+
+        def run(idx: int, previous: t.Optional[RCommand]) -> bool:
+            nxt = plan[idx + 1] if idx < len(plan) - 1 else None
+            try:
+                return self._run_command(
+                    idx,
+                    nxt=nxt,
+                    previous=previous,
+                    subprocess=subprocess,
+                    prefix=self._style(
+                        f"{names[idx].ljust(width)} | ",
+                        fg=PREFIX_COLORS[idx % len(PREFIX_COLORS)],
+                    ),
+                )
+            finally:
+                # database connections are per-thread, do not leak the worker's
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            while True:
+                while ready and len(running) < jobs and not (early_exit or failure):
+                    idx = heapq.heappop(ready)
+                    running[pool.submit(run, idx, previous)] = idx
+                if not running:
+                    break
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in sorted(completed, key=running.__getitem__):
+                    idx = running.pop(future)
+                    try:
+                        if future.result():
+                            previous = plan[idx]
+                            last = idx
+                    except ExitEarly:
+                        early_exit = True
+                        last = idx
+                    # any failure of a command is handled like the sequential runner
+                    # does, it is raised once the running commands have finished
+                    except Exception as routine_exc:  # noqa: BLE001
+                        if (
+                            not continue_on_error or _out_of_time(routine_exc)
+                        ) and not any(
+                            ret
+                            for _, ret in routine_failed.send(
+                                sender=self,
+                                routine=self.routine.name,
+                                failed_command=idx,
+                                exception=routine_exc,
+                                **self._routine_options,
+                            )
+                        ):
+                            failure = failure or routine_exc
+                    done[idx] = True
+                    for dependent in dependents.get(idx, []):
+                        waiting[dependent] -= 1
+                        if not waiting[dependent]:
+                            heapq.heappush(ready, dependent)
+                while finished < len(plan) and done[finished]:
+                    finished += 1
+                    if finished < len(plan) and depends[finished] is None:
+                        heapq.heappush(ready, finished)
+        if failure:
+            raise failure
+        return last, early_exit
+
+    def _run_command(
+        self,
+        idx: int,
+        nxt: t.Optional[RCommand],
+        previous: t.Optional[RCommand],
+        subprocess: bool,
+        prefix: t.Optional[str] = None,
+    ) -> bool:
+        """
+        Run the command at the given plan index in process or as a subprocess and
+        track its status and result in :attr:`runs`. Commands whose declared
+        :attr:`~django_routines.RoutineCommand.inputs` have not changed since they
+        last succeeded are not run unless the routine is forced, their
+        :attr:`~django_routines.RoutineCommand.outputs` are restored from the artifact
+        cache instead. Commands that completed in the run being resumed are not run.
+
+        :param prefix: The output prefix of a command run as a subprocess, see
+            :meth:`_subprocess`.
+        :return: True if the command was run, False if it was skipped due to pre_hook.
+        """
+        assert self.routine
+        run = self.runs[idx]
+        with (
+            self._signaled(idx),
+            timings.Timer(
+                run.timing, children=self._routine_options.get("jobs", 1) == 1
+            ),
+            (
+                memory.Children(run.usage)
+                if self._usages and self._routine_options.get("jobs", 1) == 1
+                else nullcontext()
+            ),
+        ):
+            digest = None
+            if self._journal and idx in self._journal.completed:
+                run.status = Status.RESUMED
+            else:
+                digest = _digest(run.command)
+                if digest and not self._routine_options.get("force"):
+                    if run.command.outputs:
+                        if artifacts.restore(run.command, digest):
+                            run.status = Status.RESTORED
+                    elif inputs.unchanged(self.routine.name, run.command, digest):
+                        run.status = Status.UNCHANGED
+            if run.status is not Status.PENDING:
+                if self.verbosity > 0:
+                    message = {
+                        Status.RESUMED: _("{command} already succeeded."),
+                        Status.RESTORED: _("{command} restored from cache."),
+                        Status.UNCHANGED: _("{command} is up to date."),
+                    }[run.status]
+                    with self._output_lock:
+                        self.stdout.write(
+                            f"{prefix or ''}"
+                            + self._style(
+                                message.format(command=run.command.command_str),
+                                fg="green",
+                            )
+                        )
+                if self._journal and run.status is not Status.RESUMED:
+                    self._journal.record(idx)
+                return False
+            if digest and run.command.outputs:
+                artifacts.detach(run.command)
+            run.status = Status.RUNNING
+            try:
+                limit = self._time_limit(run.command)
+                if isinstance(run.command, SystemCommand) or subprocess:
+                    was_run = (
+                        self._subprocess(
+                            run.command,
+                            nxt=nxt,
+                            previous=previous,
+                            prefix=prefix,
+                            limit=limit,
+                        )
+                        is not None
+                    )
+                else:
+                    was_run = self._call_command(
+                        run.command,
+                        nxt=nxt,
+                        previous=previous,
+                        limit=limit,
+                        prefix=prefix,
+                    )
+            except ExitEarly:
+                run.status = Status.SUCCEEDED
+                if digest:
+                    self._record(run.command, digest)
+                raise
+            except Exception:
+                run.status = Status.FAILED
+                raise
+            finally:
+                run.result = run.command.result
+                if self._routine_options.get("retain", retention.ALL) != retention.ALL:
+                    # the result has been retained, do not hold on to it here
+                    run.command.result = None
+                    run.result = (
+                        retention.return_code(run.result)
+                        if self._routine_options["retain"] == retention.CODES
+                        else None
+                    )
+            run.status = Status.SUCCEEDED if was_run else Status.SKIPPED
+            if digest and was_run:
+                self._record(run.command, digest)
+            if self._journal:
+                self._journal.record(idx)
+            return was_run
+
+    @contextmanager
+    def _signaled(self, idx: int) -> t.Iterator[None]:
+        """
+        Send the :data:`~django_routines.signals.command_started` and
+        :data:`~django_routines.signals.command_finished` signals around the run of the
+        command at the given plan index. Signals without receivers are not sent.
+        """
+        assert self.routine
+        run = self.runs[idx]
+        if command_started.receivers:
+            command_started.send(
+                sender=self,
+                routine=self.routine.name,
+                plan_index=idx,
+                command=run.command,
+            )
+        exception = None
+        try:
+            yield
+        except ExitEarly:
+            raise
+        except BaseException as exc:
+            exception = exc
+            raise
+        finally:
+            if command_finished.receivers:
+                command_finished.send(
+                    sender=self,
+                    routine=self.routine.name,
+                    plan_index=idx,
+                    command=run.command,
+                    status=run.status,
+                    duration=run.timing.wall,
+                    result=run.result,
+                    return_code=retention.return_code(run.result),
+                    exception=exception,
+                )
+
+    def _time_limit(
+        self, command: RCommand
+    ) -> t.Optional[t.Tuple[float, CommandTimeout]]:
+        """
+        Get the time the command may run for, the lesser of its own timeout and the
+        time left in the routine's time budget. It is checked once before the command
+        starts and passed to :meth:`_call_command` or :meth:`_subprocess`.
+
+        :return: The number of seconds and the exception to raise if the command runs
+            longer, or None if it may run indefinitely.
+        :raises: :exc:`~django_routines.exceptions.CommandTimeout` if the routine's
+            time budget has already run out.
+        """
+        limit = None
+        if command.timeout is not None:
+            limit = (
+                float(command.timeout),
+                CommandTimeout(command.command_str, command.timeout),
+            )
+        if self._deadline is not None:
+            budget = self._routine_options["time_budget"]
+            remaining = self._deadline - time.monotonic()
+            if remaining <= 0:
+                raise CommandTimeout(command.command_str, budget, budget=True)
+            if limit is None or remaining < limit[0]:
+                limit = (
+                    remaining,
+                    CommandTimeout(command.command_str, budget, budget=True),
+                )
+        return limit
+
+    def _record(self, command: RCommand, digest: str) -> None:
+        """
+        Record that the command succeeded with the given inputs, storing its outputs
+        if it declares any.
+        """
+        assert self.routine
+        if command.outputs:
+            artifacts.store(command, digest)
+        else:
+            inputs.record(self.routine.name, command, digest)
+
     def _call_command(
-        self, command: ManagementCommand, nxt: t.Optional[RCommand]
+        self,
+        command: ManagementCommand,
+        nxt: t.Optional[RCommand],
+        previous: t.Optional[RCommand] = None,
+        limit: t.Optional[t.Tuple[float, CommandTimeout]] = None,
+        prefix: t.Optional[str] = None,
     ) -> bool:
         """
         Call a management command with the given options and arguments. If the command
@@ -298,13 +1164,13 @@ def _call_command(
         post_hook, it will be called after the command is run. If the post hook returns
         a truthy value, the routine will exit early.
 
+        :param limit: The time the command may run for, see :meth:`_time_limit`.
+        :param prefix: The prefix the command is echoed with, see :meth:`_echo`.
         :return: True if the command was run, False if it was skipped due to pre_hook.
         """
         assert self.routine
         if command.pre_hook:
-            if load_hook(command.pre_hook)(
-                self.routine, command, self._previous_command, self._routine_options
-            ):
+            if self._call_hook(command.pre_hook, command, previous):
                 return False
         self._previous_command = command
         cmd = get_command(
@@ -328,20 +1194,32 @@ def _call_command(
             # by the command class and not passed by the configured command
             options = {"verbosity": self.verbosity, **options}
         if self.verbosity > 0:
-            self.secho(command.command_str, fg="cyan")
-        command.result = call_command(cmd, *command.command_args, **options)
+            self._echo(command.command_str, prefix)
+        try:
+            with (
+                self._profiled(command),
+                self._traced(command),
+                timeouts.interrupt(limit[0] if limit else None),
+            ):
+                command.result = call_command(cmd, *command.command_args, **options)
+        except timeouts.Expired:
+            assert limit
+            raise limit[1] from None
         self._results.append(command.result)
         if command.command_name == "makemigrations":
             importlib.invalidate_caches()
         if command.post_hook:
-            if load_hook(command.post_hook)(
-                self.routine, command, nxt, self._routine_options
-            ):
+            if self._call_hook(command.post_hook, command, nxt):
                 raise ExitEarly()
         return True
 
     def _subprocess(
-        self, command: RCommand, nxt: t.Optional[RCommand]
+        self,
+        command: RCommand,
+        nxt: t.Optional[RCommand],
+        previous: t.Optional[RCommand] = None,
+        prefix: t.Optional[str] = None,
+        limit: t.Optional[t.Tuple[float, CommandTimeout]] = None,
     ) -> t.Optional[int]:
         """
         Run a system command as a subprocess. If the command has a pre_hook, it will
@@ -350,43 +1228,123 @@ def _subprocess(
         called after the command is run. If the post hook returns a truthy value, the
         routine will exit early.
 
+        If a prefix is given the output of the command is multiplexed onto the routine's
+        streams line by line with the prefix, see :meth:`_stream`. Batched management
+        commands are run by :meth:`_batched`. If the routine has a log directory the
+        output is captured by :meth:`_logged`. If the routine is profiled Python
+        subprocesses are run under :mod:`cProfile`, see
+        :func:`~django_routines.profiling.wrap`.
+
+        :param limit: The time the command may run for, see :meth:`_time_limit`.
         :return: The return code of the command if it was run, None if it was skipped
             due to pre_hook.
         """
         assert self.routine
         if command.pre_hook:
-            if load_hook(command.pre_hook)(
-                self.routine, command, self._previous_command, self._routine_options
-            ):
+            if self._call_hook(command.pre_hook, command, previous):
                 return None
         self._previous_command = command
+        args = self._subprocess_args(command)
+        profile = self._profiles.get(id(command))
+        run_args = (
+            profiling.wrap(
+                args,
+                profile,
+                profiler=(
+                    sampling.__name__
+                    if self._routine_options.get("sample")
+                    else "cProfile"
+                ),
+            )
+            if profile
+            else args
+        )
+
+        log = self._logs.get(id(command))
+        timeout = limit[0] if limit else None
+        watchdog = None
+        if prefix is not None:
+            if self.verbosity > 0:
+                self._echo(" ".join(args), prefix)
+            command.result, watchdog = (
+                self._logged(run_args, log, prefix, timeout=timeout)
+                if log
+                else self._stream(run_args, prefix, timeout=timeout)
+            )
+        elif id(command) in self._batches:
+            command.result = self._batched(t.cast(ManagementCommand, command), args)
+        else:
+            if self.verbosity > 0:
+                self._echo(" ".join(args))
+            if log:
+                command.result, watchdog = self._logged(run_args, log, timeout=timeout)
+            elif (
+                isinstance(command, ManagementCommand)
+                and self._routine_options.get("fork")
+                and hasattr(os, "fork")
+            ):
+                command.result, watchdog = self._fork(command, args, timeout=timeout)
+            else:
+                try:
+                    command.result = subprocess.run(
+                        run_args, env=os.environ.copy(), timeout=timeout
+                    )
+                except subprocess.TimeoutExpired:
+                    assert limit
+                    raise limit[1] from None
+        if watchdog and watchdog.expired:
+            assert limit
+            raise limit[1]
+        self._results.append(command.result)
+        if command.result.returncode > 0:
+            raise CommandError(
+                _(
+                    "Subprocess command failed: {command} with return code {code}."
+                ).format(command=" ".join(args), code=command.result.returncode)
+            )
+        if command.post_hook:
+            if self._call_hook(command.post_hook, command, nxt):
+                raise ExitEarly()
+        return command.result.returncode
+
+    def _echo(self, text: str, prefix: t.Optional[str] = None) -> None:
+        """
+        Echo a command as it is started. Commands that run concurrently are echoed with
+        the prefix of their output while holding the output lock, so the echo is not
+        interleaved with the output of other commands, see :meth:`_stream`.
+        """
+        if prefix is None:
+            self.secho(text, fg="cyan")
+            return
+        with self._output_lock:
+            self.stdout.write(f"{prefix}{self._style(text, fg='cyan')}")
+
+    def _manage_args(self) -> t.List[str]:
+        """
+        The arguments that invoke the manage script.
+        """
+        return (
+            [sys.executable, self.manage_script]
+            if self.manage_script.endswith(".py")
+            else [self.manage_script]
+        )
+
+    def _subprocess_args(self, command: RCommand) -> t.List[str]:
+        """
+        Build the arguments to run the command as a subprocess. Management command
+        options are converted to their command line form.
+
+        :raises: :exc:`~django.core.management.CommandError` if the options could not
+            be converted.
+        """
         options = []
         if isinstance(command, ManagementCommand):
             if command.options:
                 # Make a good faith effort to convert options to cli compatible format
                 # this is not very reliable which is why commands should avoid use of
                 # options and instead use CLI strings
-                cmd = get_command(command.command_name, BaseCommand)
-                actions = getattr(
-                    cmd.create_parser(self.manage_script, command.command_name),
-                    "_actions",
-                    [],
-                )
-                expected_opts = len(command.options)
-                for opt, value in command.options.items():
-                    for action in actions:
-                        opt_strs = getattr(action, "option_strings", [])
-                        if opt == getattr(action, "dest", None) and opt_strs:
-                            if isinstance(value, bool):
-                                if value is not getattr(action, "default", None):
-                                    options.append(opt_strs[-1])
-                                else:
-                                    expected_opts -= 1
-                            else:
-                                options.append(f"--{opt}={str(value)}")
-                            break
-
-                if len(options) != expected_opts:
+                schema = _option_schema(command.command_name)
+                if not set(command.options).issubset(schema):
                     raise CommandError(
                         _(
                             "Failed to convert {command} options to CLI format: "
@@ -395,13 +1353,16 @@ def _subprocess(
                             command=command.command_name, unconverted=command.options
                         )
                     )
+                for opt, value in command.options.items():
+                    opt_strs, default = schema[opt]
+                    if isinstance(value, bool):
+                        if value is not default:
+                            options.append(opt_strs[-1])
+                    else:
+                        options.append(f"--{opt}={str(value)}")
 
             args = [
-                *(
-                    [sys.executable, self.manage_script]
-                    if self.manage_script.endswith(".py")
-                    else [self.manage_script]
-                ),
+                *self._manage_args(),
                 *(
                     [command.command]
                     if isinstance(command.command, str)
@@ -411,30 +1372,280 @@ def _subprocess(
             ]
         else:
             args = [command.command_name, *command.command_args]
+        return args
 
-        if self.verbosity > 0:
-            self.secho(" ".join(args), fg="cyan")
+    def _fork(
+        self,
+        command: ManagementCommand,
+        args: t.List[str],
+        timeout: t.Optional[float] = None,
+    ) -> t.Tuple[subprocess.CompletedProcess, timeouts.Watchdog]:
+        """
+        Run a management command in a child process forked from this one. The child
+        inherits the already loaded interpreter and Django project so it does not pay
+        their startup costs. Like a subprocess, its output is written directly to the
+        process's stdout and stderr. If the routine is profiled the child writes the
+        command's profile before it exits.
 
-        command.result = subprocess.run(args, env=os.environ.copy())
-        self._results.append(command.result)
-        if command.result.returncode > 0:
-            raise CommandError(
-                _(
-                    "Subprocess command failed: {command} with return code {code}."
-                ).format(command=" ".join(args), code=command.result.returncode)
+        :param args: The equivalent subprocess arguments, used for the result.
+        :param timeout: The number of seconds the child may run for.
+        :return: The completed process and the watchdog that enforced the timeout.
+        """
+        for stream in {sys.stdout, sys.stderr, self.stdout._out, self.stderr._out}:
+            stream.flush()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - the child
+            code = 1
+            # the parent owns the inherited database connections, they must not be
+            # used or closed by the child - keep them referenced so they are never
+            # finalized and let the child open its own
+            inherited = connections.all(initialized_only=True)
+            for connection in inherited:
+                del connections[connection.alias]
+            try:
+                with self._profiled(command, forked=True):
+                    code, _ = _call_isolated(
+                        command.command_name, *command.command_args, **command.options
+                    )
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        with timeouts.Watchdog(pid, timeout) as watchdog:
+            status = watchdog.wait()
+        return (
+            subprocess.CompletedProcess(args, os.waitstatus_to_exitcode(status)),
+            watchdog,
+        )
+
+    def _batched(
+        self, command: ManagementCommand, args: t.List[str]
+    ) -> subprocess.CompletedProcess:
+        """
+        Get the result of a batched management command. The first command of a batch
+        that has not been run yet runs it along with the rest of the batch in one
+        subprocess, see :meth:`_run_batch`.
+
+        :param args: The subprocess arguments of the command.
+        :return: The completed process of the command.
+        """
+        if id(command) not in self._batch_results:
+            batch = self._batches[id(command)]
+            start = next(idx for idx, cmd in enumerate(batch) if cmd is command)
+            self._batch_results.update(self._run_batch(batch[start:]))
+        return self._batch_results.pop(id(command), None) or (
+            subprocess.CompletedProcess(args, 1)
+        )
+
+    def _run_batch(
+        self, commands: t.List[ManagementCommand]
+    ) -> t.Dict[int, subprocess.CompletedProcess]:
+        """
+        Run the management commands in order in a single subprocess using the internal
+        :meth:`run_batch` entry point. The batch stops at the first command that fails.
+
+        :return: The completed processes of the commands that were run keyed by the id
+            of their command. The value returned by each command is available as its
+            stdout.
+        """
+        args = [self._subprocess_args(cmd) for cmd in commands]
+        manage = self._manage_args()
+        with tempfile.TemporaryDirectory() as tmp:
+            spec = Path(tmp) / "batch.json"
+            results = Path(tmp) / "results.json"
+            spec.write_text(
+                json.dumps(
+                    {
+                        "commands": args,
+                        "skip": len(manage),
+                        "results": str(results),
+                    }
+                )
             )
-        if command.post_hook:
-            if load_hook(command.post_hook)(
-                self.routine, command, nxt, self._routine_options
+            proc = subprocess.run(
+                [
+                    *manage,
+                    __name__.rsplit(".", maxsplit=1)[-1],
+                    "--verbosity",
+                    str(self.verbosity),
+                    BATCH_COMMAND,
+                    str(spec),
+                ],
+                env=os.environ.copy(),
+            )
+            reported = json.loads(results.read_text()) if results.is_file() else []
+        completed = {
+            id(cmd): subprocess.CompletedProcess(
+                cmd_args, report["returncode"], stdout=report["result"]
+            )
+            for cmd, cmd_args, report in zip(commands, args, reported)
+        }
+        if (
+            proc.returncode
+            and len(reported) < len(commands)
+            and not any(report["returncode"] for report in reported)
+        ):
+            # the subprocess died before it could report on this command
+            completed[id(commands[len(reported)])] = subprocess.CompletedProcess(
+                args[len(reported)], proc.returncode
+            )
+        return completed
+
+    @subcommand(name=BATCH_COMMAND, hidden=True)
+    def run_batch(self, spec: Path):
+        """
+        Run a batch of management commands described by a spec file written by
+        :meth:`_run_batch` and report their results. This is an internal entry point.
+        """
+        batch = json.loads(spec.read_text())
+        results: t.List[t.Dict[str, t.Any]] = []
+        for args in batch["commands"]:
+            if self.verbosity > 0:
+                self.secho(" ".join(args), fg="cyan")
+            code, result = _call_isolated(*args[batch["skip"] :])
+            results.append(
+                {
+                    "returncode": code,
+                    "result": result if isinstance(result, str) else None,
+                }
+            )
+            Path(batch["results"]).write_text(json.dumps(results))
+            if code:
+                sys.exit(code)
+
+    def _style(self, text: str, **styles) -> str:
+        """
+        Style the text if color output is enabled.
+        """
+        if self.force_color or not self.no_color:
+            return click.style(text, **styles)
+        return text
+
+    def _stream(
+        self, args: t.List[str], prefix: str, timeout: t.Optional[float] = None
+    ) -> t.Tuple[subprocess.CompletedProcess, timeouts.Watchdog]:
+        """
+        Run a command as a subprocess and write each line of its stdout and stderr to
+        the routine's streams with the given prefix as soon as it is produced. Lines
+        from concurrently running commands are never broken up.
+
+        :param timeout: The number of seconds the subprocess may run for.
+        :return: The completed process and the watchdog that enforced the timeout.
+            The output of the process is not retained.
+        """
+
+        def pipe(src: t.IO[str], dest: OutputWrapper):
+            for line in src:
+                with self._output_lock:
+                    dest.write(f"{prefix}{line}")
+
+        with (
+            subprocess.Popen(
+                args,
+                env=os.environ.copy(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                errors="replace",
+                bufsize=1,
+            ) as proc,
+            timeouts.Watchdog(proc, timeout) as watchdog,
+        ):
+            assert proc.stdout and proc.stderr
+            errors = threading.Thread(
+                target=pipe, args=(proc.stderr, self.stderr), daemon=True
+            )
+            errors.start()
+            pipe(proc.stdout, self.stdout)
+            errors.join()
+            proc.wait()
+        return subprocess.CompletedProcess(args, proc.returncode), watchdog
+
+    def _logged(
+        self,
+        args: t.List[str],
+        name: str,
+        prefix: t.Optional[str] = None,
+        timeout: t.Optional[float] = None,
+    ) -> t.Tuple[subprocess.CompletedProcess, timeouts.Watchdog]:
+        """
+        Run a command as a subprocess and write its stdout and stderr to log files in
+        the routine's log directory as the output is produced. At a verbosity above one
+        the output is also written to the routine's streams, prefixed if a prefix is
+        given. If the routine keeps a tail of its logs, the last lines of each stream
+        are attached to the result as its stdout and stderr.
+
+        :param name: The base name of the command's log files.
+        :param timeout: The number of seconds the subprocess may run for.
+        :return: The completed process and the watchdog that enforced the timeout.
+        """
+        assert self.routine
+        directory = Path(self._routine_options["log_dir"])
+        tails: t.Dict[str, logs.Tail] = {}
+        captures = []
+        with ExitStack() as stack:
+            for stream, dest in (("stdout", self.stdout), ("stderr", self.stderr)):
+                sinks: t.List[t.Any] = [
+                    stack.enter_context(
+                        logs.RotatingLog(
+                            directory / f"{name}.{stream}.log",
+                            self.routine.log_max_bytes,
+                        )
+                    )
+                ]
+                if self.routine.log_tail:
+                    tails[stream] = logs.Tail(self.routine.log_tail)
+                    sinks.append(tails[stream])
+                if self.verbosity > 1:
+
+                    def tee(line: str, dest: OutputWrapper = dest):
+                        with self._output_lock:
+                            dest.write(f"{prefix or ''}{line}", ending="")
+
+                    sinks.append(logs.Lines(tee))
+                captures.append(sinks)
+
+            def capture(source: t.BinaryIO, sinks: t.List[t.Any]):
+                try:
+                    logs.pump(source, [sink.write for sink in sinks])
+                finally:
+                    for sink in sinks:
+                        getattr(sink, "close", lambda: None)()
+
+            with (
+                subprocess.Popen(
+                    args,
+                    env=os.environ.copy(),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                ) as proc,
+                timeouts.Watchdog(proc, timeout) as watchdog,
             ):
-                raise ExitEarly()
-        return command.result.returncode
+                assert proc.stdout and proc.stderr
+                errors = threading.Thread(
+                    target=capture, args=(proc.stderr, captures[1]), daemon=True
+                )
+                errors.start()
+                capture(proc.stdout, captures[0])
+                errors.join()
+                proc.wait()
+        return (
+            subprocess.CompletedProcess(
+                args,
+                proc.returncode,
+                stdout=tails["stdout"].text() if tails else None,
+                stderr=tails["stderr"].text() if tails else None,
+            ),
+            watchdog,
+        )
 
     def _list(self) -> None:
         """
         List the commands that are part of the execution plan given the active
-        routine and switches.
+        routine and switches. Commands whose inputs have not changed since they last
+        succeeded are marked unchanged, or cached if their outputs can be restored.
         """
+        assert self.routine
         for command in self.plan:
             priority = str(command.priority)
             cmd_str = command.command_str
@@ -470,47 +1681,348 @@ def _list(self) -> None:
                 )
 
             opt_str = f" ({opt_str})" if opt_str else ""
-            self.secho(f"[{priority}] {cmd_str}{opt_str}{switches_str}")
+            unchanged = ""
+            digest = _digest(command)
+            if digest and command.outputs:
+                if artifacts.load(command, digest) is not None:
+                    unchanged = self._style(f" [{_('cached')}]", fg="green")
+            elif digest and inputs.unchanged(self.routine.name, command, digest):
+                unchanged = self._style(f" [{_('unchanged')}]", fg="green")
+            self.secho(f"[{priority}] {cmd_str}{opt_str}{switches_str}{unchanged}")
+
+
+def _call_isolated(name: str, *args, **options) -> t.Tuple[int, t.Any]:
+    """
+    Call a management command in a process that runs it on behalf of a routine and
+    report errors the way a ``manage.py`` invocation of the command would.
+
+    :return: A 2-tuple of the exit code and the value returned by the command.
+    """
+    try:
+        return 0, call_command(name, *args, **options)
+    except SystemExit as exit:
+        return exit.code if isinstance(exit.code, int) else int(bool(exit.code)), None
+    except CommandError as err:
+        sys.stderr.write(f"{err.__class__.__name__}: {err}\n")
+        return getattr(err, "returncode", 1), None
+    # like manage.py, any error of the command is reported and becomes its exit code
+    except Exception:  # noqa: BLE001
+        traceback.print_exc()
+        return 1, None
+
+
+_COMMAND_FIELDS = (
+    "command",
+    "switches",
+    "after",
+    "inputs",
+    "input_settings",
+    "input_env",
+    "outputs",
+)
+
+
+def _run_copy(routine: Routine) -> Routine:
+    """
+    Copy a routine for a run. Hooks modify commands and results are stored on them,
+    so each command is copied with the routine's hooks applied and its own copies of
+    its arguments, options and other sequences, which hooks may modify in place. The
+    rest of the configuration is shared with the given routine.
+    """
+    commands: t.List[RCommand] = []
+    for command in routine.commands:
+        command = copy(command)
+        command.pre_hook = command.pre_hook or routine.pre_hook
+        command.post_hook = command.post_hook or routine.post_hook
+        for name in _COMMAND_FIELDS:
+            setattr(command, name, copy(getattr(command, name)))
+        if isinstance(command, ManagementCommand):
+            command.options = {
+                name: copy(value) for name, value in command.options.items()
+            }
+        commands.append(command)
+    run = copy(routine)
+    run.commands = commands
+    return run
+
+
+@contextmanager
+def _sampled_child(path: Path) -> t.Iterator[None]:
+    """
+    Sample the code run in the context of a forked child. Interval timers are not
+    inherited by children so the child runs its own sampler.
+    """
+    with sampling.Sampler() as sampler, sampler.sampled(path):
+        yield
+
+
+def _out_of_time(exc: BaseException) -> bool:
+    """
+    :return: True if the exception reports that the routine ran out of time, which
+        stops the routine even if it continues on errors.
+    """
+    return isinstance(exc, CommandTimeout) and exc.budget
+
+
+def _digest(command: RCommand) -> t.Optional[str]:
+    """
+    :return: The :func:`~django_routines.inputs.digest` of the command's inputs, or None
+        if it does not declare any or there is nowhere to record them.
+    """
+    if not inputs.declared(command):
+        return None
+    if not (artifacts.artifact_dir() if command.outputs else cache.cache_dir()):
+        return None
+    return inputs.digest(command)
+
+
+def _batches(plan: t.List[RCommand]) -> t.Dict[int, t.List[ManagementCommand]]:
+    """
+    Group runs of adjacent management commands that do not have hooks into batches
+    that may be run in a single subprocess. Hooks must run between commands so
+    commands with hooks are never batched, nor are commands that may be skipped
+    because their inputs have not changed or that have their own timeout.
+
+    :return: A mapping of the ids of the batched commands to their batch.
+    """
+    batches: t.Dict[int, t.List[ManagementCommand]] = {}
+    batch: t.List[ManagementCommand] = []
+    for command in [*plan, None]:
+        if isinstance(command, ManagementCommand) and not (
+            command.pre_hook
+            or command.post_hook
+            or inputs.declared(command)
+            or command.timeout is not None
+        ):
+            batch.append(command)
+            continue
+        if len(batch) > 1:
+            batches.update({id(cmd): batch for cmd in batch})
+        batch = []
+    return batches
+
+
+def _option_schema_key(command_name: str) -> t.Optional[str]:
+    """
+    The cache key of a management command's option schema. This is a hash of the
+    location and modification time of the module that defines the command, which is
+    found without importing it.
+
+    :return: The key, or None if the schema should not be persisted.
+    """
+    if not cache.cache_dir():
+        return None
+    app = get_commands().get(command_name)
+    if not app:
+        return None
+    try:
+        spec = find_spec(f"{app}.management.commands.{command_name}")
+        if not spec or not spec.origin:
+            return None
+        modified = os.stat(spec.origin).st_mtime_ns
+    except (ImportError, ValueError, OSError):
+        return None
+    return cache.fingerprint(command_name, spec.origin, modified, __version__)
+
+
+def _option_schema(
+    command_name: str,
+) -> t.Dict[str, t.Tuple[t.Tuple[str, ...], t.Optional[bool]]]:
+    """
+    Get the option schema of a management command: its command line option strings
+    and, for boolean flags, their default keyed by the option's destination. Schemas
+    are built from the command's parser once per process and persisted to the
+    :setting:`DJANGO_ROUTINES_CACHE_DIR` if it is configured, so the command does not
+    have to be imported to convert its options.
+    """
+    schema = _option_schemas.get(command_name)
+    if schema is not None:
+        return schema
+    key = _option_schema_key(command_name)
+    artifact = f"options-{to_symbol(command_name)}-{{}}.pickle"
+    schema = cache.read(artifact.format(key)) if key else None
+    if schema is None:
+        schema = {}
+        cmd = get_command(command_name, BaseCommand)
+        for action in getattr(
+            cmd.create_parser("manage.py", command_name), "_actions", []
+        ):
+            opt_strs = getattr(action, "option_strings", [])
+            dest = getattr(action, "dest", None)
+            if opt_strs and dest and dest not in schema:
+                default = getattr(action, "default", None)
+                schema[dest] = (
+                    tuple(opt_strs),
+                    default if isinstance(default, bool) else None,
+                )
+        if key:
+            cache.write(artifact.format(key), schema, prune=artifact.format("*"))
+    _option_schemas[command_name] = schema
+    return schema
+
+
+def _dependencies(
+    routine: Routine, plan: t.List[RCommand]
+) -> t.List[t.Optional[t.List[int]]]:
+    """
+    Resolve the :attr:`~django_routines.ManagementCommand.after` declarations of the
+    commands in the plan to the plan indexes they depend on.
 
+    :return: A list of dependency indexes for each command in the plan, or None for
+        commands that depend on all of the commands before them.
+    :raises: :exc:`~django.core.management.CommandError` if a declaration does not
+        refer to any command in the routine or only to commands ordered after it.
+    """
+    indexes: t.Dict[str, t.List[int]] = {}
+    for idx, command in enumerate(plan):
+        for ref in {command.command_name, command.label} - {None}:
+            indexes.setdefault(t.cast(str, ref), []).append(idx)
+    known = {
+        ref
+        for command in routine.commands
+        for ref in (command.command_name, command.label)
+        if ref
+    }
+    depends: t.List[t.Optional[t.List[int]]] = []
+    for idx, command in enumerate(plan):
+        if command.after is None:
+            depends.append(None)
+            continue
+        deps: t.Set[int] = set()
+        for ref in command.after:
+            if ref not in known:
+                raise CommandError(
+                    _(
+                        "{command} is declared to run after unknown command {ref}."
+                    ).format(command=command.command_str, ref=ref)
+                )
+            matches = indexes.get(ref, [])
+            before = matches[: bisect.bisect_left(matches, idx)]
+            if not before and matches[-1:] > [idx]:
+                raise CommandError(
+                    _(
+                        "{command} is declared to run after {ref}, but {ref} is "
+                        "ordered after it."
+                    ).format(command=command.command_str, ref=ref)
+                )
+            deps.update(before)
+        depends.append(sorted(deps))
+    return depends
 
-for routine in routines():
+
+def _compile_routine(routine: Routine) -> t.Dict[str, t.Any]:
+    """
+    Generate the subcommand group function and help text for the given routine.
+
+    :return: A registry record that may be passed to :func:`_register_record`. The
+        generated function is stored as marshalled bytecode so the record may be
+        persisted to the :setting:`DJANGO_ROUTINES_CACHE_DIR`.
+    """
+    width = globals()["width"]
     switches = routine.switches
     switch_args = ", ".join(
         [
-            f"{to_symbol(switch, check_keyword=True)}: Annotated[bool, typer.Option('{to_cli_option(switch)}', help='{routine.switch_helps.get(switch, '')}')] = False"
+            f"{SWITCH_PREFIX}{to_symbol(switch)}: Annotated[bool, typer.Option('{to_cli_option(switch)}', help='{routine.switch_helps.get(switch, '')}')] = False"
             for switch in switches
         ]
     )
     add_switches = ""
+    switch_options = ""
     for switch in switches:
-        add_switches += f'\n    if all or {to_symbol(switch, check_keyword=True)}: self.switches.append("{switch}")'
+        add_switches += f'\n    if all or {SWITCH_PREFIX}{to_symbol(switch)}: self.switches.append("{switch}")'
+        switch_options += f'"{to_symbol(switch, check_keyword=True)}": {SWITCH_PREFIX}{to_symbol(switch)}, '
+    switch_flags = {to_cli_option(switch) for switch in switches}
+
+    def opt(flag: str) -> str:
+        # switches keep their flags, the routine options they shadow are renamed
+        while flag in switch_flags:
+            flag = f"--routine-{flag[2:]}"
+        return flag
 
     cmd_code = COMMAND_TMPL.format(
         routine_func=to_symbol(routine.name, check_keyword=True),
         routine=routine.name,
         switch_args=switch_args,
         add_switches=add_switches,
-        subprocess_opt="--no-subprocess" if routine.subprocess else "--subprocess",
+        switch_options=switch_options,
+        switch_prefix=SWITCH_PREFIX,
+        subprocess_opt=opt("--no-subprocess" if routine.subprocess else "--subprocess"),
         subprocess_help=(
             _("Do not run commands as subprocesses.")
             if routine.subprocess
             else _("Run commands as subprocesses.")
         ),
         subprocess=routine.subprocess,
-        atomic_opt="--non-atomic" if routine.atomic else "--atomic",
+        batch_opt=opt("--no-batch" if routine.batch else "--batch"),
+        batch_help=(
+            _("Run each management command in its own subprocess.")
+            if routine.batch
+            else _("Run adjacent management commands in the same subprocess.")
+        ),
+        fork_opt=opt("--no-fork" if routine.fork else "--fork"),
+        fork_help=(
+            _("Do not fork subprocesses from the routine process.")
+            if routine.fork
+            else _("Fork subprocesses from the routine process.")
+        ),
+        atomic_opt=opt("--non-atomic" if routine.atomic else "--atomic"),
         atomic_help=(
             _("Do not run all commands in the same transaction.")
             if routine.atomic
             else _("Run all commands in the same transaction.")
         ),
         atomic=routine.atomic,
-        continue_opt="--halt" if routine.continue_on_error else "--continue",
+        continue_opt=opt("--halt" if routine.continue_on_error else "--continue"),
         continue_help=(
             _("Halt if any command fails.")
             if routine.continue_on_error
             else _("Continue through the routine if any commands fail.")
         ),
         continue_on_error=routine.continue_on_error,
+        jobs_opt=opt("--jobs"),
+        retain_opt=opt("--retain"),
+        log_dir_opt=opt("--log-dir"),
+        time_budget_opt=opt("--time-budget"),
+        force_opt=opt("--force"),
+        resume_opt=opt("--resume"),
+        timings_opt=opt("--timings"),
+        memory_opt=opt("--memory"),
+        profile_opt=opt("--profile"),
+        sample_opt=opt("--sample"),
+        profile_dir_opt=opt("--profile-dir"),
+        all_opt=opt("--all"),
+        jobs_help=_("The maximum number of commands to run concurrently."),
+        retain_help=_(
+            "The command results to keep: all, codes, spill or the number of most "
+            "recent results."
+        ),
+        log_dir_help=_(
+            "Write the output of subprocesses to log files in this directory."
+        ),
+        time_budget_help=_(
+            "The number of seconds the routine may run for. Commands still running "
+            "when it runs out are stopped."
+        ),
+        force_help=_("Run commands even if their inputs have not changed."),
+        resume_help=_(
+            "Skip the commands that succeeded in the last run of the routine if it "
+            "did not finish."
+        ),
+        timings_help=_("Print the slowest commands when the routine finishes."),
+        memory_help=_(
+            "Record the memory used by each command and print it when the routine "
+            "finishes."
+        ),
+        profile_help=_(
+            "Profile each command and print a summary when the routine finishes."
+        ),
+        sample_help=_(
+            "Sample the stacks of commands instead of profiling every call. Implies "
+            "--profile."
+        ),
+        profile_dir_help=_(
+            "Write the profile of each command to this directory. Implies --profile."
+        ),
         all_help=_("Include all switched commands."),
     )
 
@@ -536,8 +2048,6 @@ def _list(self) -> None:
         )
         command_strings.append(f"[{priority}] {cmd_str}{switches_str}")
 
-    exec(cmd_code)
-
     if not use_rich and command_strings:
         width = max([len(cmd) for cmd in command_strings])
     ruler = f"[underline]{' ' * width}[/underline]\n" if use_rich else "-" * width
@@ -547,13 +2057,126 @@ def _list(self) -> None:
     help_txt = (
         f"{lb}{routine.help_text}\n{ruler}{lb}{'' if use_rich else lb}{cmd_strings}\n"
     )
+    return {
+        "name": routine.name,
+        "func": to_symbol(routine.name, check_keyword=True),
+        "code": marshal.dumps(compile(cmd_code, f"<routine {routine.name}>", "exec")),
+        "help": help_txt,
+        "short_help": routine.help_text,
+    }
+
+
+def _register_record(record: t.Dict[str, t.Any]) -> None:
+    """
+    Register the subcommand group described by the given registry record on the
+    routine :class:`Command`. Routines that have already been registered are skipped.
+    """
+    if record["name"] in _registered:
+        return
+    _registered.add(record["name"])
+    namespace: t.Dict[str, t.Any] = {}
+    # records are only loaded from trusted cache entries, see django_routines.cache
+    exec(marshal.loads(record["code"]), globals(), namespace)  # noqa: S302
     grp = Command.group(
-        name=routine.name.replace("_", "-"),
-        help=help_txt,
-        short_help=routine.help_text,
+        name=record["name"].replace("_", "-"),
+        help=record["help"],
+        short_help=record["short_help"],
         invoke_without_command=True,
-    )(locals()[to_symbol(routine.name, check_keyword=True)])
+    )(namespace[record["func"]])
 
     @grp.command(name="list", help=_("List the commands that will be run."))
     def list(self):
         self._list()
+
+
+def _registry_key() -> t.Optional[str]:
+    """
+    The cache key of the compiled routine registry. This is a hash of the routine
+    configuration and everything else that influences the generated subcommands.
+
+    :return: The key, or None if the registry should not be persisted.
+    """
+    from django.conf import settings
+
+    if not cache.cache_dir():
+        return None
+    return cache.fingerprint(
+        getattr(settings, ROUTINE_SETTING, None),
+        get_language(),
+        use_rich,
+        width,
+        COMMAND_TMPL,
+        __version__,
+        importlib.util.MAGIC_NUMBER,
+    )
+
+
+def _register_routines(names: t.Optional[t.Iterable[str]] = None) -> None:
+    """
+    Register the subcommand groups for the given routine names. If no names are given,
+    or none of the names resolve to a configured routine, all routines are registered.
+
+    Compiled registry records are loaded from and saved to the
+    :setting:`DJANGO_ROUTINES_CACHE_DIR` if it is configured.
+    """
+    from django.conf import settings
+
+    global _all_registered
+    if _all_registered:
+        return
+    key = _registry_key()
+    records: t.Dict[str, t.Dict[str, t.Any]] = (
+        cache.read(f"registry-{key}.pickle") if key else None
+    ) or {}
+    compiled = False
+
+    def register(name: str) -> None:
+        nonlocal compiled
+        symbol = to_symbol(name).lower()
+        if symbol not in records:
+            records[symbol] = _compile_routine(get_routine(name))
+            compiled = True
+        _register_record(records[symbol])
+
+    found = False
+    for name in names or []:
+        try:
+            register(name)
+            found = True
+        except KeyError:
+            continue
+    if not found:
+        for name in getattr(settings, ROUTINE_SETTING, None) or {}:
+            register(name)
+        _all_registered = True
+
+    if key and compiled:
+        cache.write(
+            f"registry-{key}.pickle",
+            {
+                symbol: {**record, "short_help": str(record["short_help"])}
+                for symbol, record in records.items()
+            },
+            prune="registry-*.pickle",
+        )
+
+
+def _requested_routines() -> t.Optional[t.List[str]]:
+    """
+    If the routine command is being invoked directly from the command line, return
+    the positional arguments that may name the routine being run. Otherwise return
+    None.
+    """
+    if sys.argv[1:2] != [__name__.rsplit(".", maxsplit=1)[-1]]:
+        return None
+    return [arg for arg in sys.argv[2:] if not arg.startswith("-")]
+
+
+_registered: t.Set[str] = set()
+_all_registered = False
+_option_schemas: t.Dict[
+    str, t.Dict[str, t.Tuple[t.Tuple[str, ...], t.Optional[bool]]]
+] = {}
+
+if not _lazy():
+    _register_routines()
@@ -0,0 +1,220 @@
+"""
+Memory instrumentation for the commands of a routine run with ``--memory``. The memory
+use of each command in the execution plan is recorded on its
+:class:`~django_routines.management.commands.routine.CommandRun` and a table of the
+commands that used the most memory is printed when the routine finishes.
+
+* Management commands run in process are traced with :mod:`tracemalloc`, which records
+  their peak allocations and the sites that allocated the most memory they still held
+  when they finished. Only one in process command is traced at a time, so concurrently
+  running in process commands are serialized.
+* The resource use of subprocesses, including forked management commands, is the
+  difference in :func:`resource.getrusage` of ``RUSAGE_CHILDREN`` over the command.
+  Other threads may wait for children too, so it is only recorded when the routine
+  runs one job at a time.
+"""
+
+import sys
+import threading
+import tracemalloc
+import typing as t
+from dataclasses import dataclass, field
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - windows
+    resource = None  # type: ignore[assignment]
+
+SITES = 5
+"""
+The number of allocation sites recorded for each traced command.
+"""
+
+FRAMES = 1
+"""
+The number of frames :mod:`tracemalloc` stores for each allocation.
+"""
+
+_lock = threading.Lock()
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+@dataclass(slots=True)
+class Usage:
+    """
+    The memory and resources a command in the execution plan used. Sizes are in bytes,
+    measurements that were not taken are None.
+    """
+
+    peak: t.Optional[int] = None
+    """
+    The most memory allocated by Python while the command ran in process, above what
+    was allocated when it started.
+    """
+
+    sites: t.List[t.Tuple[str, int]] = field(default_factory=list)
+    """
+    The ``file:line`` sites that allocated the most memory the command still held when
+    it finished, with the size they held, largest first.
+    """
+
+    maxrss: t.Optional[int] = None
+    """
+    The peak resident set size of the largest child process waited for during the
+    command. The operating system only keeps the high-water mark of all children, so
+    this is only known if it was raised by a child of the command.
+    """
+
+    cpu: t.Optional[float] = None
+    """
+    The CPU time in seconds of the child processes waited for during the command.
+    """
+
+    inblock: t.Optional[int] = None
+    """
+    The number of block input operations of the child processes.
+    """
+
+    oublock: t.Optional[int] = None
+    """
+    The number of block output operations of the child processes.
+    """
+
+
+def _maxrss(usage: t.Any) -> int:
+    # linux reports kilobytes, macOS reports bytes
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+class Children:
+    """
+    A context manager that records the resources used by the child processes of this
+    process that exit and are waited for in its context in a :class:`Usage`. Nothing
+    is recorded where :mod:`resource` is not available.
+
+    :param usage: The usage to record to.
+    """
+
+    def __init__(self, usage: Usage):
+        self.usage = usage
+
+    def __enter__(self) -> Usage:
+        self._start = resource.getrusage(resource.RUSAGE_CHILDREN) if resource else None
+        return self.usage
+
+    def __exit__(self, *exc_info) -> None:
+        if self._start is None:  # pragma: no cover - windows
+            return
+        start = self._start
+        end = resource.getrusage(resource.RUSAGE_CHILDREN)
+        if end.ru_maxrss > start.ru_maxrss:
+            self.usage.maxrss = _maxrss(end)
+        self.usage.cpu = (end.ru_utime + end.ru_stime) - (
+            start.ru_utime + start.ru_stime
+        )
+        self.usage.inblock = end.ru_inblock - start.ru_inblock
+        self.usage.oublock = end.ru_oublock - start.ru_oublock
+
+
+class Traced:
+    """
+    A context manager that traces the memory allocated by Python in its context with
+    :mod:`tracemalloc` and records it in a :class:`Usage`. Tracing is started for the
+    context unless it is already running. Contexts wait for other traced contexts in
+    this process to finish first.
+
+    :param usage: The usage to record to.
+    :param sites: The number of allocation sites to record.
+    """
+
+    def __init__(self, usage: Usage, sites: int = SITES):
+        self.usage = usage
+        self.sites = sites
+
+    def __enter__(self) -> Usage:
+        _lock.acquire()
+        self._started = not tracemalloc.is_tracing()
+        self._before = None
+        if self._started:
+            tracemalloc.start(FRAMES)
+        else:
+            self._before = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+            tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+        return self.usage
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self.usage.peak = max(tracemalloc.get_traced_memory()[1] - self._base, 0)
+            after = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+            statistics = (
+                after.compare_to(self._before, "lineno")
+                if self._before
+                else after.statistics("lineno")
+            )
+            self.usage.sites = [
+                (f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", held)
+                for stat in statistics
+                if (held := getattr(stat, "size_diff", stat.size)) > 0
+            ]
+            self.usage.sites.sort(key=lambda site: site[1], reverse=True)
+            del self.usage.sites[self.sites :]
+        finally:
+            if self._started:
+                tracemalloc.stop()
+            self._before = None
+            _lock.release()
+
+
+def size(num: t.Optional[int]) -> str:
+    """
+    :return: A human readable size in bytes, or ``-`` if it is not known.
+    """
+    if num is None:
+        return "-"
+    value = float(num)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(value) < 1024 or unit == "GiB":
+            break
+        value /= 1024
+    return f"{num} B" if unit == "B" else f"{value:.1f} {unit}"
+
+
+def table(
+    rows: t.Iterable[t.Tuple[int, str, str, Usage]],
+    limit: t.Optional[int] = None,
+) -> t.List[str]:
+    """
+    Format memory use as a table sorted from the command that used the most memory to
+    the least. The allocation sites of each traced command are listed below it.
+
+    :param rows: 4-tuples of the plan index, command string, status and usage of each
+        command.
+    :param limit: The maximum number of commands to include.
+    :return: The lines of the table.
+    """
+    ranked = sorted(
+        rows, key=lambda row: max(row[3].peak or 0, row[3].maxrss or 0), reverse=True
+    )[:limit]
+    lines = [
+        f"{'#':>4}  {'Peak':>10}  {'Max RSS':>10}  {'CPU':>9}  {'Blocks in':>10}  "
+        f"{'Blocks out':>10}  {'Status':<10}  Command"
+    ]
+    for idx, command, status, usage in ranked:
+        cpu = "-" if usage.cpu is None else f"{usage.cpu:.3f}s"
+        inblock = "-" if usage.inblock is None else str(usage.inblock)
+        oublock = "-" if usage.oublock is None else str(usage.oublock)
+        lines.append(
+            f"{idx:>4}  {size(usage.peak):>10}  {size(usage.maxrss):>10}  {cpu:>9}  "
+            f"{inblock:>10}  {oublock:>10}  {status:<10}  "
+            f"{' '.join(command.splitlines())}"
+        )
+        for site, held in usage.sites:
+            lines.append(f"{'':>4}  {size(held):>10}  {site}")
+    return lines
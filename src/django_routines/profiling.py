@@ -0,0 +1,110 @@
+"""
+Deterministic profiling of the commands of a routine run with ``--profile``. Each
+command in the execution plan is profiled separately with :mod:`cProfile` and its
+statistics are written to a ``.prof`` file named after its plan index, see
+:func:`~django_routines.logs.log_name`. The files may be loaded with :mod:`pstats` or
+tools like snakeviz.
+
+* Management commands run in process, or in a forked child, are profiled in the process
+  that runs them. Only one in process command is profiled at a time, so concurrently
+  running in process commands are serialized.
+* Python scripts and modules run as subprocesses are run under ``python -m cProfile``.
+  Other subprocesses can not be profiled.
+
+When the routine finishes the profiles are merged and a summary of the functions with
+the most cumulative time is printed.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import typing as t
+from contextlib import contextmanager
+from pathlib import Path
+
+from django_routines.logs import log_name
+
+TOP = 25
+"""
+The number of functions included in the summary of the profiles of a routine run.
+"""
+
+_lock = threading.Lock()
+
+
+def profile_name(index: int, name: str) -> str:
+    """
+    :return: The file name of the profile of the command at the given plan index.
+    """
+    return f"{log_name(index, name)}.prof"
+
+
+@contextmanager
+def profiled(path: t.Optional[Path], exclusive: bool = True) -> t.Iterator[None]:
+    """
+    Profile the code run in the context on the current thread and write the
+    statistics to the given path. The statistics are written even if the code raises.
+
+    :param path: Where to write the statistics, if None nothing is profiled.
+    :param exclusive: Wait for other profiled code in this process to finish first.
+        Only one profiler may be active at a time on Python 3.12 and later.
+    """
+    if path is None:
+        yield
+        return
+    with _lock if exclusive else _unlocked():
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+
+
+@contextmanager
+def _unlocked() -> t.Iterator[None]:
+    yield
+
+
+def wrap(args: t.List[str], path: Path, profiler: str = "cProfile") -> t.List[str]:
+    """
+    Wrap the arguments of a subprocess to run it under :mod:`cProfile` if it runs a
+    Python script or module.
+
+    :param args: The arguments of the subprocess.
+    :param path: Where the subprocess should write its statistics.
+    :param profiler: The profiler module to run the subprocess under. It must accept
+        the ``-o`` option like :mod:`cProfile`, see :mod:`django_routines.sampling`.
+    :return: The wrapped arguments, or the arguments unchanged if the subprocess is not
+        a Python script or module.
+    """
+    if (
+        len(args) < 2
+        or not os.path.basename(args[0]).lower().startswith("python")
+        or (args[1].startswith("-") and args[1] != "-m")
+    ):
+        return args
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return [args[0], "-m", profiler, "-o", str(path), *args[1:]]
+
+
+def summary(paths: t.Iterable[Path], top: int = TOP) -> t.Optional[str]:
+    """
+    Merge the statistics in the given profiles.
+
+    :param paths: The profiles to merge, missing profiles are ignored.
+    :param top: The number of functions to include.
+    :return: A table of the functions with the most cumulative time, or None if there
+        are no profiles.
+    """
+    existing = [str(path) for path in paths if path.is_file()]
+    if not existing:
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(*existing, stream=out)
+    stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    return out.getvalue()
@@ -0,0 +1,125 @@
+"""
+Retention policies for the results of the commands run by a routine. See
+:attr:`~django_routines.Routine.retain`.
+
+* ``all``: keep every result in memory (the default).
+* ``codes``: keep only the return codes of subprocess results, in process results are
+  kept as None.
+* ``spill``: pickle results to a temporary file as they are produced and load them one
+  at a time when they are iterated over.
+* an integer ``N``: keep the results of the last ``N`` commands in memory.
+"""
+
+import os
+import pickle
+import tempfile
+import threading
+import typing as t
+from collections import deque
+from contextlib import ExitStack
+
+ALL = "all"
+CODES = "codes"
+SPILL = "spill"
+
+Retain = t.Union[str, int]
+
+
+def parse(policy: Retain) -> Retain:
+    """
+    Normalize a retention policy.
+
+    :param policy: One of ``all``, ``codes``, ``spill`` or a positive number of results
+        to keep, which may be given as a string.
+    :return: The policy string or the number of results to keep.
+    :raises: :exc:`ValueError` if the policy is not valid.
+    """
+    if policy in (ALL, CODES, SPILL):
+        return policy
+    try:
+        keep = int(policy)
+    except (TypeError, ValueError):
+        keep = 0
+    if keep < 1:
+        raise ValueError(
+            f"Result retention must be {ALL}, {CODES}, {SPILL} or a positive integer: "
+            f"{policy!r}"
+        )
+    return keep
+
+
+def return_code(result: t.Any) -> t.Optional[int]:
+    """
+    :return: The return code of a subprocess result, or None for in process results.
+    """
+    return getattr(result, "returncode", None)
+
+
+class Codes(list):
+    """
+    A list that only keeps the return codes of the results appended to it.
+    """
+
+    def append(self, result: t.Any) -> None:
+        super().append(return_code(result))
+
+
+class Spilled:
+    """
+    An append only collection of results that are pickled to a temporary file.
+    Iterating over it lazily loads the results in the order they were appended. Results
+    that cannot be pickled are stored as their :func:`repr`. The file is removed by
+    :meth:`close` or when it is used as a context manager.
+    """
+
+    def __init__(self):
+        self._stack = ExitStack()
+        # closed with the exit stack
+        self._file = self._stack.enter_context(tempfile.TemporaryFile())  # noqa: SIM115
+        self._offsets: t.List[int] = []
+        self._lock = threading.Lock()
+
+    def append(self, result: t.Any) -> None:
+        try:
+            data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            data = pickle.dumps(repr(result), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._offsets.append(self._file.seek(0, os.SEEK_END))
+            self._file.write(data)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __iter__(self) -> t.Iterator[t.Any]:
+        for idx in range(len(self._offsets)):
+            with self._lock:
+                self._file.seek(self._offsets[idx])
+                # the file is private to this process and only holds our pickles
+                result = pickle.load(self._file)  # noqa: S301
+            yield result
+
+    def close(self) -> None:
+        self._stack.close()
+
+    def __enter__(self) -> "Spilled":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def store(policy: Retain) -> t.Union[t.List[t.Any], t.Deque[t.Any], Spilled]:
+    """
+    Create the collection that retains results under the given policy. Results are
+    added to it with ``append`` and it may be iterated over.
+
+    :param policy: A policy returned by :func:`parse`.
+    """
+    if policy == ALL:
+        return []
+    if policy == CODES:
+        return Codes()
+    if policy == SPILL:
+        return Spilled()
+    return deque(maxlen=int(policy))
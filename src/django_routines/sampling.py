@@ -0,0 +1,239 @@
+"""
+A low overhead sampling profiler for the commands of a routine run with ``--sample``.
+Instead of tracing every call like :mod:`cProfile`, the stacks of the threads running
+commands are sampled every :data:`INTERVAL` seconds and counted, so sampling may be left
+enabled for production runs.
+
+The samples of each command in the execution plan are written to a ``.folded`` file
+named after its plan index in the collapsed stack format understood by flamegraph tools
+like ``flamegraph.pl``, speedscope and inferno: one line per distinct stack with its
+frames separated by semicolons from the outermost to the innermost, followed by the
+number of times it was sampled. Stacks start at the frame that ran the command.
+
+* When commands are run one at a time on the main thread the samples are driven by a
+  ``SIGPROF`` interval timer, which counts the CPU time of the process. Time spent
+  waiting is not sampled.
+* Otherwise, or where ``SIGPROF`` is not available, a background thread samples the
+  commands every :data:`INTERVAL` seconds of wall clock time.
+* Python scripts and modules run as subprocesses are run under
+  ``python -m django_routines.sampling`` which samples the subprocess in the same way.
+"""
+
+import argparse
+import os
+import runpy
+import signal
+import sys
+import threading
+import typing as t
+from collections import Counter
+from pathlib import Path
+from types import CodeType, FrameType
+
+from django_routines.logs import log_name
+
+INTERVAL = 0.01
+"""
+The number of seconds between samples.
+"""
+
+TOP = 25
+"""
+The number of functions included in the summary of the samples of a routine run.
+"""
+
+
+def sample_name(index: int, name: str) -> str:
+    """
+    :return: The file name of the samples of the command at the given plan index.
+    """
+    return f"{log_name(index, name)}.folded"
+
+
+class Sampler:
+    """
+    Samples the stacks of the threads that are running :meth:`sampled` code. A sampler
+    must be started before code can be sampled and may be used as a context manager
+    that starts and stops it.
+
+    :param interval: The number of seconds between samples.
+    :param threaded: Sample from a background thread even if a ``SIGPROF`` timer could
+        be used. A timer can only drive samples of the main thread reliably.
+    """
+
+    def __init__(self, interval: float = INTERVAL, threaded: bool = False):
+        self.interval = interval
+        self.threaded = threaded or not (
+            hasattr(signal, "SIGPROF")
+            and threading.current_thread() is threading.main_thread()
+        )
+        self._tracked: t.Dict[int, t.Tuple[Counter, t.Set[int]]] = {}
+        self._names: t.Dict[CodeType, str] = {}
+        self._thread: t.Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._previous: t.Any = None
+
+    def start(self) -> None:
+        """
+        Start taking samples.
+        """
+        if self.threaded:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        else:
+            self._previous = signal.signal(signal.SIGPROF, self._handle)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self) -> None:
+        """
+        Stop taking samples.
+        """
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        elif self._previous is not None:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._previous)
+            self._previous = None
+
+    def __enter__(self) -> "Sampler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def sampled(self, path: Path) -> "_Sampled":
+        """
+        Sample the code run in the context on the current thread and write the counted
+        stacks to the given path when the context exits, even if the code raises.
+        """
+        return _Sampled(self, path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample(sys._current_frames())
+
+    def _handle(self, signum: int, frame: t.Optional[FrameType]) -> None:
+        frames = sys._current_frames()
+        # the handler runs on the main thread, sample the frame it interrupted
+        frames[threading.get_ident()] = frame  # type: ignore[assignment]
+        self._sample(frames)
+
+    def _sample(self, frames: t.Dict[int, FrameType]) -> None:
+        for ident, (counts, base) in list(self._tracked.items()):
+            frame: t.Optional[FrameType] = frames.get(ident)
+            names = []
+            while frame is not None and id(frame) not in base:
+                names.append(self._name(frame))
+                frame = frame.f_back
+            if names:
+                counts[";".join(reversed(names))] += 1
+
+    def _name(self, frame: FrameType) -> str:
+        code = frame.f_code
+        name = self._names.get(code)
+        if name is None:
+            name = self._names[code] = "{module}:{function}".format(
+                module=frame.f_globals.get("__name__", "?"),
+                function=getattr(code, "co_qualname", code.co_name),
+            )
+        return name
+
+
+class _Sampled:
+    def __init__(self, sampler: Sampler, path: Path):
+        self.sampler = sampler
+        self.path = path
+
+    def __enter__(self) -> None:
+        # stacks are cut off at the frames that are running when sampling starts
+        base = set()
+        frame: t.Optional[FrameType] = sys._getframe(1)
+        while frame is not None:
+            base.add(id(frame))
+            frame = frame.f_back
+        self.counts: Counter = Counter()
+        self.sampler._tracked[threading.get_ident()] = (self.counts, base)
+
+    def __exit__(self, *exc_info) -> None:
+        self.sampler._tracked.pop(threading.get_ident(), None)
+        counts = dict(self.counts)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(
+            "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+        )
+
+
+def read(path: Path) -> t.Dict[str, int]:
+    """
+    :return: The counted stacks in a collapsed stack file.
+    """
+    counts: t.Dict[str, int] = {}
+    for line in path.read_text().splitlines():
+        stack, _, count = line.rpartition(" ")
+        if stack and count.isdigit():
+            counts[stack] = counts.get(stack, 0) + int(count)
+    return counts
+
+
+def summary(paths: t.Iterable[Path], top: int = TOP) -> t.Optional[str]:
+    """
+    Merge the samples in the given collapsed stack files.
+
+    :param paths: The files to merge, missing files are ignored.
+    :param top: The number of functions to include.
+    :return: A table of the functions that were sampled most often, including the
+        functions they called, or None if there are no samples.
+    """
+    total: Counter = Counter()
+    own: Counter = Counter()
+    samples = 0
+    for path in paths:
+        if not path.is_file():
+            continue
+        for stack, count in read(path).items():
+            frames = stack.split(";")
+            samples += count
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+    if not samples:
+        return None
+    lines = [
+        f"{samples} samples",
+        f"{'Total':>7}  {'Self':>7}  Function",
+    ]
+    for name, count in total.most_common(top):
+        lines.append(f"{count / samples:>7.1%}  {own[name] / samples:>7.1%}  {name}")
+    return "\n".join(lines)
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> None:
+    """
+    Run a Python script or module like the interpreter would and write its samples to
+    a collapsed stack file: ``python -m django_routines.sampling -o out.folded
+    [-m module | script] [args ...]``.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m django_routines.sampling", description=main.__doc__
+    )
+    parser.add_argument("-o", "--outfile", required=True, type=Path)
+    parser.add_argument("-m", dest="module", action="store_true")
+    parser.add_argument("target")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    options = parser.parse_args(argv)
+    sys.argv = [options.target, *options.args]
+    if not options.module:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(options.target)))
+    with Sampler() as sampler, sampler.sampled(options.outfile):
+        if options.module:
+            runpy.run_module(options.target, run_name="__main__", alter_sys=True)
+        else:
+            runpy.run_path(options.target, run_name="__main__")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -57,7 +57,7 @@
 Signal sent when a routine is completed successfully.
 
 **Signature:**
-``(sender, routine, early_exit, last_command, **kwargs) -> bool``
+``(sender, routine, early_exit, last_command, unchanged, command_timings, **kwargs) -> bool``
 
 :param sender: An instance of the running routine command.
 :type sender: :class:`RoutineCommand <django_routines.management.commands.routine.Command>`
@@ -68,6 +68,68 @@
 :param last_command: The plan index of the last command that was run in the routine
     (if any!). See :ref:`plan_index`.
 :type last_command: typing.Optional[int]
+:param unchanged: The plan indexes of the commands that were not run because their
+    declared inputs had not changed.
+:type unchanged: typing.List[int]
+:param command_timings: The :class:`~django_routines.timings.Timing` of each command in the
+    execution plan, indexed by plan index. Commands that were not run have zero timings.
+:type command_timings: typing.List[~django_routines.timings.Timing]
 :param kwargs: The CLI options passed to the routine.
 :type kwargs: typing.Dict[str, typing.Any]
 """
+
+
+command_started = Signal()
+"""
+Signal sent when a routine reaches a command in its execution plan, before the command
+is checked for changed inputs and before its pre hook is called. It is sent from the
+thread that runs the command. The signal is only prepared if it has connected
+receivers.
+
+**Signature:**
+``(sender, routine, plan_index, command, **kwargs)``
+
+:param sender: An instance of the running routine command.
+:type sender: :class:`RoutineCommand <django_routines.management.commands.routine.Command>`
+:param routine: The name of the routine the command belongs to.
+:type routine: str
+:param plan_index: The plan index of the command. See :ref:`plan_index`.
+:type plan_index: int
+:param command: The run's copy of the command.
+:type command: ~django_routines.RoutineCommand
+"""
+
+
+command_finished = Signal()
+"""
+Signal sent when a command in the execution plan of a routine has finished, whether it
+succeeded, failed or was not run. It is sent from the thread that ran the command
+before the routine handles any failure. The signal is only prepared if it has connected
+receivers.
+
+**Signature:**
+``(sender, routine, plan_index, command, status, duration, result, return_code,
+exception, **kwargs)``
+
+:param sender: An instance of the running routine command.
+:type sender: :class:`RoutineCommand <django_routines.management.commands.routine.Command>`
+:param routine: The name of the routine the command belongs to.
+:type routine: str
+:param plan_index: The plan index of the command. See :ref:`plan_index`.
+:type plan_index: int
+:param command: The run's copy of the command.
+:type command: ~django_routines.RoutineCommand
+:param status: The outcome of the command, for example ``succeeded``, ``skipped`` if a
+    pre hook skipped it or ``failed``. See
+    :class:`~django_routines.management.commands.routine.Status`.
+:type status: ~django_routines.management.commands.routine.Status
+:param duration: The number of seconds the command took, including its hooks.
+:type duration: float
+:param result: The result of the command as retained by the routine. See
+    :attr:`~django_routines.Routine.retain`.
+:type result: typing.Any
+:param return_code: The return code of commands run as subprocesses, None otherwise.
+:type return_code: typing.Optional[int]
+:param exception: The exception raised by the command if it failed.
+:type exception: typing.Optional[BaseException]
+"""
@@ -0,0 +1,160 @@
+"""
+Helpers to stop commands that run longer than their
+:attr:`~django_routines.RoutineCommand.timeout` or their routine's
+:attr:`~django_routines.Routine.time_budget`.
+
+Subprocesses are terminated, and killed if they do not exit within :data:`GRACE`
+seconds. Management commands run in process on the main thread are interrupted by
+raising :exc:`Expired` from a ``SIGALRM`` handler. Management commands run in process
+on worker threads (``jobs > 1``) can not be interrupted safely, they are run to
+completion and fail afterwards if they ran out of time.
+"""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+import typing as t
+from contextlib import contextmanager
+
+GRACE = 5.0
+"""
+The number of seconds a terminated subprocess is given to exit before it is killed.
+"""
+
+POLL = 0.01
+"""
+The number of seconds between checks for the exit of a child process where it can not
+be waited for without reaping it.
+"""
+
+
+class Expired(BaseException):
+    """
+    Raised in the thread running an in-process command when its time is up. It is not
+    an :exc:`Exception` so that commands that handle exceptions broadly do not swallow
+    it.
+    """
+
+
+@contextmanager
+def interrupt(seconds: t.Optional[float]) -> t.Iterator[None]:
+    """
+    Raise :exc:`Expired` in the calling thread if the block runs longer than the given
+    number of seconds.
+
+    In the main thread of platforms with ``SIGALRM`` a real time interval timer is used
+    so blocking system calls are interrupted. Other threads can not be interrupted
+    without the risk of raising the exception in the middle of the routine's own
+    bookkeeping, such as profiling, memory tracing or the resume journal, so the block
+    is run to completion and :exc:`Expired` is raised after it if it ran out of time.
+
+    :param seconds: The time limit, or None for no limit.
+    """
+    if seconds is None:
+        yield
+        return
+    seconds = max(seconds, 0.001)
+    if (
+        hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    ):
+
+        def alarm(signum, frame):
+            raise Expired()
+
+        previous = signal.signal(signal.SIGALRM, alarm)
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+        try:
+            yield
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+        return
+
+    deadline = time.monotonic() + seconds
+    yield
+    if time.monotonic() > deadline:
+        raise Expired()
+
+
+class Watchdog:
+    """
+    Terminate a process if it runs longer than the given number of seconds. Use it as
+    a context manager around waiting for the process.
+
+    A :class:`subprocess.Popen` is signalled through its handle, which does not signal
+    a process that has already been reaped. A process given by its pid must be reaped
+    with :meth:`wait` in the context, which does not reap it while it may be
+    signalled, so its pid can not be reused by another process first.
+
+    :param process: The process, or the pid of a child process.
+    :param seconds: The time limit, or None for no limit.
+    """
+
+    expired: bool = False
+    """
+    True if the process was terminated because its time was up.
+    """
+
+    def __init__(
+        self,
+        process: t.Union["subprocess.Popen[t.Any]", int],
+        seconds: t.Optional[float],
+    ):
+        self.process = process
+        self.pid = process if isinstance(process, int) else process.pid
+        self._lock = threading.Lock()
+        self._reaped = False
+        self._done = threading.Event()
+        self._timer = (
+            threading.Timer(max(seconds, 0.0), self._expire)
+            if seconds is not None
+            else None
+        )
+        if self._timer:
+            self._timer.daemon = True
+
+    def _signal(self, signum: int) -> None:
+        with self._lock:
+            if not isinstance(self.process, int):
+                self.process.send_signal(signum)
+            elif not self._reaped:
+                os.kill(self.pid, signum)
+
+    def _expire(self) -> None:
+        self.expired = True
+        try:
+            self._signal(signal.SIGTERM)
+            if not self._done.wait(GRACE):
+                self._signal(getattr(signal, "SIGKILL", signal.SIGTERM))
+        except OSError:
+            pass
+
+    def wait(self) -> int:
+        """
+        Wait for the child process given by its pid to exit and reap it.
+
+        :return: The wait status of the process.
+        """
+        if hasattr(os, "waitid"):
+            # block until the child exits but leave it to be reaped below
+            os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOWAIT)
+        while True:
+            with self._lock:
+                pid, status = os.waitpid(self.pid, os.WNOHANG)
+                if pid:
+                    self._reaped = True
+                    return status
+            time.sleep(POLL)
+
+    def __enter__(self) -> "Watchdog":
+        if self._timer:
+            self._timer.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._done.set()
+        if self._timer:
+            self._timer.cancel()
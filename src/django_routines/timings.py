@@ -0,0 +1,102 @@
+"""
+Timing instrumentation for the commands of a routine run. The timings of each command
+in the execution plan are recorded on its
+:class:`~django_routines.management.commands.routine.CommandRun` and sent with the
+:data:`~django_routines.signals.routine_finished` signal. Run a routine with
+``--timings`` to print a table of its slowest commands when it finishes.
+"""
+
+import time
+import typing as t
+from dataclasses import dataclass
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - windows
+    resource = None  # type: ignore[assignment]
+
+
+@dataclass(slots=True)
+class Timing:
+    """
+    The time a command in the execution plan took to run, in seconds.
+    """
+
+    wall: float = 0.0
+    """
+    The wall clock time from the start to the end of the command, including its hooks.
+    """
+
+    cpu: float = 0.0
+    """
+    The CPU time spent by the thread that ran the command. When the routine runs one
+    job at a time this includes the CPU time of the subprocesses it waited for.
+    """
+
+    hooks: float = 0.0
+    """
+    The wall clock time spent in the command's pre and post hooks.
+    """
+
+
+def children_cpu() -> float:
+    """
+    :return: The CPU time of the child processes of this process that have exited and
+        been waited for, or 0 where this is not available.
+    """
+    if resource is None:  # pragma: no cover - windows
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Timer:
+    """
+    A context manager that adds the time spent in its context to a :class:`Timing`.
+    Timers must be entered and exited on the same thread.
+
+    :param timing: The timing to add to.
+    :param children: Include the CPU time of child processes waited for in the context.
+        Other threads may wait for children too, so this is only accurate if nothing
+        else runs concurrently.
+    """
+
+    def __init__(self, timing: Timing, children: bool = False):
+        self.timing = timing
+        self.children = children
+
+    def __enter__(self) -> Timing:
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        self._children = children_cpu() if self.children else 0.0
+        return self.timing
+
+    def __exit__(self, *exc_info) -> None:
+        self.timing.wall += time.perf_counter() - self._wall
+        self.timing.cpu += time.thread_time() - self._cpu
+        if self.children:
+            self.timing.cpu += children_cpu() - self._children
+
+
+def table(
+    rows: t.Iterable[t.Tuple[int, str, str, Timing]],
+    limit: t.Optional[int] = None,
+) -> t.List[str]:
+    """
+    Format timings as a table sorted from the slowest command to the fastest.
+
+    :param rows: 4-tuples of the plan index, command string, status and timing of
+        each command.
+    :param limit: The maximum number of commands to include.
+    :return: The lines of the table.
+    """
+    ranked = sorted(rows, key=lambda row: row[3].wall, reverse=True)[:limit]
+    lines = [
+        f"{'#':>4}  {'Wall':>9}  {'CPU':>9}  {'Hooks':>9}  {'Status':<10}  Command"
+    ]
+    for idx, command, status, timing in ranked:
+        lines.append(
+            f"{idx:>4}  {timing.wall:>8.3f}s  {timing.cpu:>8.3f}s  "
+            f"{timing.hooks:>8.3f}s  {status:<10}  {' '.join(command.splitlines())}"
+        )
+    return lines
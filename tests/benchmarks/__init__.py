@@ -0,0 +1,59 @@
+"""
+Benchmarks for django-routines. These are not collected by pytest, run them directly:
+
+.. code-block:: console
+
+    python -m tests.benchmarks.startup
+"""
+
+import statistics
+import time
+import typing as t
+
+SETTINGS = "tests.benchmarks.settings"
+
+
+def times(func: t.Callable[[], t.Any], repeat: int) -> t.List[float]:
+    """
+    :return: The wall clock times of ``repeat`` calls to func in seconds.
+    """
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed.append(time.perf_counter() - start)
+    return elapsed
+
+
+def best(func: t.Callable[[], t.Any], repeat: int) -> float:
+    """
+    :return: The fastest of ``repeat`` timed calls to func in seconds.
+    """
+    return min(times(func, repeat))
+
+
+def median(func: t.Callable[[], t.Any], repeat: int) -> float:
+    """
+    :return: The median of ``repeat`` timed calls to func in seconds.
+    """
+    return statistics.median(times(func, repeat))
+
+
+def table(results: t.List[t.Dict[str, t.Any]], columns: t.Sequence[str]) -> str:
+    """
+    Format benchmark results as a right aligned table with a header row. Floats are
+    shown to three decimal places.
+    """
+    rows = [list(columns)] + [
+        [
+            str(row[col]) if isinstance(row[col], (int, str)) else f"{row[col]:.3f}"
+            for col in columns
+        ]
+        for row in results
+    ]
+    widths = [max(len(row[idx]) for row in rows) for idx in range(len(columns))]
+    lines = [
+        "  ".join(val.rjust(wdth) for val, wdth in zip(row, widths)) for row in rows
+    ]
+    lines.insert(1, "-" * len(lines[0]))
+    return "\n".join(lines)
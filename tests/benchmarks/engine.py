@@ -0,0 +1,312 @@
+"""
+Measure the fixed per-command overhead the routine command adds on top of the work
+done by the commands themselves.
+
+Each component of the execution engine is timed in isolation against a routine of
+``--commands`` no-op management commands (or ``true`` system commands):
+
+* ``copy``: the per-run copy of the routine made by the ``routine`` setter
+* ``plan``: building the execution plan with :meth:`~django_routines.Routine.plan`
+* ``hook``: resolving hooks with ``load_hook`` from import strings and callables
+* ``command``: constructing command instances with
+  :func:`~django_typer.management.get_command`
+* ``signals``: dispatching the routine signals to a connected receiver
+* ``results``: storing command results on the command and the result list
+
+The ``management`` and ``system`` rows run whole routines in process and subtract the
+cost of invoking the same commands directly, which leaves the overhead per step.
+
+.. code-block:: console
+
+    python -m tests.benchmarks.engine --commands 5000 --system 500 --json engine.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import typing as t
+from io import StringIO
+from pathlib import Path
+
+from tests.benchmarks import SETTINGS, best, table
+
+COMMANDS = 2000
+SYSTEM = 200
+
+HOOK = f"{__name__}.hook"
+
+
+def hook(routine, command, other, options):
+    """A no-op hook."""
+
+
+def receiver(sender, **kwargs):
+    """A no-op signal receiver."""
+
+
+def setup() -> None:
+    import django
+    from django.conf import settings
+
+    if not settings.configured:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", SETTINGS)
+        django.setup()
+
+
+def noop_routine(commands: int, system: bool = False, hooks: bool = False):
+    """
+    Build a routine of no-op commands. Every tenth command is switched off unless
+    the ``extra`` switch is active.
+
+    :param commands: The number of commands in the routine.
+    :param system: Run ``true`` system commands instead of the noop management command.
+    :param hooks: Configure import string pre and post hooks on the routine.
+    """
+    from django_routines import ManagementCommand, Routine, SystemCommand
+
+    return Routine(
+        "bench",
+        "Engine benchmark routine.",
+        commands=[
+            SystemCommand(("true",), switches=["extra"] if idx % 10 == 9 else [])
+            if system
+            else ManagementCommand(
+                ("noop", str(idx)), switches=["extra"] if idx % 10 == 9 else []
+            )
+            for idx in range(commands)
+        ],
+        pre_hook=HOOK if hooks else None,
+        post_hook=HOOK if hooks else None,
+    )
+
+
+def engine(routine=None, subprocess: bool = False):
+    """
+    Get a routine command instance primed the way the ``init`` callback would leave
+    it for a quiet run.
+    """
+    from django_routines.management.commands.routine import Command
+
+    cmd = Command(stdout=StringIO(), stderr=StringIO())
+    cmd.verbosity = 0
+    cmd._pass_verbosity = False
+    cmd._results = []
+    cmd._routine_options = {
+        "manage_script": cmd.manage_script,
+        "verbosity": 0,
+        "subprocess": subprocess,
+        "atomic": False,
+        "continue_on_error": False,
+    }
+    if routine is not None:
+        cmd.routine = routine
+        cmd.switches = ["extra"]
+    return cmd
+
+
+def bench_copy(commands: int, repeat: int) -> float:
+    routine = noop_routine(commands)
+    cmd = engine()
+
+    def copy():
+        cmd.routine = routine
+
+    return best(copy, repeat)
+
+
+def bench_plan(commands: int, repeat: int) -> float:
+    routine = noop_routine(commands, hooks=True)
+    return best(lambda: routine.plan({"extra"}), repeat)
+
+
+def bench_hook(commands: int, repeat: int) -> float:
+    from django_routines.management.commands.routine import load_hook
+
+    def load():
+        for _ in range(commands):
+            load_hook(HOOK)
+            load_hook(hook)
+
+    # there are two hook loads per command
+    return best(load, repeat) / 2
+
+
+def bench_command(commands: int, repeat: int) -> float:
+    from django.core.management.base import BaseCommand
+    from django_typer.management import get_command
+
+    cmd = engine()
+
+    def build():
+        for _ in range(commands):
+            get_command(
+                "noop",
+                BaseCommand,
+                stdout=t.cast(t.IO[str], cmd.stdout._out),
+                stderr=t.cast(t.IO[str], cmd.stderr._out),
+                force_color=cmd.force_color,
+                no_color=cmd.no_color,
+            )
+
+    return best(build, repeat)
+
+
+def bench_signals(commands: int, repeat: int) -> float:
+    from django_routines.signals import routine_failed
+
+    cmd = engine()
+    routine_failed.connect(receiver, dispatch_uid=__name__)
+    try:
+
+        def send():
+            for idx in range(commands):
+                routine_failed.send(
+                    sender=cmd,
+                    routine="bench",
+                    failed_command=idx,
+                    exception=None,
+                    **cmd._routine_options,
+                )
+
+        return best(send, repeat)
+    finally:
+        routine_failed.disconnect(dispatch_uid=__name__)
+
+
+def bench_results(commands: int, repeat: int) -> float:
+    cmd = engine(noop_routine(commands))
+    plan = cmd.plan
+
+    def store():
+        cmd._results = []
+        for command in plan:
+            command.result = None
+            cmd._results.append(command.result)
+
+    return best(store, repeat) * commands / len(plan)
+
+
+def bench_management(commands: int, repeat: int) -> float:
+    """
+    Time a whole in-process routine run less the cost of calling the commands
+    directly.
+    """
+    from django.core.management import call_command
+    from django.core.management.base import BaseCommand
+    from django_typer.management import get_command
+
+    routine = noop_routine(commands, hooks=True)
+
+    def run():
+        engine(routine)._run_routine()
+
+    def direct():
+        cmd = get_command("noop", BaseCommand)
+        for command in routine.plan({"extra"}):
+            call_command(cmd, *command.command_args)
+
+    return max(best(run, repeat) - best(direct, repeat), 0.0)
+
+
+def bench_system(commands: int, repeat: int) -> float:
+    """
+    Time a whole routine run of ``true`` system commands less the cost of running them
+    directly.
+    """
+    routine = noop_routine(commands, system=True, hooks=True)
+
+    def run():
+        engine(routine, subprocess=True)._run_routine()
+
+    def direct():
+        for command in routine.plan({"extra"}):
+            subprocess.run([command.command_name, *command.command_args])
+
+    return max(best(run, repeat) - best(direct, repeat), 0.0)
+
+
+BENCHMARKS: t.Dict[str, t.Callable[[int, int], float]] = {
+    "copy": bench_copy,
+    "plan": bench_plan,
+    "hook": bench_hook,
+    "command": bench_command,
+    "signals": bench_signals,
+    "results": bench_results,
+    "management": bench_management,
+    "system": bench_system,
+}
+
+
+def measure(
+    commands: int = COMMANDS,
+    system: int = SYSTEM,
+    repeat: int = 5,
+    benchmarks: t.Optional[t.Sequence[str]] = None,
+) -> t.List[t.Dict[str, t.Any]]:
+    """
+    Run the benchmarks.
+
+    :return: A row per benchmark with the total and the per command time.
+    """
+    setup()
+    results = []
+    for name in benchmarks or BENCHMARKS:
+        size = system if name == "system" else commands
+        total = BENCHMARKS[name](size, repeat)
+        results.append(
+            {
+                "benchmark": name,
+                "commands": size,
+                "total_ms": total * 1e3,
+                "per_command_us": total * 1e6 / size,
+            }
+        )
+    return results
+
+
+def report(results: t.List[t.Dict[str, t.Any]]) -> str:
+    return table(results, ["benchmark", "commands", "total_ms", "per_command_us"])
+
+
+def main(argv: t.Optional[t.Sequence[str]] = None) -> t.List[t.Dict[str, t.Any]]:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--commands",
+        type=int,
+        default=COMMANDS,
+        help="The number of management commands in the routine.",
+    )
+    parser.add_argument(
+        "--system",
+        type=int,
+        default=SYSTEM,
+        help="The number of system commands in the routine.",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        metavar="benchmark",
+        help=f"The benchmarks to run: {', '.join(BENCHMARKS)} (default: all).",
+    )
+    parser.add_argument("--json", type=Path, help="Also write the results as json.")
+    args = parser.parse_args(argv)
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+
+    results = measure(
+        commands=args.commands,
+        system=args.system,
+        repeat=args.repeat,
+        benchmarks=args.benchmarks,
+    )
+    print(report(results))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
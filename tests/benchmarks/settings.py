@@ -0,0 +1,29 @@
+"""
+Synthetic routine configurations for benchmarking. The shape of the configuration is
+controlled by environment variables:
+
+* ``ROUTINES_BENCH_ROUTINES``: the number of routines to generate
+* ``ROUTINES_BENCH_COMMANDS``: the number of commands in each routine
+* ``ROUTINES_BENCH_LAZY``: set :setting:`DJANGO_ROUTINES_LAZY`
+* ``ROUTINES_BENCH_CACHE_DIR``: set :setting:`DJANGO_ROUTINES_CACHE_DIR`
+"""
+
+import os
+
+from django_routines import command, routine, system
+from tests.base_settings import *
+
+ROUTINES = int(os.environ.get("ROUTINES_BENCH_ROUTINES", 10))
+COMMANDS = int(os.environ.get("ROUTINES_BENCH_COMMANDS", 1))
+
+DJANGO_ROUTINES_LAZY = bool(os.environ.get("ROUTINES_BENCH_LAZY", ""))
+DJANGO_ROUTINES_CACHE_DIR = os.environ.get("ROUTINES_BENCH_CACHE_DIR", None)
+
+for rtn in range(ROUTINES):
+    name = f"bench-{rtn}"
+    routine(name, f"Benchmark routine {rtn}.", extra="Run the extra commands.")
+    for cmd in range(COMMANDS):
+        if cmd % 10 == 9:
+            system(name, "true", priority=cmd % 5, switches=["extra"])
+        else:
+            command(name, "noop", str(cmd), priority=cmd % 5)
@@ -0,0 +1,229 @@
+"""
+Measure how the startup latency of the routine command scales with the number of
+configured routines and commands.
+
+For each configuration size the benchmark:
+
+1. Imports the routine command in a fresh interpreter and breaks the time down into
+   normalizing the settings into :class:`~django_routines.Routine` objects,
+   generating and compiling the subcommand code, ``exec``'ing it, registering the Typer
+   groups and building the click command tree.
+2. Times end-to-end invocations of ``routine --help``, ``routine <name> list`` and
+   ``routine <name>`` from the command line against ``manage.py noop`` as a baseline
+   for interpreter and Django startup.
+
+The synthetic configurations are defined in :mod:`tests.benchmarks.settings`.
+
+.. code-block:: console
+
+    python -m tests.benchmarks.startup --sizes 10 100 1000 10000 --repeat 3
+    python -m tests.benchmarks.startup --lazy --cache --json startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+from pathlib import Path
+
+from tests.benchmarks import SETTINGS, median, table
+
+ROOT = Path(__file__).parent.parent.parent
+MANAGE = ROOT / "manage.py"
+
+SIZES = (10, 100, 1000, 10000)
+
+PHASES = ("setup", "module", "normalize", "compile", "exec", "register", "click")
+INVOCATIONS = {
+    "django": ("noop",),
+    "help": ("routine", "--help"),
+    "list": ("routine", "bench-0", "list"),
+    "run": ("routine", "--verbosity", "0", "bench-0"),
+}
+
+
+def environment(
+    routines: int,
+    commands: int,
+    lazy: bool = False,
+    cache_dir: t.Optional[str] = None,
+) -> t.Dict[str, str]:
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": SETTINGS,
+        "ROUTINES_BENCH_ROUTINES": str(routines),
+        "ROUTINES_BENCH_COMMANDS": str(commands),
+        "PYTHONPATH": os.pathsep.join(
+            [str(ROOT), *filter(None, [os.environ.get("PYTHONPATH")])]
+        ),
+    }
+    env.pop("ROUTINES_BENCH_LAZY", None)
+    env.pop("ROUTINES_BENCH_CACHE_DIR", None)
+    if lazy:
+        env["ROUTINES_BENCH_LAZY"] = "1"
+    if cache_dir:
+        env["ROUTINES_BENCH_CACHE_DIR"] = cache_dir
+    return env
+
+
+def probe() -> t.Dict[str, float]:
+    """
+    Time the phases of loading the routine command. This must be run in a fresh
+    interpreter with the benchmark settings configured.
+    """
+    timings = dict.fromkeys(PHASES, 0.0)
+
+    def timed(phase: str, func: t.Callable[..., t.Any]) -> t.Callable[..., t.Any]:
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings[phase] += time.perf_counter() - start
+
+        return wrapper
+
+    start = time.perf_counter()
+    import django
+    from django.conf import settings
+
+    django.setup()
+    timings["setup"] = time.perf_counter() - start
+
+    # load the module without registering any routines so we can instrument the
+    # registration phases
+    lazy = settings.DJANGO_ROUTINES_LAZY
+    settings.DJANGO_ROUTINES_LAZY = True
+    start = time.perf_counter()
+    from django_routines.management.commands import routine
+
+    timings["module"] = time.perf_counter() - start
+    settings.DJANGO_ROUTINES_LAZY = lazy
+
+    routine.get_routine = timed("normalize", routine.get_routine)
+    routine._compile_routine = timed("compile", routine._compile_routine)
+    routine.exec = timed("exec", exec)  # type: ignore[attr-defined]
+
+    start = time.perf_counter()
+    routine._register_routines()
+    timings["register"] = (time.perf_counter() - start) - sum(
+        timings[phase] for phase in ("normalize", "compile", "exec")
+    )
+
+    from typer.main import get_command
+
+    start = time.perf_counter()
+    get_command(routine.Command.typer_app)
+    timings["click"] = time.perf_counter() - start
+    return timings
+
+
+def invoke(args: t.Sequence[str], env: t.Dict[str, str], repeat: int) -> float:
+    """
+    Time invocations of the manage script.
+
+    :return: The median wall clock time in seconds.
+    """
+
+    def run():
+        result = subprocess.run(
+            [sys.executable, str(MANAGE), *args],
+            env=env,
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        if result.returncode:
+            raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+
+    return median(run, repeat)
+
+
+def measure(
+    routines: int,
+    commands: int,
+    repeat: int = 3,
+    lazy: bool = False,
+    cache: bool = False,
+) -> t.Dict[str, float]:
+    """
+    Measure the load phases and the command line latencies for a configuration.
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = environment(routines, commands, lazy, cache_dir if cache else None)
+        if cache:
+            # warm the cache
+            invoke(INVOCATIONS["help"], env, 1)
+        result = subprocess.run(
+            [sys.executable, "-m", __spec__.name, "--probe"],
+            env=env,
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise RuntimeError(f"probe failed:\n{result.stderr}")
+        timings = json.loads(result.stdout.splitlines()[-1])
+        for name, args in INVOCATIONS.items():
+            timings[name] = invoke(args, env, repeat)
+    return timings
+
+
+def report(results: t.List[t.Dict[str, t.Any]]) -> str:
+    return table(results, ["axis", "routines", "commands", *PHASES, *INVOCATIONS])
+
+
+def main(argv: t.Optional[t.Sequence[str]] = None) -> t.List[t.Dict[str, t.Any]]:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument(
+        "--axis",
+        choices=("routines", "commands", "both"),
+        default="both",
+        help="Scale the number of routines, the number of commands in a routine or both.",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--lazy", action="store_true", help="Use lazy registration.")
+    parser.add_argument("--cache", action="store_true", help="Use the registry cache.")
+    parser.add_argument("--json", type=Path, help="Also write the results as json.")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.probe:
+        print(json.dumps(probe()))
+        return []
+
+    axes = ("routines", "commands") if args.axis == "both" else (args.axis,)
+    results = []
+    for axis in axes:
+        for size in args.sizes:
+            routines, commands = (size, 1) if axis == "routines" else (1, size)
+            results.append(
+                {
+                    "axis": axis,
+                    "routines": routines,
+                    "commands": commands,
+                    **measure(
+                        routines,
+                        commands,
+                        repeat=args.repeat,
+                        lazy=args.lazy,
+                        cache=args.cache,
+                    ),
+                }
+            )
+            print(report(results[-1:]).splitlines()[-1], file=sys.stderr)
+
+    print(report(results))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
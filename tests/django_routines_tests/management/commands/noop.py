@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Do nothing. Used to measure the overhead of running routines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("args", nargs="*")
+
+    def handle(self, *args, **options):
+        pass
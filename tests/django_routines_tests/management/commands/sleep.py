@@ -0,0 +1,18 @@
+import time
+
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Sleep for a number of seconds. Used to test timeouts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("seconds", type=float)
+        parser.add_argument("--busy", action="store_true", default=False)
+
+    def handle(self, *args, **options):
+        end = time.monotonic() + options["seconds"]
+        while time.monotonic() < end:
+            if not options["busy"]:
+                time.sleep(max(end - time.monotonic(), 0))
+        return "slept"
@@ -0,0 +1,3 @@
+from tests.settings import *
+
+DJANGO_ROUTINES_LAZY = True
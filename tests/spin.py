@@ -0,0 +1,11 @@
+import sys
+import time
+
+
+def spin(seconds: float):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+spin(float(sys.argv[1]) if len(sys.argv) > 1 else 0.2)
@@ -0,0 +1,251 @@
+import importlib
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, SystemCommand, artifacts
+
+BUILD_DIR = Path(tempfile.gettempdir()) / "django-routines-artifacts"
+
+BUILD = (
+    "from pathlib import Path\n"
+    "build = Path({build!r})\n"
+    "source = (build / 'input.txt').read_text()\n"
+    "(build / 'out' / 'sub').mkdir(parents=True, exist_ok=True)\n"
+    "(build / 'out' / 'a.txt').write_text(source)\n"
+    "(build / 'out' / 'sub' / 'b.txt').write_text(source * 2)\n"
+    "(build / 'out.txt').write_text('single')\n"
+    "with open(build / 'runs', 'a') as runs:\n"
+    "    runs.write('run\\n')\n"
+).format(build=str(BUILD_DIR))
+
+
+def test_store_restore(tmp_path, settings):
+    settings.DJANGO_ROUTINES_ARTIFACT_DIR = tmp_path / "store"
+    (tmp_path / "out" / "sub").mkdir(parents=True)
+    (tmp_path / "out" / "a.txt").write_text("a")
+    (tmp_path / "out" / "sub" / "b.txt").write_text("a")
+    (tmp_path / "single.txt").write_text("b")
+    command = SystemCommand(
+        ("build",),
+        inputs=["*.in"],
+        outputs=[str(tmp_path / "out"), str(tmp_path / "single.txt")],
+    )
+    assert artifacts.load(command, "digest") is None
+    assert not artifacts.restore(command, "digest")
+    assert artifacts.store(command, "digest")
+
+    manifest = artifacts.load(command, "digest")
+    out = manifest[str(tmp_path / "out")]
+    assert [relative for relative, _ in out] == ["a.txt", "sub/b.txt"]
+    assert out[0][1] == out[1][1]
+    assert [relative for relative, _ in manifest[str(tmp_path / "single.txt")]] == [""]
+    # identical contents are stored once
+    assert len(list((tmp_path / "store" / "objects").glob("*/*"))) == 2
+
+    shutil.rmtree(tmp_path / "out")
+    (tmp_path / "single.txt").write_text("changed")
+    assert artifacts.restore(command, "digest")
+    assert (tmp_path / "out" / "a.txt").read_text() == "a"
+    assert (tmp_path / "out" / "sub" / "b.txt").read_text() == "a"
+    assert (tmp_path / "single.txt").read_text() == "b"
+    # objects are read only and restored files are copies by default
+    objects = list((tmp_path / "store" / "objects").glob("*/*"))
+    assert all(stat.S_IMODE(obj.stat().st_mode) == 0o444 for obj in objects)
+    assert not any(os.path.samefile(tmp_path / "out" / "a.txt", obj) for obj in objects)
+
+    # editing a restored file does not change the stored artifacts
+    (tmp_path / "out" / "a.txt").write_text("modified")
+    assert artifacts.restore(command, "digest")
+    assert (tmp_path / "out" / "a.txt").read_text() == "a"
+
+    # restored files may be hard linked, they are detached from the store before the
+    # command runs again
+    settings.DJANGO_ROUTINES_ARTIFACT_LINKS = True
+    shutil.rmtree(tmp_path / "out")
+    assert artifacts.restore(command, "digest")
+    assert os.path.samefile(
+        tmp_path / "out" / "a.txt", tmp_path / "out" / "sub" / "b.txt"
+    )
+    artifacts.detach(command)
+    (tmp_path / "out" / "a.txt").write_text("modified")
+    assert artifacts.restore(command, "digest")
+    assert (tmp_path / "out" / "a.txt").read_text() == "a"
+    settings.DJANGO_ROUTINES_ARTIFACT_LINKS = False
+
+    # objects that do not match their hash are removed and the restore misses
+    single = artifacts.load(command, "digest")[str(tmp_path / "single.txt")][0][1]
+    corrupted = tmp_path / "store" / "objects" / single[:2] / single[2:]
+    corrupted.chmod(0o644)
+    corrupted.write_text("corrupted")
+    (tmp_path / "single.txt").unlink()
+    assert not artifacts.restore(command, "digest")
+    assert not corrupted.exists()
+    assert not (tmp_path / "single.txt").exists()
+    assert artifacts.load(command, "digest") is None
+    assert artifacts.store(command, "digest") is False
+    (tmp_path / "single.txt").write_text("b")
+    assert artifacts.store(command, "digest")
+    assert artifacts.restore(command, "digest")
+
+    # outputs are keyed on the inputs digest and the command
+    assert artifacts.load(command, "other") is None
+    assert (
+        artifacts.load(
+            SystemCommand(("build", "--fast"), outputs=command.outputs), "digest"
+        )
+        is None
+    )
+
+    # missing outputs are not stored
+    assert not artifacts.store(
+        SystemCommand(("build",), outputs=[str(tmp_path / "missing")]), "digest"
+    )
+
+    # a store with missing objects is a miss
+    for obj in (tmp_path / "store" / "objects").glob("*/*"):
+        obj.unlink()
+    assert artifacts.load(command, "digest") is None
+
+
+def test_untrusted_manifest(tmp_path, settings):
+    settings.DJANGO_ROUTINES_ARTIFACT_DIR = tmp_path / "store"
+    (tmp_path / "out").mkdir()
+    (tmp_path / "out" / "a.txt").write_text("a")
+    command = SystemCommand(("build",), outputs=[str(tmp_path / "out")])
+    assert artifacts.store(command, "digest")
+    path = next((tmp_path / "store" / "manifests").glob("*.json"))
+    stored = json.loads(path.read_text())
+    content = stored[str(tmp_path / "out")][0][1]
+
+    def restores(manifest):
+        path.write_text(json.dumps(manifest))
+        return artifacts.restore(command, "digest")
+
+    # entries may not escape their output or restore undeclared outputs
+    escaped = tmp_path / "escaped.txt"
+    for manifest in (
+        {str(tmp_path / "out"): [["../escaped.txt", content]]},
+        {str(tmp_path / "out"): [[str(escaped), content]]},
+        {str(tmp_path / "out"): [["a.txt", "../../../escaped"]]},
+        {**stored, str(escaped): [["", content]]},
+        {},
+    ):
+        assert not restores(manifest)
+        assert not escaped.exists()
+    assert restores(stored)
+
+    # manifests writable by other users are not trusted
+    if hasattr(os, "getuid"):
+        path.chmod(0o666)
+        assert artifacts.load(command, "digest") is None
+        path.chmod(0o600)
+        (tmp_path / "store").chmod(0o777)
+        assert artifacts.load(command, "digest") is None
+        (tmp_path / "store").chmod(0o700)
+        assert artifacts.load(command, "digest") == stored
+
+
+def test_artifact_dir(settings):
+    settings.DJANGO_ROUTINES_ARTIFACT_DIR = None
+    settings.DJANGO_ROUTINES_CACHE_DIR = None
+    assert artifacts.artifact_dir() is None
+    settings.DJANGO_ROUTINES_CACHE_DIR = "/cache"
+    assert artifacts.artifact_dir() == Path("/cache/artifacts")
+    settings.DJANGO_ROUTINES_ARTIFACT_DIR = "/shared"
+    assert artifacts.artifact_dir() == Path("/shared")
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "build": Routine(
+            "build",
+            "Restore the outputs of commands from the artifact cache.",
+            commands=[
+                SystemCommand(
+                    (sys.executable, "-c", BUILD),
+                    inputs=[str(BUILD_DIR / "input.txt")],
+                    outputs=[str(BUILD_DIR / "out"), str(BUILD_DIR / "out.txt")],
+                ),
+                ManagementCommand(("track", "0")),
+            ],
+        ),
+    }
+)
+class TestArtifacts(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        shutil.rmtree(BUILD_DIR, ignore_errors=True)
+        BUILD_DIR.mkdir()
+        (BUILD_DIR / "input.txt").write_text("0")
+        self.store = Path(tempfile.mkdtemp())
+        super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(BUILD_DIR, ignore_errors=True)
+        shutil.rmtree(self.store, ignore_errors=True)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def run_routine(self, *args):
+        from django_routines.management.commands.routine import Command
+
+        command = Command()
+        self.out = StringIO()
+        with override_settings(DJANGO_ROUTINES_ARTIFACT_DIR=self.store):
+            call_command(command, "--no-color", "build", *args, stdout=self.out)
+        return command
+
+    def runs(self):
+        return (BUILD_DIR / "runs").read_text().count("run")
+
+    def test_restore(self):
+        from django_routines.management.commands.routine import Status
+
+        self.run_routine()
+        self.assertEqual(self.runs(), 1)
+
+        # a fresh checkout without the outputs
+        shutil.rmtree(BUILD_DIR / "out")
+        (BUILD_DIR / "out.txt").unlink()
+        command = self.run_routine()
+        self.assertEqual(self.runs(), 1)
+        self.assertEqual(
+            [run.status for run in command.runs], [Status.RESTORED, Status.SUCCEEDED]
+        )
+        self.assertIn("restored from cache.", self.out.getvalue())
+        self.assertEqual((BUILD_DIR / "out" / "sub" / "b.txt").read_text(), "00")
+        self.assertEqual((BUILD_DIR / "out.txt").read_text(), "single")
+
+        self.run_routine("list")
+        self.assertIn("[cached]", self.out.getvalue())
+
+        (BUILD_DIR / "input.txt").write_text("1")
+        self.run_routine("list")
+        self.assertNotIn("[cached]", self.out.getvalue())
+        self.run_routine()
+        self.assertEqual(self.runs(), 2)
+        self.assertEqual((BUILD_DIR / "out" / "sub" / "b.txt").read_text(), "11")
+
+        # switching back to the old inputs restores the old outputs
+        (BUILD_DIR / "input.txt").write_text("0")
+        self.run_routine()
+        self.assertEqual(self.runs(), 2)
+        self.assertEqual((BUILD_DIR / "out" / "sub" / "b.txt").read_text(), "00")
+
+        self.run_routine("--force")
+        self.assertEqual(self.runs(), 3)
@@ -0,0 +1,123 @@
+import importlib
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, SystemCommand
+from django_routines.signals import command_started
+from tests import system_cmd, track_file
+
+system_cmd = ("python", str(system_cmd.relative_to(Path(os.getcwd()))))
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "batched": Routine(
+            "batched",
+            "Batch adjacent management commands.",
+            commands=[
+                ManagementCommand(("track", "0")),
+                ManagementCommand(("track", "1"), options={"demo": 2}),
+                SystemCommand((*system_cmd, "sys")),
+                ManagementCommand(("track", "2")),
+                ManagementCommand(("track", "3")),
+                ManagementCommand(("track", "4", "--raise"), switches=["fail"]),
+                ManagementCommand(("track", "5"), switches=["fail"]),
+            ],
+            subprocess=True,
+            batch=True,
+        ),
+    }
+)
+class TestBatch(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        if track_file.is_file():
+            os.remove(track_file)
+        super().setUp()
+
+    def tearDown(self):
+        if track_file.is_file():
+            os.remove(track_file)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def run_routine(self, *args):
+        from django_routines.management.commands import routine
+
+        command = routine.Command()
+        with mock.patch.object(
+            routine.subprocess, "run", side_effect=subprocess.run
+        ) as run:
+            try:
+                call_command(
+                    command,
+                    "--verbosity",
+                    "0",
+                    "--manage-script",
+                    "./manage.py",
+                    "batched",
+                    *args,
+                )
+            finally:
+                self.spawned = run.call_count
+        return command
+
+    def test_batch(self):
+        command = self.run_routine()
+        self.assertEqual(self.spawned, 3)
+        track = json.loads(track_file.read_text())
+        self.assertEqual(track["invoked"], [0, 1, "sys", 2, 3])
+        self.assertEqual(track["passed_options"][1]["demo"], 2)
+        for cmd in command.plan:
+            self.assertIsInstance(cmd.result, subprocess.CompletedProcess)
+            self.assertEqual(cmd.result.returncode, 0)
+            if isinstance(cmd, ManagementCommand):
+                self.assertEqual(cmd.result.stdout, cmd.command_args[0])
+                self.assertEqual(cmd.result.args[:2], [sys.executable, "./manage.py"])
+        self.assertEqual(command._results, [cmd.result for cmd in command.plan])
+
+    def test_batch_failure(self):
+        with self.assertRaisesMessage(CommandError, "with return code 1"):
+            self.run_routine("--fail")
+        track = json.loads(track_file.read_text())
+        self.assertEqual(track["invoked"], [0, 1, "sys", 2, 3, 4])
+
+    def test_batch_continue(self):
+        self.run_routine("--fail", "--continue")
+        # the rest of the failed batch is run in a new subprocess
+        self.assertEqual(self.spawned, 4)
+        track = json.loads(track_file.read_text())
+        self.assertEqual(track["invoked"], [0, 1, "sys", 2, 3, 4, 5])
+
+    def test_no_batch(self):
+        self.run_routine("--no-batch")
+        self.assertEqual(self.spawned, 5)
+
+    def test_instrumented(self):
+        # commands that are measured one at a time are not batched
+        command = self.run_routine("--timings")
+        self.assertEqual(self.spawned, 5)
+        self.assertTrue(all(run.timing.wall > 0 for run in command.runs))
+
+        def receiver(**kwargs):
+            pass
+
+        command_started.connect(receiver)
+        try:
+            self.run_routine()
+            self.assertEqual(self.spawned, 5)
+        finally:
+            command_started.disconnect(receiver)
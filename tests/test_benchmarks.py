@@ -0,0 +1,45 @@
+"""
+Make sure the benchmark harnesses keep working, the measurements themselves are not
+checked.
+"""
+
+from tests.benchmarks import engine, startup
+
+
+def test_startup_benchmark(tmp_path):
+    results = startup.main(
+        [
+            "--sizes",
+            "5",
+            "--axis",
+            "routines",
+            "--repeat",
+            "1",
+            "--json",
+            str(tmp_path / "startup.json"),
+        ]
+    )
+    assert len(results) == 1
+    assert results[0]["routines"] == 5
+    assert all(
+        results[0][column] >= 0 for column in (*startup.PHASES, *startup.INVOCATIONS)
+    )
+    assert (tmp_path / "startup.json").is_file()
+
+
+def test_engine_benchmark(tmp_path):
+    results = engine.main(
+        [
+            "--commands",
+            "20",
+            "--system",
+            "5",
+            "--repeat",
+            "1",
+            "--json",
+            str(tmp_path / "engine.json"),
+        ]
+    )
+    assert [row["benchmark"] for row in results] == list(engine.BENCHMARKS)
+    assert all(row["total_ms"] >= 0 for row in results)
+    assert (tmp_path / "engine.json").is_file()
@@ -0,0 +1,210 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+from functools import partial
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.translation import gettext_lazy
+
+from django_routines import ManagementCommand, Routine
+from django_routines import cache
+from django_routines.cache import fingerprint
+
+
+def hook(*args, **kwargs):
+    pass
+
+
+def test_fingerprint():
+    assert fingerprint({"a": 1}) == fingerprint({"a": 1})
+    assert fingerprint({"a": 1}) != fingerprint({"a": "1"})
+    assert fingerprint({"a": 1, "b": 2}) != fingerprint({"b": 2, "a": 1})
+    assert fingerprint(hook) == fingerprint(hook)
+    assert fingerprint(partial(hook, 1)) != fingerprint(partial(hook, 2))
+    assert fingerprint(gettext_lazy("Help")) == fingerprint(gettext_lazy("Help"))
+    assert fingerprint(
+        Routine("test", "help", [ManagementCommand("migrate")])
+    ) != fingerprint(Routine("test", "help", [ManagementCommand("makemigrations")]))
+
+
+def test_write_failures(tmp_path, settings, caplog):
+    settings.DJANGO_ROUTINES_CACHE_DIR = tmp_path / "cache"
+    caplog.set_level("DEBUG", logger=cache.__name__)
+    # objects that can not be pickled are not cached and leave nothing behind
+    cache.write("unpicklable.pickle", lambda: None)
+    cache.write("unpicklable.pickle", {"hook": partial(lambda: None)})
+    assert list((tmp_path / "cache").iterdir()) == []
+    assert cache.read("unpicklable.pickle") is None
+    assert "Could not write unpicklable.pickle" in caplog.text
+
+    # corrupt and truncated entries are misses
+    for corrupt in (b"not a pickle", b"\x80\x05"):
+        (tmp_path / "cache" / "corrupt.pickle").write_bytes(corrupt)
+        (tmp_path / "cache" / "corrupt.pickle").chmod(0o600)
+        assert cache.read("corrupt.pickle") is None
+    assert "Could not read corrupt.pickle" in caplog.text
+
+    cache.write("cached.pickle", {"a": 1})
+    assert cache.read("cached.pickle") == {"a": 1}
+    assert (tmp_path / "cache").stat().st_mode & 0o777 == 0o700
+    assert (tmp_path / "cache" / "cached.pickle").stat().st_mode & 0o777 == 0o600
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="Users are not available.")
+def test_untrusted(tmp_path, settings):
+    settings.DJANGO_ROUTINES_CACHE_DIR = tmp_path / "cache"
+    cache.write("cached.pickle", {"a": 1})
+    path = tmp_path / "cache" / "cached.pickle"
+
+    # entries that others could have written are never loaded
+    path.chmod(0o666)
+    assert cache.read("cached.pickle") is None
+    path.chmod(0o600)
+    (tmp_path / "cache").chmod(0o777)
+    assert cache.read("cached.pickle") is None
+    (tmp_path / "cache").chmod(0o700)
+    assert cache.read("cached.pickle") == {"a": 1}
+    with mock.patch.object(os, "getuid", return_value=os.getuid() + 1):
+        assert cache.read("cached.pickle") is None
+
+
+class TestRegistryCache(TestCase):
+    def setUp(self):
+        self.cache_dir = Path(tempfile.mkdtemp())
+        super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def reload(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        return routine
+
+    def test_registry_cache(self):
+        with override_settings(DJANGO_ROUTINES_CACHE_DIR=self.cache_dir):
+            self.reload()
+            cached = list(self.cache_dir.glob("registry-*.pickle"))
+            self.assertEqual(len(cached), 1)
+            # the second load is served from the cache
+            self.reload()
+            self.assertEqual(list(self.cache_dir.glob("registry-*.pickle")), cached)
+            out = StringIO()
+            call_command("routine", "--no-color", "import", "list", stdout=out)
+            self.assertIn("[3] track 3 (demo=2)", out.getvalue())
+
+    def test_registry_cache_hit(self):
+        with override_settings(DJANGO_ROUTINES_CACHE_DIR=self.cache_dir):
+            routine = self.reload()
+            compiled = []
+            compile_routine = routine._compile_routine
+
+            def track(rtn):
+                compiled.append(rtn.name)
+                return compile_routine(rtn)
+
+            routine._registered.clear()
+            routine._all_registered = False
+            routine._compile_routine = track
+            routine._register_routines()
+            self.assertEqual(compiled, [])
+
+            # a registry that another user could have written is compiled again
+            for registry in self.cache_dir.glob("registry-*.pickle"):
+                registry.chmod(0o666)
+            routine._registered.clear()
+            routine._all_registered = False
+            routine._register_routines()
+            self.assertTrue(compiled)
+
+    @override_settings(
+        DJANGO_ROUTINES={
+            "cached": Routine(
+                "cached", "Cached routine.", [ManagementCommand(("track", "0"))]
+            )
+        }
+    )
+    def test_registry_cache_invalidated(self):
+        with override_settings(DJANGO_ROUTINES_CACHE_DIR=self.cache_dir):
+            self.reload()
+            first = list(self.cache_dir.glob("registry-*.pickle"))
+            with override_settings(
+                DJANGO_ROUTINES={
+                    "cached": Routine(
+                        "cached",
+                        "Cached routine.",
+                        [ManagementCommand(("track", "1"))],
+                    )
+                }
+            ):
+                self.reload()
+                second = list(self.cache_dir.glob("registry-*.pickle"))
+                out = StringIO()
+                call_command("routine", "--no-color", "cached", "list", stdout=out)
+                self.assertIn("track 1", out.getvalue())
+            self.assertEqual(len(first), 1)
+            self.assertEqual(len(second), 1)
+            self.assertNotEqual(first, second)
+
+
+class TestOptionSchemaCache(TestCase):
+    def setUp(self):
+        self.cache_dir = Path(tempfile.mkdtemp())
+        from django_routines.management.commands import routine
+
+        self.routine = importlib.reload(routine)
+        super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def args(self, **options):
+        return self.routine.Command()._subprocess_args(
+            ManagementCommand(("track", "0"), options=options)
+        )
+
+    def test_option_schema(self):
+        get_command = mock.Mock(wraps=self.routine.get_command)
+        with mock.patch.object(self.routine, "get_command", get_command):
+            self.assertEqual(self.args(demo=2, flag=True)[-2:], ["--demo=2", "--flag"])
+            # boolean options at their default are dropped
+            self.assertEqual(self.args(flag=False)[-2:], ["track", "0"])
+        # the command's parser is only introspected once per process
+        self.assertEqual(get_command.call_count, 1)
+        self.assertEqual(
+            self.routine._option_schemas["track"]["flag"], (("--flag",), False)
+        )
+
+    def test_option_schema_cache(self):
+        with override_settings(DJANGO_ROUTINES_CACHE_DIR=self.cache_dir):
+            self.args(demo=2)
+            self.assertEqual(
+                len(list(self.cache_dir.glob("options-track-*.pickle"))), 1
+            )
+            self.routine._option_schemas.clear()
+            # the schema is loaded from the cache without importing the command
+            with mock.patch.object(
+                self.routine, "get_command", side_effect=AssertionError
+            ):
+                self.assertEqual(
+                    self.args(demo=2, flag=True)[-2:], ["--demo=2", "--flag"]
+                )
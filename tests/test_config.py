@@ -1,4 +1,5 @@
 from django_typer.management import get_command
+from django.conf import settings
 from django.test import TestCase, override_settings
 from django.core.exceptions import ImproperlyConfigured
 from django_routines import get_routine
@@ -87,6 +88,57 @@ def test_get_malformed_routine(self):
         with self.assertRaises(ImproperlyConfigured):
             get_routine("bad_command")
 
+    @override_settings(
+        DJANGO_ROUTINES={
+            "Indexed-Routine": {
+                "commands": [{"management": ("track", "0")}],
+                "help_text": "Indexed routine",
+            },
+            "other": {"commands": [], "help_text": "Other routine"},
+        }
+    )
+    def test_routine_index(self):
+        from unittest import mock
+        from django_routines import Routine, routines
+
+        indexed = get_routine("indexed_routine")
+        # routines are named after their keys in the setting
+        self.assertEqual(indexed.name, "Indexed_Routine")
+        with mock.patch.object(
+            Routine, "from_dict", side_effect=AssertionError("routine was rebuilt")
+        ):
+            self.assertIs(get_routine("indexed_routine"), indexed)
+            self.assertIs(get_routine("indexed-routine"), indexed)
+            self.assertIs(get_routine("INDEXED-ROUTINE"), indexed)
+        self.assertEqual([rtn.name for rtn in routines()], ["Indexed_Routine", "other"])
+
+        # routines added to the setting in place are found
+        settings.DJANGO_ROUTINES["Added"] = {"commands": [], "help_text": "Added"}
+        try:
+            self.assertEqual(get_routine("added").help_text, "Added")
+            settings.DJANGO_ROUTINES["Added"] = {"commands": [], "help_text": "New"}
+            self.assertEqual(get_routine("ADDED").help_text, "New")
+        finally:
+            del settings.DJANGO_ROUTINES["Added"]
+        with self.assertRaises(KeyError):
+            get_routine("added")
+
+        with override_settings(
+            DJANGO_ROUTINES={
+                "indexed-routine": {
+                    "commands": [{"management": ("track", "1")}],
+                    "help_text": "Changed routine",
+                }
+            }
+        ):
+            changed = get_routine("indexed_routine")
+            self.assertIsNot(changed, indexed)
+            self.assertEqual(changed.help_text, "Changed routine")
+            with self.assertRaises(KeyError):
+                get_routine("other")
+
+        self.assertEqual(get_routine("indexed_routine").help_text, "Indexed routine")
+
     # why do these break everything??
     # @override_settings(DJANGO_ROUTINES={})
     # def test_no_routines(self):
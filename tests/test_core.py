@@ -608,13 +608,45 @@ def test_subprocess(self):
  [8] python tests{os.sep}system_cmd.py sys 2                                                  
                                                                                 
 ╭─ Options ────────────────────────────────────────────────────────────────────╮
-│ --subprocess          Run commands as subprocesses.                          │
-│ --atomic              Run all commands in the same transaction.              │
-│ --continue            Continue through the routine if any commands fail.     │
-│ --all                 Include all switched commands.                         │
+│ --subprocess                         Run commands as subprocesses.           │
+│ --fork                               Fork subprocesses from the routine      │
+│                                      process.                                │
+│ --batch                              Run adjacent management commands in the │
+│                                      same subprocess.                        │
+│ --atomic                             Run all commands in the same            │
+│                                      transaction.                            │
+│ --continue                           Continue through the routine if any     │
+│                                      commands fail.                          │
+│ --jobs               N [x>=1]        The maximum number of commands to run   │
+│                                      concurrently.                           │
+│ --retain             POLICY          The command results to keep: all,       │
+│                                      codes, spill or the number of most      │
+│                                      recent results.                         │
+│ --log-dir            DIRECTORY       Write the output of subprocesses to log │
+│                                      files in this directory.                │
+│ --time-budget        SECONDS [x>=0]  The number of seconds the routine may   │
+│                                      run for. Commands still running when it │
+│                                      runs out are stopped.                   │
+│ --force                              Run commands even if their inputs have  │
+│                                      not changed.                            │
+│ --resume                             Skip the commands that succeeded in the │
+│                                      last run of the routine if it did not   │
+│                                      finish.                                 │
+│ --timings                            Print the slowest commands when the     │
+│                                      routine finishes.                       │
+│ --memory                             Record the memory used by each command  │
+│                                      and print it when the routine finishes. │
+│ --profile                            Profile each command and print a        │
+│                                      summary when the routine finishes.      │
+│ --sample                             Sample the stacks of commands instead   │
+│                                      of profiling every call. Implies        │
+│                                      --profile.                              │
+│ --profile-dir        DIRECTORY       Write the profile of each command to    │
+│                                      this directory. Implies --profile.      │
+│ --all                                Include all switched commands.          │
 │ --demo                                                                       │
 │ --import                                                                     │
-│ --help                Show this message and exit.                            │
+│ --help                               Show this message and exit.             │
 ╰──────────────────────────────────────────────────────────────────────────────╯
 ╭─ Commands ───────────────────────────────────────────────────────────────────╮
 │ list   List the commands that will be run.                                   │
@@ -703,13 +735,37 @@ def test_helps_rich(self):
   [8] python tests{os.sep}system_cmd.py sys 2
 
 Options:
-  --subprocess  Run commands as subprocesses.
-  --atomic      Run all commands in the same transaction.
-  --continue    Continue through the routine if any commands fail.
-  --all         Include all switched commands.
+  --subprocess             Run commands as subprocesses.
+  --fork                   Fork subprocesses from the routine process.
+  --batch                  Run adjacent management commands in the same
+                           subprocess.
+  --atomic                 Run all commands in the same transaction.
+  --continue               Continue through the routine if any commands fail.
+  --jobs N                 The maximum number of commands to run concurrently.
+                           [x>=1]
+  --retain POLICY          The command results to keep: all, codes, spill or the
+                           number of most recent results.
+  --log-dir DIRECTORY      Write the output of subprocesses to log files in this
+                           directory.
+  --time-budget SECONDS    The number of seconds the routine may run for.
+                           Commands still running when it runs out are stopped.
+                           [x>=0]
+  --force                  Run commands even if their inputs have not changed.
+  --resume                 Skip the commands that succeeded in the last run of
+                           the routine if it did not finish.
+  --timings                Print the slowest commands when the routine finishes.
+  --memory                 Record the memory used by each command and print it
+                           when the routine finishes.
+  --profile                Profile each command and print a summary when the
+                           routine finishes.
+  --sample                 Sample the stacks of commands instead of profiling
+                           every call. Implies --profile.
+  --profile-dir DIRECTORY  Write the profile of each command to this directory.
+                           Implies --profile.
+  --all                    Include all switched commands.
   --demo
   --import
-  --help        Show this message and exit.
+  --help                   Show this message and exit.
 
 Commands:
   list  List the commands that will be run.
@@ -758,6 +814,13 @@ def test_settings_format(self):
                         "post_hook": None,
                         "priority": 0,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -767,6 +830,13 @@ def test_settings_format(self):
                         "post_hook": None,
                         "priority": 0,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -776,6 +846,13 @@ def test_settings_format(self):
                         "post_hook": None,
                         "priority": 0,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                 ],
@@ -783,8 +860,16 @@ def test_settings_format(self):
                 "name": "bad",
                 "switch_helps": {},
                 "subprocess": False,
+                "fork": False,
+                "batch": False,
                 "atomic": False,
                 "continue_on_error": False,
+                "jobs": 1,
+                "retain": "all",
+                "log_dir": None,
+                "log_max_bytes": None,
+                "log_tail": 0,
+                "time_budget": None,
                 "initialize": None,
                 "finalize": None,
                 "pre_hook": None,
@@ -802,6 +887,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": ("prepare",),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -811,6 +903,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -820,6 +919,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -829,6 +935,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -838,6 +951,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": ("import",),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -847,6 +967,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": ("demo",),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                 ],
@@ -857,8 +984,16 @@ def test_settings_format(self):
                     "prepare": "Prepare the deployment.",
                 },
                 "subprocess": False,
+                "fork": False,
+                "batch": False,
                 "atomic": False,
                 "continue_on_error": False,
+                "jobs": 1,
+                "retain": "all",
+                "log_dir": None,
+                "log_max_bytes": None,
+                "log_tail": 0,
+                "time_budget": None,
                 "initialize": None,
                 "finalize": None,
                 "pre_hook": None,
@@ -876,6 +1011,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": ("import", "demo"),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -885,6 +1027,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": ("import",),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -894,6 +1043,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -903,6 +1059,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -912,6 +1075,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -921,6 +1091,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": ("demo",),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -929,6 +1106,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -937,6 +1121,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                 ],
@@ -944,8 +1135,16 @@ def test_settings_format(self):
                 "name": "import",
                 "switch_helps": {},
                 "subprocess": False,
+                "fork": False,
+                "batch": False,
                 "atomic": False,
                 "continue_on_error": False,
+                "jobs": 1,
+                "retain": "all",
+                "log_dir": None,
+                "log_max_bytes": None,
+                "log_tail": 0,
+                "time_budget": None,
                 "initialize": None,
                 "finalize": None,
                 "pre_hook": None,
@@ -963,6 +1162,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": ("hyphen_ok", "hyphen_ok_prefix"),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -972,6 +1178,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -981,6 +1194,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": ("hyphen_ok",),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -990,6 +1210,13 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": (),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                     {
@@ -999,14 +1226,29 @@ def test_settings_format(self):
                         "pre_hook": None,
                         "post_hook": None,
                         "switches": ("hyphen_ok", "hyphen_ok_prefix"),
+                        "label": None,
+                        "after": None,
+                        "inputs": (),
+                        "input_settings": (),
+                        "input_env": (),
+                        "outputs": (),
+                        "timeout": None,
                         "result": None,
                     },
                 ],
                 "help_text": "Test that hyphens dont mess everything up.",
                 "name": "test_hyphen",
                 "subprocess": False,
+                "fork": False,
+                "batch": False,
                 "atomic": False,
                 "continue_on_error": False,
+                "jobs": 1,
+                "retain": "all",
+                "log_dir": None,
+                "log_max_bytes": None,
+                "log_tail": 0,
+                "time_budget": None,
                 "initialize": None,
                 "finalize": None,
                 "pre_hook": None,
@@ -0,0 +1,86 @@
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine
+from tests import track_file
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not supported.")
+@override_settings(
+    DJANGO_ROUTINES={
+        "forked": Routine(
+            "forked",
+            "Fork management commands from the routine process.",
+            commands=[
+                ManagementCommand(("track", "0")),
+                ManagementCommand(("track", "1"), options={"demo": 2}),
+                ManagementCommand(("track", "2", "--raise"), switches=["fail"]),
+            ],
+            subprocess=True,
+            fork=True,
+        ),
+    }
+)
+class TestFork(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        if track_file.is_file():
+            os.remove(track_file)
+        super().setUp()
+
+    def tearDown(self):
+        if track_file.is_file():
+            os.remove(track_file)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def run_routine(self, *args):
+        from django_routines.management.commands.routine import Command
+
+        command = Command()
+        # a fresh manage.py invocation would fail with this script
+        call_command(
+            command,
+            "--verbosity",
+            "0",
+            "--manage-script",
+            "does-not-exist.py",
+            "forked",
+            *args,
+        )
+        return command
+
+    def test_fork(self):
+        command = self.run_routine()
+        track = json.loads(track_file.read_text())
+        self.assertEqual(track["invoked"], [0, 1])
+        self.assertEqual(track["passed_options"][1]["demo"], 2)
+        assert command.routine
+        for cmd in command.plan:
+            self.assertIsInstance(cmd.result, subprocess.CompletedProcess)
+            self.assertEqual(cmd.result.returncode, 0)
+            self.assertIn("does-not-exist.py", cmd.result.args)
+        self.assertEqual(command._routine_options["fork"], True)
+
+    def test_fork_failure(self):
+        with self.assertRaisesMessage(CommandError, "with return code 1"):
+            self.run_routine("--fail")
+        track = json.loads(track_file.read_text())
+        self.assertEqual(track["invoked"], [0, 1, 2])
+
+    def test_no_fork(self):
+        with self.assertRaisesMessage(CommandError, "with return code 2"):
+            self.run_routine("--no-fork")
@@ -1,8 +1,9 @@
 import importlib
+import sys
 from importlib.util import find_spec
 import os
 from django.test import TestCase, override_settings
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django_routines import (
     ROUTINE_SETTING,
     Routine,
@@ -14,6 +15,7 @@
 from pathlib import Path
 from functools import partial
 import json
+from unittest import mock
 from .hooks import pre_hook, post_hook
 from tests import track_file
 
@@ -35,8 +37,21 @@
     "pythonpath": None,
     "traceback": False,
     "subprocess": None,
+    "fork": False,
+    "batch": False,
     "atomic": None,
     "continue_on_error": None,
+    "jobs": 1,
+    "retain": "all",
+    "log_dir": None,
+    "time_budget": None,
+    "force": False,
+    "resume": False,
+    "timings": False,
+    "memory": False,
+    "profile": False,
+    "sample": False,
+    "profile_dir": None,
     "all": False,
 }
 if find_spec("rich"):
@@ -48,6 +63,11 @@ def mult_arg_by_2(command: Command):
     command.command = tuple([*parts[:-1], str(int(parts[-1]) * 2)])
 
 
+def mult_args_in_place(command: Command):
+    command.command[-1] = str(int(command.command[-1]) * 2)
+    command.options["demo"] *= 2
+
+
 def mult_result_by_4(command: Command):
     result = getattr(command.result, "stdout", command.result)
     if result is not None:
@@ -273,3 +293,213 @@ def test_hook_command_mutability(self):
         # TODO - https://github.com/bckohan/django-routines/issues/41
         # self.assertEqual(post_hooks[2][5], 16)
         # self.assertEqual(pre_hooks[2][6], 16)
+
+    @override_settings(
+        DJANGO_ROUTINES={
+            "routine-hooks": Routine(
+                commands=[
+                    ManagementCommand(command=("track", "0"), pre_hook=pre_hook),
+                    ManagementCommand(
+                        command=("track", "1"), post_hook="tests.hooks.post_hoook"
+                    ),
+                ],
+                help_text=("Test broken hooks are reported before the routine runs."),
+                name="routine-hooks",
+            ),
+        }
+    )
+    def test_broken_hook(self):
+        self.reload()
+        with self.assertRaisesMessage(
+            CommandError, "Unable to import hook tests.hooks.post_hoook"
+        ):
+            call_command("routine", "routine-hooks")
+        self.assertFalse(track_file.is_file())
+
+    @override_settings(
+        DJANGO_ROUTINES={
+            "routine-hooks": Routine(
+                commands=[
+                    ManagementCommand(command=("track", "0"), pre_hook=pre_hook),
+                    ManagementCommand(command=("track", "1")),
+                ],
+                help_text=("Test hooks are only imported once per run."),
+                name="routine-hooks",
+                pre_hook="tests.hooks.pre_hook",
+                post_hook="tests.hooks.post_hook",
+            ),
+        }
+    )
+    def test_hooks_resolved_once(self):
+        self.reload()
+        from django_routines.management.commands import routine
+
+        with mock.patch.object(
+            routine, "import_string", wraps=routine.import_string
+        ) as import_string:
+            call_command("routine", "routine-hooks")
+        self.assertEqual(
+            sorted(call.args[0] for call in import_string.call_args_list),
+            ["tests.hooks.post_hook", "tests.hooks.pre_hook"],
+        )
+        track = json.loads(track_file.read_text())
+        self.assertEqual(track["invoked"], [0, 1])
+        self.assertEqual(len(track["post_hooks"]), 2)
+
+    def test_runs_do_not_modify_configuration(self):
+        routine = Routine(
+            commands=[
+                ManagementCommand(
+                    command=("rtrack", "1"),
+                    pre_hook=partial(pre_hook, modify=mult_arg_by_2),
+                    post_hook=partial(post_hook, modify=mult_result_by_4),
+                ),
+                ManagementCommand(
+                    command=("track", "2"), pre_hook=partial(pre_hook, ret=True)
+                ),
+            ],
+            help_text="Test runs are isolated from the routine configuration.",
+            name="routine-hooks",
+            post_hook=post_hook,
+        )
+        with override_settings(DJANGO_ROUTINES={"routine-hooks": routine}):
+            self.reload()
+            from django_routines.management.commands.routine import Command, Status
+
+            for _ in range(2):
+                command = Command()
+                call_command(command, "routine-hooks")
+                self.assertEqual(
+                    [run.status for run in command.runs],
+                    [Status.SUCCEEDED, Status.SKIPPED],
+                )
+                self.assertEqual(command.runs[0].command.command, ("rtrack", "2"))
+                self.assertEqual(command.runs[0].result, 8)
+                self.assertIsNone(command.runs[1].result)
+        self.assertEqual(routine.commands[0].command, ("rtrack", "1"))
+        self.assertIsNone(routine.commands[0].result)
+        self.assertIsNone(routine.commands[1].post_hook)
+        self.assertEqual(json.loads(track_file.read_text())["invoked"], [2, 2])
+
+    def test_runs_copy_mutable_fields(self):
+        routine = Routine(
+            commands=[
+                ManagementCommand(
+                    command=["track", "1"],
+                    options={"demo": 1},
+                    pre_hook=partial(pre_hook, modify=mult_args_in_place),
+                ),
+            ],
+            help_text="Hooks may modify the arguments of their command in place.",
+            name="routine-hooks",
+        )
+        with override_settings(DJANGO_ROUTINES={"routine-hooks": routine}):
+            self.reload()
+            from django_routines.management.commands.routine import Command
+
+            for _ in range(2):
+                command = Command()
+                call_command(command, "routine-hooks")
+                self.assertEqual(command.runs[0].command.command, ["track", "2"])
+                self.assertEqual(command.runs[0].command.options["demo"], 2)
+        self.assertEqual(routine.commands[0].command, ["track", "1"])
+        self.assertEqual(routine.commands[0].options, {"demo": 1})
+        self.assertEqual(json.loads(track_file.read_text())["invoked"], [2, 2])
+
+
+OPTION_SWITCHES = [
+    "subprocess",
+    "fork",
+    "batch",
+    "atomic",
+    "continue",
+    "continue-on-error",
+    "jobs",
+    "retain",
+    "log-dir",
+    "time-budget",
+    "force",
+    "resume",
+    "timings",
+    "memory",
+    "profile",
+    "sample",
+    "profile-dir",
+    "all",
+    "ctx",
+]
+
+
+class SwitchNameTests(TestCase):
+    """
+    Switches may share the names of the routine's options.
+    """
+
+    def setUp(self):
+        if track_file.is_file():
+            os.remove(track_file)
+        self.reload()
+        super().setUp()
+
+    def tearDown(self):
+        if track_file.is_file():
+            os.remove(track_file)
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def reload(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+
+    def run_routine(self, *args):
+        track_file.unlink(missing_ok=True)
+        call_command("routine", "--no-color", "shadowed", *args)
+        return json.loads(track_file.read_text())
+
+    @override_settings(
+        DJANGO_ROUTINES={
+            "shadowed": Routine(
+                commands=[
+                    ManagementCommand(command=("track", "0")),
+                    *(
+                        ManagementCommand(command=("track", str(idx)), switches=[name])
+                        for idx, name in enumerate(OPTION_SWITCHES, start=1)
+                    ),
+                ],
+                help_text="Switches named after options.",
+                name="shadowed",
+                pre_hook="tests.test_hooks.pre_hook_track",
+            ),
+        }
+    )
+    def test_switches_named_after_options(self):
+        self.reload()
+        for idx, name in enumerate(OPTION_SWITCHES, start=1):
+            track = self.run_routine(f"--{name}")
+            self.assertEqual(track["invoked"], [0, idx], name)
+
+        # switches keep their flags, the options they shadow are renamed
+        track = self.run_routine("--force", "--timings")
+        options = track["pre_hooks"][-1][4]
+        self.assertIs(options["force"], False)
+        self.assertIs(options["timings"], False)
+        self.assertEqual(track["invoked"], [0, 11, 13])
+
+        track = self.run_routine("--routine-force", "--routine-jobs", "2")
+        options = track["pre_hooks"][-1][4]
+        self.assertIs(options["force"], True)
+        self.assertEqual(options["jobs"], 2)
+        self.assertEqual(track["invoked"], [0])
+
+        track = self.run_routine("--routine-all")
+        self.assertEqual(track["invoked"], list(range(len(OPTION_SWITCHES) + 1)))
+
+        # switches are passed to hooks by their symbols
+        track = self.run_routine("--continue")
+        options = track["pre_hooks"][-1][4]
+        self.assertIs(options["continue_"], True)
+        self.assertIs(options["continue_on_error"], False)
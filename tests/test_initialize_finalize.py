@@ -29,8 +29,21 @@
     "pythonpath": None,
     "traceback": False,
     "subprocess": None,
+    "fork": False,
+    "batch": False,
     "atomic": None,
     "continue_on_error": None,
+    "jobs": 1,
+    "retain": "all",
+    "log_dir": None,
+    "time_budget": None,
+    "force": False,
+    "resume": False,
+    "timings": False,
+    "memory": False,
+    "profile": False,
+    "sample": False,
+    "profile_dir": None,
     "all": False,
 }
 if find_spec("rich"):
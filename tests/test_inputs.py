@@ -0,0 +1,157 @@
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, inputs
+from django_routines.signals import routine_finished
+from tests import track_file
+
+INPUT_DIR = Path(tempfile.gettempdir()) / "django-routines-inputs"
+
+
+def test_digest(tmp_path, monkeypatch, settings):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "sub" / "b.txt").write_text("b")
+    command = ManagementCommand(
+        ("track", "0"),
+        inputs=[str(tmp_path / "**" / "*.txt")],
+        input_settings=["INPUTS_SETTING"],
+        input_env=["INPUTS_ENV"],
+    )
+    assert inputs.declared(command)
+    assert not inputs.declared(ManagementCommand(("track", "0")))
+    assert inputs.files(command.inputs) == [
+        tmp_path / "a.txt",
+        tmp_path / "sub" / "b.txt",
+    ]
+    monkeypatch.delenv("INPUTS_ENV", raising=False)
+    first = inputs.digest(command)
+    assert inputs.digest(command) == first
+
+    (tmp_path / "sub" / "b.txt").write_text("c")
+    second = inputs.digest(command)
+    assert second != first
+
+    settings.INPUTS_SETTING = None
+    third = inputs.digest(command)
+    # a setting set to None is not the same as an undefined setting
+    assert third != second
+
+    monkeypatch.setenv("INPUTS_ENV", "1")
+    assert inputs.digest(command) != third
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "inputs": Routine(
+            "inputs",
+            "Skip commands whose inputs have not changed.",
+            commands=[
+                ManagementCommand(("track", "0")),
+                ManagementCommand(("track", "1"), inputs=[str(INPUT_DIR / "*.txt")]),
+                ManagementCommand(("track", "2"), input_env=["INPUTS_ENV"]),
+            ],
+        ),
+    }
+)
+class TestInputs(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        if track_file.is_file():
+            os.remove(track_file)
+        INPUT_DIR.mkdir(exist_ok=True)
+        (INPUT_DIR / "input.txt").write_text("0")
+        self.cache_dir = Path(tempfile.mkdtemp())
+        self.env = os.environ.pop("INPUTS_ENV", None)
+        self.finished = []
+        routine_finished.connect(self.routine_finished)
+        super().setUp()
+
+    def tearDown(self):
+        routine_finished.disconnect(self.routine_finished)
+        shutil.rmtree(INPUT_DIR, ignore_errors=True)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        if self.env is not None:
+            os.environ["INPUTS_ENV"] = self.env
+        else:
+            os.environ.pop("INPUTS_ENV", None)
+        if track_file.is_file():
+            os.remove(track_file)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def routine_finished(self, sender, routine, early_exit, last_command, **kwargs):
+        self.finished.append(kwargs["unchanged"])
+
+    def run_routine(self, *args):
+        from django_routines.management.commands.routine import Command
+
+        if track_file.is_file():
+            os.remove(track_file)
+        command = Command()
+        self.out = StringIO()
+        with override_settings(DJANGO_ROUTINES_CACHE_DIR=self.cache_dir):
+            call_command(command, "--no-color", "inputs", *args, stdout=self.out)
+        if track_file.is_file():
+            return command, json.loads(track_file.read_text())["invoked"]
+        return command, []
+
+    def test_unchanged(self):
+        from django_routines.management.commands.routine import Status
+
+        command, invoked = self.run_routine()
+        self.assertEqual(invoked, [0, 1, 2])
+        self.assertEqual(self.finished[-1], [])
+
+        command, invoked = self.run_routine()
+        self.assertEqual(invoked, [0])
+        self.assertEqual(
+            [run.status for run in command.runs],
+            [Status.SUCCEEDED, Status.UNCHANGED, Status.UNCHANGED],
+        )
+        self.assertIn("track 1 is up to date.", self.out.getvalue())
+        self.assertEqual(self.finished[-1], [1, 2])
+
+        (INPUT_DIR / "input.txt").write_text("1")
+        self.assertEqual(self.run_routine()[1], [0, 1])
+
+        os.environ["INPUTS_ENV"] = "1"
+        self.assertEqual(self.run_routine()[1], [0, 2])
+
+        self.assertEqual(self.run_routine("--force")[1], [0, 1, 2])
+        self.assertEqual(self.finished[-1], [])
+
+    def test_list(self):
+        self.run_routine()
+        self.run_routine("list")
+        self.assertEqual(
+            self.out.getvalue().splitlines(),
+            ["[0] track 0", "[0] track 1 [unchanged]", "[0] track 2 [unchanged]"],
+        )
+        (INPUT_DIR / "input.txt").write_text("1")
+        self.run_routine("list")
+        self.assertNotIn("track 1 [unchanged]", self.out.getvalue())
+
+    def test_no_cache_dir(self):
+        from django_routines.management.commands.routine import Command
+
+        for _ in range(2):
+            if track_file.is_file():
+                os.remove(track_file)
+            call_command(Command(), "--verbosity", "0", "inputs")
+            self.assertEqual(json.loads(track_file.read_text())["invoked"], [0, 1, 2])
@@ -0,0 +1,247 @@
+import importlib
+import subprocess
+import sys
+import threading
+import typing as t
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, SystemCommand
+from django_routines.signals import routine_failed, routine_finished
+
+events: t.List[t.Tuple[str, str]] = []
+b_started = threading.Event()
+TIMEOUT = 5
+
+ECHO = (
+    "import sys\n"
+    "for line in range(3):\n"
+    "    print('{name}', line, flush=True)\n"
+    "    print('{name}', line, file=sys.stderr, flush=True)"
+)
+
+
+def pre(routine, command, previous, options):
+    events.append((command.label, "pre"))
+
+
+def post(routine, command, nxt, options):
+    events.append((command.label, "post"))
+
+
+def b_start(routine, command, previous, options):
+    pre(routine, command, previous, options)
+    b_started.set()
+
+
+def wait_for_b(routine, command, previous, options):
+    pre(routine, command, previous, options)
+    # a will only see b start if they run concurrently
+    command.waited = b_started.wait(TIMEOUT)
+
+
+def exit_early(routine, command, nxt, options):
+    post(routine, command, nxt, options)
+    return True
+
+
+def noop(label, **kwargs):
+    return ManagementCommand(
+        ("noop", label),
+        label=label,
+        pre_hook=kwargs.pop("pre_hook", pre),
+        post_hook=kwargs.pop("post_hook", post),
+        **kwargs,
+    )
+
+
+PARALLEL = Routine(
+    "parallel",
+    "Run independent commands concurrently.",
+    commands=[
+        noop("a", after=(), pre_hook=wait_for_b),
+        noop("b", after=(), pre_hook=b_start),
+        noop("c", after=("a", "b")),
+        noop("d"),
+    ],
+)
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "parallel": PARALLEL,
+        "default-jobs": Routine(
+            "default-jobs",
+            "Run two jobs by default.",
+            commands=[
+                noop("a", after=(), pre_hook=wait_for_b),
+                noop("b", after=(), pre_hook=b_start),
+            ],
+            jobs=2,
+        ),
+        "fail": Routine(
+            "fail",
+            "A failing command stops the routine.",
+            commands=[
+                SystemCommand((sys.executable, "-c", "exit(1)"), label="a", after=()),
+                noop("b", after="a"),
+            ],
+        ),
+        "exit": Routine(
+            "exit",
+            "Exit the routine early.",
+            commands=[noop("a", post_hook=exit_early), noop("b")],
+        ),
+        "multiplex": Routine(
+            "multiplex",
+            "Multiplex the output of concurrent system commands.",
+            commands=[
+                SystemCommand(
+                    (sys.executable, "-c", ECHO.format(name=name)),
+                    label=name,
+                    after=(),
+                )
+                for name in ("one", "three")
+            ],
+        ),
+        "unknown": Routine(
+            "unknown",
+            "Depend on a command that does not exist.",
+            commands=[noop("a", after=("missing",))],
+        ),
+        "backwards": Routine(
+            "backwards",
+            "Depend on a command ordered after this one.",
+            commands=[noop("a", after=("b",)), noop("b")],
+        ),
+    }
+)
+class TestJobs(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        events.clear()
+        b_started.clear()
+        super().setUp()
+
+    def tearDown(self):
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def run_routine(self, *args, **kwargs) -> "Routine":
+        from django_routines.management.commands.routine import Command
+
+        command = Command()
+        call_command(command, "--verbosity", "0", *args, **kwargs)
+        assert command.routine
+        return command.routine
+
+    def test_independent_commands_overlap(self):
+        routine = self.run_routine("parallel", "--jobs", "2")
+        self.assertTrue(routine.commands[0].waited)
+        self.assertEqual(
+            events[-4:],
+            [("c", "pre"), ("c", "post"), ("d", "pre"), ("d", "post")],
+        )
+        self.assertCountEqual(
+            events[:4], [("a", "pre"), ("a", "post"), ("b", "pre"), ("b", "post")]
+        )
+
+    def test_routine_jobs(self):
+        routine = self.run_routine("default-jobs")
+        self.assertTrue(routine.commands[0].waited)
+
+    def test_sequential(self):
+        global TIMEOUT
+        TIMEOUT, timeout = 0, TIMEOUT
+        try:
+            routine = self.run_routine("parallel")
+        finally:
+            TIMEOUT = timeout
+        self.assertFalse(routine.commands[0].waited)
+        self.assertEqual(
+            events, [(label, hook) for label in "abcd" for hook in ("pre", "post")]
+        )
+
+    def test_failure_stops_scheduling(self):
+        failed = []
+
+        def receiver(sender, failed_command, **kwargs):
+            failed.append(failed_command)
+
+        routine_failed.connect(receiver)
+        try:
+            with self.assertRaises(CommandError):
+                self.run_routine("fail", "--jobs", "2")
+        finally:
+            routine_failed.disconnect(receiver)
+        self.assertEqual(failed, [0])
+        self.assertEqual(events, [])
+
+    def test_exit_early(self):
+        finished = []
+
+        def receiver(sender, early_exit, last_command, **kwargs):
+            finished.append((early_exit, last_command, kwargs["jobs"]))
+
+        routine_finished.connect(receiver)
+        try:
+            self.run_routine("exit", "--jobs", "4")
+        finally:
+            routine_finished.disconnect(receiver)
+        self.assertEqual(finished, [(True, 0, 4)])
+        self.assertEqual(events, [("a", "pre"), ("a", "post")])
+
+    def test_atomic_jobs(self):
+        with self.assertRaises(CommandError):
+            self.run_routine("parallel", "--atomic", "--jobs", "2")
+
+    def test_invalid_after(self):
+        with self.assertRaisesMessage(CommandError, "unknown command missing"):
+            self.run_routine("unknown", "--jobs", "2")
+        with self.assertRaisesMessage(CommandError, "b is ordered after it"):
+            self.run_routine("backwards", "--jobs", "2")
+
+    def test_in_process_echo(self):
+        from django_routines.management.commands.routine import Command
+
+        out = StringIO()
+        call_command(Command(), "--no-color", "parallel", "--jobs", "2", stdout=out)
+        # in process commands are echoed with the prefix of their output
+        self.assertCountEqual(
+            [line for line in out.getvalue().splitlines() if "noop" in line],
+            [f"{label} | noop {label}" for label in ("a", "b", "c", "d")],
+        )
+
+    def test_multiplexed_output(self):
+        out = StringIO()
+        err = StringIO()
+        routine = self.run_routine(
+            "--no-color", "multiplex", "--jobs", "2", stdout=out, stderr=err
+        )
+        for stream in (out, err):
+            lines = stream.getvalue().splitlines()
+            self.assertCountEqual(
+                lines,
+                [
+                    f"{name.ljust(5)} | {name} {line}"
+                    for name in ("one", "three")
+                    for line in range(3)
+                ],
+            )
+            for name in ("one", "three"):
+                # each command's lines are in order
+                self.assertEqual(
+                    [line for line in lines if line.startswith(name)],
+                    [f"{name.ljust(5)} | {name} {line}" for line in range(3)],
+                )
+        for command in routine.commands:
+            self.assertIsInstance(command.result, subprocess.CompletedProcess)
+            self.assertEqual(command.result.returncode, 0)
@@ -0,0 +1,173 @@
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, SystemCommand, journal
+from tests import track_file
+
+FLAG = Path(tempfile.gettempdir()) / "django-routines-journal-fail"
+
+FAIL = f"import os, sys; sys.exit(1 if os.path.exists({str(FLAG)!r}) else 0)"
+
+
+def test_journal(tmp_path):
+    path = tmp_path / "journal.log"
+    assert journal.read(path) == set()
+    with journal.Journal(path) as log:
+        log.record(0)
+        log.record(2)
+    assert log._file.closed
+    assert journal.read(path) == {0, 2}
+
+    # a line that was only partially written is ignored
+    with open(path, "a") as partial:
+        partial.write("3")
+    log = journal.Journal(path, resume=True)
+    assert log.completed == {0, 2}
+    log.close(discard=True)
+    assert not path.exists()
+
+    # new journals replace old ones
+    path.write_text("1\n")
+    journal.Journal(path).close()
+    assert journal.read(path) == set()
+
+
+def test_name():
+    plan = [ManagementCommand(("track", "0"))]
+    assert journal.name("deploy", ["b", "a"], plan) == journal.name(
+        "deploy", ["a", "b"], plan
+    )
+    assert journal.name("deploy", [], plan) != journal.name("deploy", ["a"], plan)
+    assert journal.name("deploy", [], plan) != journal.name(
+        "deploy", [], [ManagementCommand(("track", "1"))]
+    )
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "resumable": Routine(
+            "resumable",
+            "Resume routines that failed.",
+            commands=[
+                ManagementCommand(("track", "0")),
+                ManagementCommand(("track", "1")),
+                SystemCommand((sys.executable, "-c", FAIL)),
+                ManagementCommand(("track", "2")),
+                ManagementCommand(("track", "3"), switches=["three"]),
+            ],
+        ),
+    }
+)
+class TestResume(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        self.cache_dir = Path(tempfile.mkdtemp())
+        FLAG.touch()
+        super().setUp()
+
+    def tearDown(self):
+        FLAG.unlink(missing_ok=True)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        if track_file.is_file():
+            os.remove(track_file)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def run_routine(self, *args):
+        from django_routines.management.commands.routine import Command
+
+        if track_file.is_file():
+            os.remove(track_file)
+        command = Command()
+        self.out = StringIO()
+        try:
+            with override_settings(DJANGO_ROUTINES_CACHE_DIR=self.cache_dir):
+                call_command(command, "--no-color", "resumable", *args, stdout=self.out)
+        finally:
+            self.invoked = (
+                json.loads(track_file.read_text())["invoked"]
+                if track_file.is_file()
+                else []
+            )
+        return command
+
+    def journals(self):
+        return sorted(path.name for path in self.cache_dir.glob("journal-*.log"))
+
+    def test_resume(self):
+        from django_routines.management.commands.routine import Status
+
+        with self.assertRaises(CommandError):
+            self.run_routine()
+        self.assertEqual(self.invoked, [0, 1])
+        self.assertEqual(len(self.journals()), 1)
+
+        FLAG.unlink()
+        command = self.run_routine("--resume")
+        self.assertEqual(self.invoked, [2])
+        self.assertEqual(
+            [run.status for run in command.runs],
+            [Status.RESUMED, Status.RESUMED, Status.SUCCEEDED, Status.SUCCEEDED],
+        )
+        self.assertIn("track 1 already succeeded.", self.out.getvalue())
+        # the journal is discarded once the routine finishes
+        self.assertEqual(self.journals(), [])
+
+        self.run_routine("--resume")
+        self.assertEqual(self.invoked, [0, 1, 2])
+
+    def test_resume_switches(self):
+        FLAG.touch()
+        with self.assertRaises(CommandError):
+            self.run_routine()
+        FLAG.unlink()
+        # a different plan does not resume the journal
+        self.run_routine("--resume", "--three")
+        self.assertEqual(self.invoked, [0, 1, 2, 3])
+        self.assertEqual(len(self.journals()), 1)
+        self.run_routine("--resume")
+        self.assertEqual(self.invoked, [2])
+        self.assertEqual(self.journals(), [])
+
+    def test_resume_continue(self):
+        # failed commands keep the journal so they can be retried
+        self.run_routine("--continue")
+        self.assertEqual(self.invoked, [0, 1, 2])
+        self.assertEqual(len(self.journals()), 1)
+        FLAG.unlink()
+        command = self.run_routine("--resume")
+        self.assertEqual(self.invoked, [])
+        self.assertEqual(command.runs[2].status, "succeeded")
+        self.assertEqual(self.journals(), [])
+
+    def test_no_journal(self):
+        with self.assertRaises(CommandError):
+            self.run_routine("--atomic")
+        self.assertEqual(self.journals(), [])
+        from django_routines.management.commands.routine import Command
+
+        with self.assertRaisesMessage(
+            CommandError, "requires DJANGO_ROUTINES_CACHE_DIR"
+        ):
+            call_command(Command(), "resumable", "--resume")
+
+    def test_resume_atomic(self):
+        with self.assertRaisesMessage(CommandError, "cannot be resumed"):
+            self.run_routine("--atomic", "--resume")
+        self.assertEqual(self.invoked, [])
+        self.assertEqual(self.journals(), [])
@@ -0,0 +1,135 @@
+import importlib
+import json
+import subprocess
+import sys
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from io import StringIO
+
+
+def registered_groups():
+    from django_routines.management.commands.routine import Command
+
+    return [grp.name for grp in Command.typer_app.registered_groups]
+
+
+@override_settings(DJANGO_ROUTINES_LAZY=True)
+class TestLazyRegistration(TestCase):
+    def reload(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        return routine
+
+    def tearDown(self):
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def test_nothing_registered_on_import(self):
+        self.reload()
+        self.assertEqual(registered_groups(), [])
+
+    def test_only_invoked_routine_registered(self):
+        routine = self.reload()
+        with mock.patch.object(
+            sys, "argv", ["manage.py", "routine", "--verbosity", "0", "import", "list"]
+        ):
+            routine.Command()
+        self.assertEqual(registered_groups(), ["import"])
+
+    def test_hyphenated_routine_registered(self):
+        routine = self.reload()
+        with mock.patch.object(
+            sys, "argv", ["manage.py", "routine", "test-hyphen", "list"]
+        ):
+            routine.Command()
+        self.assertEqual(registered_groups(), ["test-hyphen"])
+
+    def test_batch_registers_nothing(self):
+        routine = self.reload()
+        with mock.patch.object(
+            sys,
+            "argv",
+            ["manage.py", "routine", "--verbosity", "1", routine.BATCH_COMMAND, "x"],
+        ):
+            routine.Command()
+        self.assertEqual(registered_groups(), [])
+
+    def test_help_registers_all(self):
+        routine = self.reload()
+        with mock.patch.object(sys, "argv", ["manage.py", "routine", "--help"]):
+            routine.Command()
+        self.assertEqual(
+            registered_groups(),
+            [
+                "deploy",
+                "import",
+                "bad",
+                "test-hyphen",
+                "atomic-pass",
+                "atomic-fail",
+                "test-continue",
+            ],
+        )
+
+    def test_call_command_registers_all(self):
+        self.reload()
+        out = StringIO()
+        call_command("routine", "--no-color", "import", "list", stdout=out)
+        self.assertIn("track 3", out.getvalue())
+        self.assertEqual(len(registered_groups()), 7)
+
+
+def test_lazy_cli():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "./manage.py",
+            "routine",
+            "--settings",
+            "tests.settings_lazy",
+            "--no-color",
+            "import",
+            "list",
+        ],
+        text=True,
+        capture_output=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "[3] track 3 (demo=2)" in result.stdout
+    assert "python tests/system_cmd.py sys 2" in result.stdout
+
+
+def test_lazy_batch(tmp_path):
+    spec = tmp_path / "batch.json"
+    results = tmp_path / "results.json"
+    spec.write_text(
+        json.dumps(
+            {
+                "commands": [[sys.executable, "./manage.py", "noop"]],
+                "skip": 2,
+                "results": str(results),
+            }
+        )
+    )
+    result = subprocess.run(
+        [
+            sys.executable,
+            "./manage.py",
+            "routine",
+            "--settings",
+            "tests.settings_lazy",
+            "_batch",
+            str(spec),
+        ],
+        text=True,
+        capture_output=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert json.loads(results.read_text()) == [{"returncode": 0, "result": None}]
@@ -0,0 +1,173 @@
+import importlib
+import shutil
+import sys
+import tempfile
+from io import BytesIO, StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, SystemCommand, logs
+
+CHATTY = (
+    "import sys\n"
+    "for line in range(100):\n"
+    "    print('out', line)\n"
+    "print('err', file=sys.stderr)\n"
+    "sys.exit({code})"
+)
+
+
+def chatty(label, code=0, **kwargs):
+    return SystemCommand(
+        (sys.executable, "-c", CHATTY.format(code=code)), label=label, **kwargs
+    )
+
+
+def test_rotating_log(tmp_path):
+    path = tmp_path / "cmd.log"
+    (tmp_path / "cmd.log.2").write_bytes(b"stale")
+    with logs.RotatingLog(path, max_bytes=10, backups=2) as log:
+        assert not (tmp_path / "cmd.log.2").exists()
+        for chunk in (b"0123456", b"789", b"abcdef", b"ghi", b"jklmnopqrstu"):
+            log.write(chunk)
+    assert log._file.closed
+    # closing is idempotent
+    log.close()
+    assert path.read_bytes() == b"jklmnopqrstu"
+    assert (tmp_path / "cmd.log.1").read_bytes() == b"abcdefghi"
+    assert (tmp_path / "cmd.log.2").read_bytes() == b"0123456789"
+    assert not (tmp_path / "cmd.log.3").exists()
+
+
+def test_tail():
+    tail = logs.Tail(2)
+    logs.pump(BytesIO(b"one\ntwo\nthr"), [tail.write], size=3)
+    assert tail.text() == "two\nthr"
+    tail.write(b"ee\n")
+    assert tail.text() == "two\nthree"
+
+
+def test_lines():
+    lines = []
+    splitter = logs.Lines(lines.append)
+    # a multibyte character split across chunks
+    data = "one\ntwo é\nthree".encode()
+    for idx in range(0, len(data), 4):
+        splitter.write(data[idx : idx + 4])
+    assert lines == ["one\n", "two é\n"]
+    splitter.close()
+    assert lines == ["one\n", "two é\n", "three\n"]
+
+
+def test_log_name():
+    assert logs.log_name(3, "my cmd/1") == "003-my_cmd_1"
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "logged": Routine(
+            "logged",
+            "Log the output of subprocesses.",
+            commands=[
+                chatty("first"),
+                ManagementCommand(("track", "1")),
+                ManagementCommand(("track", "2")),
+                chatty("second", after=()),
+                chatty("fail", code=3, switches=["fail"]),
+            ],
+            subprocess=True,
+            batch=True,
+            log_tail=2,
+        ),
+    }
+)
+class TestLogs(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        self.log_dir = Path(tempfile.mkdtemp())
+        super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def run_routine(self, *args, verbosity=1):
+        from django_routines.management.commands.routine import Command
+
+        command = Command()
+        self.out = StringIO()
+        self.err = StringIO()
+        call_command(
+            command,
+            "--no-color",
+            "--verbosity",
+            str(verbosity),
+            "--manage-script",
+            "./manage.py",
+            "logged",
+            "--log-dir",
+            str(self.log_dir),
+            *args,
+            stdout=self.out,
+            stderr=self.err,
+        )
+        return command
+
+    def test_logs(self):
+        command = self.run_routine()
+        self.assertEqual(
+            sorted(path.name for path in self.log_dir.iterdir()),
+            [
+                f"{idx:03d}-{name}.{stream}.log"
+                for idx, name in enumerate(["first", "track", "track", "second"])
+                for stream in ("stderr", "stdout")
+            ],
+        )
+        stdout = (self.log_dir / "000-first.stdout.log").read_text().splitlines()
+        self.assertEqual(stdout, [f"out {line}" for line in range(100)])
+        self.assertEqual((self.log_dir / "003-second.stderr.log").read_text(), "err\n")
+        self.assertEqual(command.plan[0].result.stdout, "out 98\nout 99")
+        self.assertEqual(command.plan[0].result.stderr, "err")
+        # management commands are not batched when logging
+        self.assertEqual((self.log_dir / "001-track.stdout.log").read_text(), "1\n")
+        # only the commands are echoed to the terminal
+        self.assertNotIn("out 0", self.out.getvalue())
+        self.assertIn("track 2", self.out.getvalue())
+        self.assertEqual(self.err.getvalue(), "")
+
+    def test_tee(self):
+        self.run_routine("--jobs", "2", verbosity=2)
+        lines = self.out.getvalue().splitlines()
+        for label in ("first", "second"):
+            self.assertEqual(
+                [
+                    line
+                    for line in lines
+                    if line.startswith(f"{label} ") and "| out " in line
+                ],
+                [f"{label.ljust(6)} | out {line}" for line in range(100)],
+            )
+        self.assertIn("second | err", self.err.getvalue().splitlines())
+
+    def test_failure_tail(self):
+        from django_routines.management.commands.routine import Status
+
+        with self.assertRaisesMessage(CommandError, "with return code 3"):
+            command = self.run_routine("--fail")
+        self.assertEqual(
+            (self.log_dir / "004-fail.stdout.log").read_text().splitlines()[-1],
+            "out 99",
+        )
+        command = self.run_routine("--fail", "--continue")
+        self.assertEqual(command.runs[-1].status, Status.FAILED)
+        self.assertEqual(command.runs[-1].result.returncode, 3)
+        self.assertEqual(command.runs[-1].result.stderr, "err")
@@ -0,0 +1,169 @@
+import importlib
+import os
+import sys
+import tracemalloc
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, SystemCommand, memory
+from tests import track_file
+
+ALLOCATE = "b = bytearray(32 * 1024 * 1024); b[::4096] = b'x' * len(b[::4096])"
+
+resource = pytest.importorskip("resource")
+
+
+def allocate(size: int):
+    return bytearray(size)
+
+
+def test_traced():
+    usage = memory.Usage()
+    with memory.Traced(usage) as traced:
+        held = allocate(4 * 1024 * 1024)
+        allocate(8 * 1024 * 1024)
+    assert traced is usage
+    assert not tracemalloc.is_tracing()
+    assert usage.peak >= 8 * 1024 * 1024
+    site, size = usage.sites[0]
+    assert site.endswith(
+        f"{os.path.basename(__file__)}:{allocate.__code__.co_firstlineno + 1}"
+    )
+    assert size >= len(held)
+    assert usage.maxrss is None and usage.cpu is None
+
+    # tracing that is already running is left running
+    tracemalloc.start()
+    try:
+        before = allocate(1024 * 1024)
+        with memory.Traced(memory.Usage(), sites=1) as recorded:
+            held = allocate(2 * 1024 * 1024)
+        assert tracemalloc.is_tracing()
+        assert len(recorded.sites) == 1
+        assert recorded.sites[0][1] >= len(held)
+        assert recorded.peak < len(before) + len(held)
+    finally:
+        tracemalloc.stop()
+
+
+def test_children():
+    usage = memory.Usage()
+    with memory.Children(usage) as children:
+        os.system(f'{sys.executable} -c "{ALLOCATE}"')
+    assert children is usage
+    assert usage.cpu > 0
+    assert usage.inblock >= 0 and usage.oublock >= 0
+    assert usage.peak is None
+    if usage.maxrss is not None:
+        assert usage.maxrss >= 32 * 1024 * 1024
+
+
+def test_size():
+    assert memory.size(None) == "-"
+    assert memory.size(12) == "12 B"
+    assert memory.size(1536) == "1.5 KiB"
+    assert memory.size(3 * 1024 * 1024) == "3.0 MiB"
+    assert memory.size(5 * 1024**4) == "5120.0 GiB"
+
+
+def test_table():
+    lines = memory.table(
+        [
+            (0, "small", "succeeded", memory.Usage(peak=1024, sites=[("a.py:1", 512)])),
+            (
+                1,
+                "big",
+                "failed",
+                memory.Usage(maxrss=2048, cpu=0.5, inblock=3, oublock=4),
+            ),
+            (2, "unmeasured", "succeeded", memory.Usage()),
+        ]
+    )
+    assert lines == [
+        "   #        Peak     Max RSS        CPU   Blocks in  Blocks out  Status      Command",
+        "   1           -     2.0 KiB     0.500s           3           4  failed      big",
+        "   0     1.0 KiB           -          -           -           -  succeeded   small",
+        "           512 B  a.py:1",
+        "   2           -           -          -           -           -  succeeded   unmeasured",
+    ]
+    assert memory.table([], limit=1) == [lines[0]]
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "measured": Routine(
+            "measured",
+            "Measure the memory used by the commands of a routine.",
+            commands=[
+                ManagementCommand(("track", "0")),
+                SystemCommand((sys.executable, "-c", ALLOCATE)),
+                ManagementCommand(("track", "1"), switches=["skipped"]),
+            ],
+        ),
+    }
+)
+class TestMemory(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        super().setUp()
+
+    def tearDown(self):
+        if track_file.is_file():
+            os.remove(track_file)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def run_routine(self, *args, verbosity=1):
+        from django_routines.management.commands.routine import Command
+
+        command = Command()
+        self.out = StringIO()
+        call_command(
+            command,
+            "--no-color",
+            "--verbosity",
+            str(verbosity),
+            "measured",
+            *args,
+            stdout=self.out,
+        )
+        return command
+
+    def test_memory(self):
+        command = self.run_routine("--memory")
+        track, system = (run.usage for run in command.runs)
+        self.assertGreater(track.peak, 0)
+        self.assertTrue(track.sites)
+        self.assertGreater(system.cpu, 0)
+        self.assertIsNone(system.peak)
+
+        lines = self.out.getvalue().splitlines()
+        header = next(idx for idx, line in enumerate(lines) if "Max RSS" in line)
+        rows = [line for line in lines[header + 1 :] if line.split()[0].isdigit()]
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(any(line.endswith("succeeded   track 0") for line in rows))
+
+        # nothing is reported at verbosity 0
+        self.run_routine("--memory", verbosity=0)
+        self.assertNotIn("Max RSS", self.out.getvalue())
+
+    def test_memory_jobs(self):
+        command = self.run_routine("--memory", "--jobs", "2")
+        track, system = (run.usage for run in command.runs)
+        self.assertGreater(track.peak, 0)
+        # children can not be attributed to commands when they run concurrently
+        self.assertIsNone(system.cpu)
+
+    def test_not_measured(self):
+        command = self.run_routine()
+        self.assertEqual(command.runs[0].usage, memory.Usage())
+        self.assertNotIn("Max RSS", self.out.getvalue())
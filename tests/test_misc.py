@@ -148,6 +148,134 @@ def test_command_spec():
     assert import_routine.commands[-2].system[0] == "python"
 
 
+INCREMENTAL = """
+from django_routines import ManagementCommand, command, routine, system
+
+for idx in range(300):
+    command("incremental", "track", str(idx), priority=idx % 3)
+system("incremental", "echo", "sys", priority=1)
+routine(
+    "incremental",
+    "Incremental routine.",
+    ManagementCommand(("track", "last"), priority=1),
+)
+"""
+
+
+def test_command_builders_incremental():
+    from unittest import mock
+    from django_routines import command, get_routine
+
+    # the builders write to the settings module that calls them
+    namespace = {}
+    with mock.patch.object(
+        Routine, "from_dict", side_effect=AssertionError("routine was rebuilt")
+    ):
+        exec(INCREMENTAL, namespace)
+
+    built = namespace["DJANGO_ROUTINES"]["incremental"]
+    assert built["help_text"] == "Incremental routine."
+    assert len(built["commands"]) == 302
+
+    expected = [
+        *[str(idx) for idx in range(0, 300, 3)],
+        *[str(idx) for idx in range(1, 300, 3)],
+        "sys",
+        "last",
+        *[str(idx) for idx in range(2, 300, 3)],
+    ]
+    incremental = get_routine("incremental", scope=namespace)
+    assert [cmd.command[-1] for cmd in incremental.commands] == expected
+    assert isinstance(incremental.commands[200], SystemCommand)
+
+    # commands replaced in place are sorted again before the next insertion
+    built["commands"][0] = {"management": ("track", "moved"), "priority": 5}
+    exec('command("incremental", "track", "next", priority=4)', namespace)
+    incremental = get_routine("incremental", scope=namespace)
+    assert [cmd.command[-1] for cmd in incremental.commands][-2:] == ["next", "moved"]
+
+
+def test_many_routines():
+    """
+    Routines are looked up by name in constant time while settings are built.
+    """
+    from unittest import mock
+    import django_routines
+
+    def names(count):
+        symbolized = mock.Mock(wraps=django_routines.to_symbol)
+        namespace = {}
+        with mock.patch.object(django_routines, "to_symbol", symbolized):
+            exec(
+                f"from django_routines import command, routine\n"
+                f"for idx in range({count}):\n"
+                f"    routine(f'routine-{{idx}}', 'help')\n"
+                f"    command(f'other-{{idx}}', 'track', '0')\n"
+                f"    command(f'Routine-{{idx}}', 'track', '1')\n",
+                namespace,
+            )
+        assert len(namespace["DJANGO_ROUTINES"]) == 2 * count
+        assert len(namespace["DJANGO_ROUTINES"]["routine_0"]["commands"]) == 1
+        return symbolized.call_count
+
+    # the number of name normalizations grows linearly with the number of routines
+    assert names(800) < 2.5 * names(400)
+
+
+def test_plan_index():
+    def cmd(name, *switches, priority=0):
+        return ManagementCommand(("track", name), switches=switches, priority=priority)
+
+    rtn = Routine.from_dict(
+        {
+            "name": "planned",
+            "help_text": "Planned routine.",
+            "commands": [
+                cmd("0"),
+                cmd("1", "a"),
+                cmd("2", "a", "b"),
+                cmd("3", "b"),
+                cmd("4"),
+            ],
+        }
+    )
+    assert rtn.switches == ["a", "b"]
+
+    def names(*switches):
+        return [command.command[-1] for command in rtn.plan(set(switches))]
+
+    assert names() == ["0", "4"]
+    assert names("a") == ["0", "1", "2", "4"]
+    assert names("b", "a") == ["0", "1", "2", "3", "4"]
+    assert names("b", "unknown") == ["0", "2", "3", "4"]
+    # plans are memoized by their relevant switches
+    assert rtn.plan({"b"})[1] is rtn.plan({"b", "unknown"})[1]
+    index = rtn._index()
+    assert set(index.plans) == {frozenset(), *map(frozenset, ("a", "ab", "b"))}
+
+    # the index is rebuilt when commands are added or replaced
+    rtn.add(cmd("5", "c", priority=1))
+    assert rtn.switches == ["a", "b", "c"]
+    assert names("c") == ["0", "4", "5"]
+    rtn.commands = rtn.commands[1:]
+    assert names() == ["4"]
+    assert rtn._index() is not index
+
+    # plain command lists may be modified in place, so they are not memoized
+    rtn.commands[0] = cmd("z", "x")
+    assert names("a") == ["2", "4"]
+    assert names("x") == ["z", "4"]
+
+    # routines loaded from settings are memoized until their commands are modified
+    loaded = Routine.from_dict(
+        {"name": "loaded", "help_text": "", "commands": [cmd("a"), cmd("b", "x")]}
+    )
+    assert loaded._index() is loaded._index()
+    loaded.commands[0] = cmd("z", "x")
+    assert loaded.plan(set()) == []
+    assert [command.command[-1] for command in loaded.plan({"x"})] == ["z", "b"]
+
+
 class KeyErrorTest(TestCase):
     """
     https://github.com/bckohan/django-routines/issues/44
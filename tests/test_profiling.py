@@ -0,0 +1,167 @@
+import importlib
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, SystemCommand, profiling
+from tests import track_file
+
+from . import system_cmd
+
+system_cmd = (sys.executable, str(system_cmd.relative_to(Path(os.getcwd()))))
+
+
+def test_profiled(tmp_path):
+    path = tmp_path / "sub" / "profile.prof"
+    with profiling.profiled(path):
+        sorted(range(100))
+    assert "sorted" in str(pstats.Stats(str(path)).stats)
+
+    # statistics are written even if the profiled code fails
+    with pytest.raises(ValueError):
+        with profiling.profiled(tmp_path / "failed.prof", exclusive=False):
+            raise ValueError()
+    assert (tmp_path / "failed.prof").is_file()
+
+    with profiling.profiled(None):
+        pass
+
+
+def test_wrap(tmp_path):
+    path = tmp_path / "cmd.prof"
+    assert profiling.wrap(["python3", "manage.py", "migrate"], path) == [
+        "python3",
+        "-m",
+        "cProfile",
+        "-o",
+        str(path),
+        "manage.py",
+        "migrate",
+    ]
+    assert profiling.wrap(["python", "-m", "pip", "list"], path)[:6] == [
+        "python",
+        "-m",
+        "cProfile",
+        "-o",
+        str(path),
+        "-m",
+    ]
+    # scripts given on the command line and other programs can not be profiled
+    for args in (["python", "-c", "pass"], ["npm", "run", "build"], ["python"]):
+        assert profiling.wrap(args, path) == args
+
+
+def test_summary(tmp_path):
+    assert profiling.summary([tmp_path / "missing.prof"]) is None
+    for name in ("a", "b"):
+        with profiling.profiled(tmp_path / f"{name}.prof"):
+            sorted(range(100))
+    summary = profiling.summary(
+        [tmp_path / "a.prof", tmp_path / "b.prof", tmp_path / "missing.prof"], top=5
+    )
+    assert "cumulative" in summary
+    assert "{built-in method builtins.sorted}" in summary
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "profiled": Routine(
+            "profiled",
+            "Profile the commands of a routine.",
+            commands=[
+                ManagementCommand(("track", "0")),
+                SystemCommand((*system_cmd, "sys 1")),
+                SystemCommand(("echo", "unprofiled")),
+                ManagementCommand(("track", "1")),
+            ],
+        ),
+    }
+)
+class TestProfiling(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        self.profiles = Path(tempfile.mkdtemp())
+        super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.profiles, ignore_errors=True)
+        if track_file.is_file():
+            os.remove(track_file)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def run_routine(self, *args):
+        from django_routines.management.commands.routine import Command
+
+        command = Command()
+        self.out = StringIO()
+        call_command(
+            command,
+            "--no-color",
+            "--manage-script",
+            "./manage.py",
+            "profiled",
+            *args,
+            stdout=self.out,
+        )
+        return command
+
+    def assertProfiled(self, *args):
+        self.run_routine("--profile-dir", str(self.profiles), *args)
+        profiles = sorted(path.name for path in self.profiles.iterdir())
+        self.assertEqual(len(profiles), 3)
+        self.assertTrue(profiles[0].startswith("000-track"))
+        self.assertTrue(profiles[1].startswith("001-"))
+        self.assertTrue(profiles[2].startswith("003-track"))
+        output = self.out.getvalue()
+        self.assertIn(f"Profiles written to {self.profiles}", output)
+        self.assertIn("cumulative", output)
+        stats = pstats.Stats(str(self.profiles / profiles[0]))
+        self.assertTrue(
+            any("track" in filename for filename, _, _ in stats.stats),
+        )
+
+    def test_in_process(self):
+        self.assertProfiled()
+
+    def test_jobs(self):
+        self.assertProfiled("--jobs", "2")
+
+    def test_subprocess(self):
+        self.assertProfiled("--subprocess")
+
+    def test_subprocess_batch(self):
+        # batching is disabled so each command has its own profile
+        self.assertProfiled("--subprocess", "--batch")
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="Fork is not available.")
+    def test_fork(self):
+        self.assertProfiled("--subprocess", "--fork")
+
+    def test_default_directory(self):
+        command = self.run_routine("--profile")
+        directory = Path(command._routine_options["profile_dir"])
+        try:
+            self.assertEqual(len(list(directory.glob("*.prof"))), 3)
+            self.assertIn(f"Profiles written to {directory}", self.out.getvalue())
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def test_not_profiled(self):
+        command = self.run_routine()
+        self.assertIsNone(command._routine_options["profile_dir"])
+        self.assertNotIn("Profiles written", self.out.getvalue())
@@ -0,0 +1,130 @@
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import typing as t
+from collections import deque
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, SystemCommand, retention
+from tests import track_file
+
+finalized: t.List[t.Any] = []
+
+
+def finalize(routine, results):
+    finalized.append((results, list(results)))
+
+
+def test_parse():
+    assert retention.parse("all") == "all"
+    assert retention.parse("spill") == "spill"
+    assert retention.parse("3") == 3
+    assert retention.parse(2) == 2
+    for policy in ("none", "0", -1, None):
+        with pytest.raises(ValueError):
+            retention.parse(policy)
+
+
+def test_spilled():
+    spilled = retention.store("spill")
+    assert isinstance(spilled, retention.Spilled)
+    with spilled:
+        appended = [
+            "0",
+            subprocess.CompletedProcess(["true"], 0),
+            threading.Lock(),
+        ]
+        for result in appended:
+            spilled.append(result)
+        assert len(spilled) == 3
+        loaded = iter(spilled)
+        assert next(loaded) == "0"
+        assert next(loaded).args == ["true"]
+        # results that cannot be pickled are stored as their repr
+        assert next(loaded).startswith("<unlocked _thread.lock")
+        assert list(spilled)[0] == "0"
+    assert spilled._file.closed
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "retained": Routine(
+            "retained",
+            "Retain command results.",
+            commands=[
+                ManagementCommand(("track", "0")),
+                ManagementCommand(("track", "1")),
+                SystemCommand((sys.executable, "-c", "pass")),
+                ManagementCommand(("track", "2")),
+            ],
+            finalize=finalize,
+        ),
+    }
+)
+class TestRetention(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        finalized.clear()
+        if track_file.is_file():
+            os.remove(track_file)
+        super().setUp()
+
+    def tearDown(self):
+        if track_file.is_file():
+            os.remove(track_file)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def run_routine(self, *args):
+        from django_routines.management.commands.routine import Command
+
+        command = Command()
+        call_command(command, "--verbosity", "0", "retained", *args)
+        self.assertEqual(len(finalized), 1)
+        return command, *finalized[0]
+
+    def test_all(self):
+        command, results, values = self.run_routine()
+        self.assertIsInstance(results, list)
+        self.assertEqual(values[:2] + values[3:], ["0", "1", "2"])
+        self.assertEqual(values[2].returncode, 0)
+        self.assertEqual([run.result for run in command.runs], values)
+        self.assertEqual([cmd.result for cmd in command.plan], values)
+
+    def test_codes(self):
+        command, results, values = self.run_routine("--retain", "codes")
+        self.assertEqual(values, [None, None, 0, None])
+        self.assertEqual([run.result for run in command.runs], values)
+        self.assertEqual([cmd.result for cmd in command.plan], [None] * 4)
+
+    def test_last(self):
+        command, results, values = self.run_routine("--retain", "2")
+        self.assertIsInstance(results, deque)
+        self.assertEqual(values[1:], ["2"])
+        self.assertEqual(values[0].returncode, 0)
+        self.assertEqual([run.result for run in command.runs], [None] * 4)
+
+    def test_spill(self):
+        command, results, values = self.run_routine("--retain", "spill")
+        self.assertIsInstance(results, retention.Spilled)
+        self.assertEqual(values[:2] + values[3:], ["0", "1", "2"])
+        self.assertEqual(values[2].returncode, 0)
+        self.assertEqual([run.result for run in command.runs], [None] * 4)
+        # the spill file is closed once the routine has been finalized
+        with self.assertRaises(ValueError):
+            list(results)
+
+    def test_invalid(self):
+        with self.assertRaisesMessage(CommandError, "Result retention must be"):
+            self.run_routine("--retain", "0")
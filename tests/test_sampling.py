@@ -0,0 +1,184 @@
+import importlib
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, SystemCommand, sampling
+from tests import track_file
+
+SPIN = (Path(__file__).parent / "spin.py").relative_to(Path(os.getcwd()))
+
+
+def spin(seconds: float):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+@pytest.mark.parametrize("threaded", [False, True])
+def test_sampler(tmp_path, threaded):
+    with sampling.Sampler(interval=0.005, threaded=threaded) as sampler:
+        with sampler.sampled(tmp_path / "samples.folded"):
+            spin(0.2)
+    counts = sampling.read(tmp_path / "samples.folded")
+    assert sum(counts.values()) > 5
+    # stacks start at the frame that started sampling
+    assert all(stack.startswith("tests.test_sampling:spin") for stack in counts), counts
+
+
+def test_sampler_worker_thread(tmp_path):
+    def work():
+        with sampler.sampled(tmp_path / "worker.folded"):
+            spin(0.2)
+
+    # timers are only used on the main thread
+    assert sampling.Sampler().threaded == (not hasattr(signal, "SIGPROF"))
+    with sampling.Sampler(interval=0.005, threaded=True) as sampler:
+        thread = threading.Thread(target=work)
+        thread.start()
+        # the main thread is not sampled
+        spin(0.1)
+        thread.join()
+    counts = sampling.read(tmp_path / "worker.folded")
+    assert sum(counts.values()) > 5
+    assert all(stack.startswith("tests.test_sampling:spin") for stack in counts)
+
+    outside = []
+    thread = threading.Thread(target=lambda: outside.append(sampling.Sampler()))
+    thread.start()
+    thread.join()
+    assert outside[0].threaded
+
+
+def test_summary(tmp_path):
+    assert sampling.summary([tmp_path / "missing.folded"]) is None
+    (tmp_path / "a.folded").write_text("m:main;m:slow 3\nm:main;m:fast 1\nm:main 1\n")
+    (tmp_path / "b.folded").write_text("m:main;m:slow 5\ninvalid\n")
+    assert sampling.read(tmp_path / "b.folded") == {"m:main;m:slow": 5}
+    assert sampling.summary(
+        [tmp_path / "a.folded", tmp_path / "b.folded"], top=2
+    ).splitlines() == [
+        "10 samples",
+        "  Total     Self  Function",
+        " 100.0%    10.0%  m:main",
+        "  80.0%    80.0%  m:slow",
+    ]
+
+
+def test_main(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text(
+        "import sys\n"
+        "from tests.test_sampling import spin\n"
+        "spin(0.2)\n"
+        "sys.exit(int(sys.argv[1]))\n"
+    )
+    proc = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "django_routines.sampling",
+            "-o",
+            str(tmp_path / "script.folded"),
+            str(script),
+            "3",
+        ],
+        env={**os.environ, "PYTHONPATH": os.getcwd()},
+    )
+    assert proc.returncode == 3
+    counts = sampling.read(tmp_path / "script.folded")
+    assert any(stack.endswith("tests.test_sampling:spin") for stack in counts)
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "sampled": Routine(
+            "sampled",
+            "Sample the commands of a routine.",
+            commands=[
+                ManagementCommand(("sleep", "0.3", "--busy")),
+                SystemCommand((sys.executable, str(SPIN), "0.3")),
+                SystemCommand(("echo", "unsampled")),
+                ManagementCommand(("track", "1")),
+            ],
+        ),
+    }
+)
+class TestSampling(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        self.profiles = Path(tempfile.mkdtemp())
+        super().setUp()
+
+    def tearDown(self):
+        shutil.rmtree(self.profiles, ignore_errors=True)
+        if track_file.is_file():
+            os.remove(track_file)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def run_routine(self, *args):
+        from django_routines.management.commands.routine import Command
+
+        command = Command()
+        self.out = StringIO()
+        call_command(
+            command,
+            "--no-color",
+            "--manage-script",
+            "./manage.py",
+            "sampled",
+            "--sample",
+            "--profile-dir",
+            str(self.profiles),
+            *args,
+            stdout=self.out,
+        )
+        return command
+
+    def assertSampled(self, *args):
+        self.run_routine(*args)
+        profiles = sorted(path.name for path in self.profiles.iterdir())
+        self.assertEqual(len(profiles), 3)
+        self.assertTrue(profiles[0].startswith("000-sleep"))
+        self.assertTrue(profiles[2].startswith("003-track"))
+        self.assertTrue(all(profile.endswith(".folded") for profile in profiles))
+        sleep = sampling.read(self.profiles / profiles[0])
+        self.assertTrue(
+            any("django_routines_tests.management.commands.sleep" in s for s in sleep)
+        )
+        spin = sampling.read(self.profiles / profiles[1])
+        self.assertTrue(any(stack.endswith(":spin") for stack in spin))
+        output = self.out.getvalue()
+        self.assertIn(f"Profiles written to {self.profiles}", output)
+        self.assertIn("samples", output)
+
+    def test_in_process(self):
+        self.assertSampled()
+
+    def test_jobs(self):
+        self.assertSampled("--jobs", "2")
+
+    def test_subprocess(self):
+        self.assertSampled("--subprocess")
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="Fork is not available.")
+    def test_fork(self):
+        self.assertSampled("--subprocess", "--fork")
@@ -7,11 +7,18 @@
 from django.test import TestCase, override_settings
 from django_routines import Routine, ManagementCommand, SystemCommand
 from functools import partial
-from django_routines.signals import routine_started, routine_finished, routine_failed
+from django_routines.signals import (
+    command_finished,
+    command_started,
+    routine_failed,
+    routine_finished,
+    routine_started,
+)
 from django_routines.exceptions import ExitEarly
 from collections import namedtuple
 from pathlib import Path
 import importlib
+from unittest import mock
 from .hooks import pre_hook, post_hook
 from . import system_cmd
 import os
@@ -71,7 +78,15 @@ def routine_started(self, sender, routine, signal, **kwargs):
         self.routine_started_log.append(Started(sender, routine, signal, kwargs))
 
     def routine_finished(
-        self, sender, routine, early_exit, last_command, signal, **kwargs
+        self,
+        sender,
+        routine,
+        early_exit,
+        last_command,
+        unchanged,
+        command_timings,
+        signal,
+        **kwargs,
     ):
         self.routine_finished_log.append(
             Finished(sender, routine, early_exit, last_command, signal, kwargs)
@@ -406,3 +421,95 @@ class TestSignalsSubprocess(TestSignals):
     """
 
     subprocess = True
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "command-signals": Routine(
+            commands=[
+                ManagementCommand(command=("track", "0")),
+                ManagementCommand(
+                    command=("track", "1"), pre_hook=partial(pre_hook, ret=True)
+                ),
+                SystemCommand(command=(*system_cmd, "track 2")),
+                ManagementCommand(command=("track", "3", "--raise")),
+                ManagementCommand(command=("track", "4")),
+            ],
+            help_text="Test command level signals.",
+            name="command-signals",
+            continue_on_error=True,
+        ),
+    }
+)
+class TestCommandSignals(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        self.started = []
+        self.finished = []
+        command_started.connect(self.command_started)
+        command_finished.connect(self.command_finished)
+        super().setUp()
+
+    def tearDown(self):
+        command_started.disconnect(self.command_started)
+        command_finished.disconnect(self.command_finished)
+        track_file = Path(__file__).parent / "track.json"
+        if track_file.is_file():
+            os.remove(track_file)
+        super().tearDown()
+
+    def command_started(self, sender, routine, plan_index, command, **kwargs):
+        self.started.append((routine, plan_index, command))
+
+    def command_finished(self, sender, routine, plan_index, command, **kwargs):
+        self.finished.append((plan_index, command, kwargs))
+
+    def test_command_signals(self):
+        from django_routines.management.commands.routine import Status
+
+        from .django_routines_tests.management.commands.track import TestError
+
+        call_command("routine", "command-signals")
+        self.assertEqual(
+            [(routine, idx) for routine, idx, _ in self.started],
+            [("command_signals", idx) for idx in range(5)],
+        )
+        self.assertEqual([idx for idx, _, _ in self.finished], list(range(5)))
+        self.assertEqual(
+            [command.command_str for _, _, command in self.started],
+            [command.command_str for _, command, _ in self.finished],
+        )
+        self.assertEqual(
+            [kwargs["status"] for _, _, kwargs in self.finished],
+            [
+                Status.SUCCEEDED,
+                Status.SKIPPED,
+                Status.SUCCEEDED,
+                Status.FAILED,
+                Status.SUCCEEDED,
+            ],
+        )
+        track, skipped, system, failed, _ = (kwargs for _, _, kwargs in self.finished)
+        self.assertEqual(track["result"], "0")
+        self.assertIsNone(track["return_code"])
+        self.assertIsNone(track["exception"])
+        self.assertGreater(track["duration"], 0)
+        self.assertIsNone(skipped["result"])
+        self.assertEqual(system["return_code"], 0)
+        self.assertIsInstance(failed["exception"], TestError)
+
+    def test_no_receivers(self):
+        from django_routines.management.commands import routine
+
+        command_started.disconnect(self.command_started)
+        command_finished.disconnect(self.command_finished)
+        with (
+            mock.patch.object(routine.command_started, "send") as started,
+            mock.patch.object(routine.command_finished, "send") as finished,
+        ):
+            call_command("routine", "command-signals")
+        # signals are not prepared if nothing is listening
+        started.assert_not_called()
+        finished.assert_not_called()
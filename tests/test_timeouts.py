@@ -0,0 +1,239 @@
+import importlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import typing as t
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, SystemCommand, timeouts
+from django_routines.exceptions import CommandTimeout
+from django_routines.signals import routine_failed
+from tests import track_file
+
+SLEEP = "import time; time.sleep(30)"
+
+
+def test_interrupt_main_thread():
+    start = time.monotonic()
+    with pytest.raises(timeouts.Expired):
+        with timeouts.interrupt(0.2):
+            time.sleep(30)
+    assert time.monotonic() - start < 5
+    with timeouts.interrupt(None):
+        pass
+    with timeouts.interrupt(5):
+        pass
+
+
+def test_interrupt_worker_thread():
+    raised: t.List[BaseException] = []
+    finished: t.List[bool] = []
+
+    def work(seconds):
+        try:
+            with timeouts.interrupt(0.2):
+                time.sleep(seconds)
+                finished.append(True)
+        except timeouts.Expired as exc:
+            raised.append(exc)
+
+    # worker threads are not interrupted, the block fails after it finishes
+    thread = threading.Thread(target=work, args=(0.4,))
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert finished == [True]
+    assert len(raised) == 1
+
+    thread = threading.Thread(target=work, args=(0,))
+    thread.start()
+    thread.join(5)
+    assert finished == [True, True]
+    assert len(raised) == 1
+
+
+def test_watchdog():
+    with subprocess.Popen([sys.executable, "-c", SLEEP]) as proc:
+        with timeouts.Watchdog(proc, 0.2) as watchdog:
+            proc.wait(10)
+    assert watchdog.expired
+    assert proc.returncode != 0
+
+    with subprocess.Popen([sys.executable, "-c", "pass"]) as proc:
+        with timeouts.Watchdog(proc, 10) as watchdog:
+            proc.wait(10)
+    assert not watchdog.expired
+    assert proc.returncode == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_watchdog_pid():
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - the child
+        time.sleep(30)
+        os._exit(0)
+    with timeouts.Watchdog(pid, 0.2) as watchdog:
+        status = watchdog.wait()
+    assert watchdog.expired
+    assert os.waitstatus_to_exitcode(status) == -signal.SIGTERM
+
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - the child
+        os._exit(3)
+    with timeouts.Watchdog(pid, 10) as watchdog:
+        status = watchdog.wait()
+    assert not watchdog.expired
+    assert os.waitstatus_to_exitcode(status) == 3
+    # a reaped process is never signalled
+    watchdog._signal(signal.SIGTERM)
+
+
+def test_command_timeout():
+    exc = CommandTimeout("sleep 2", 0.5)
+    assert str(exc) == "sleep 2 timed out after 0.5 seconds."
+    assert not exc.budget
+    exc = CommandTimeout("sleep 2", 60, budget=True)
+    assert str(exc) == "sleep 2 exceeded the routine's time budget of 60 seconds."
+    assert isinstance(exc, CommandError)
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "timeout": Routine(
+            "timeout",
+            "Stop commands that run too long.",
+            commands=[
+                ManagementCommand(("track", "0")),
+                ManagementCommand(("sleep", "30"), timeout=0.5, switches=["sleep"]),
+                ManagementCommand(
+                    ("sleep", "30", "--busy"), timeout=0.5, switches=["busy"]
+                ),
+                ManagementCommand(
+                    ("sleep", "1", "--busy"), timeout=0.5, switches=["overrun"]
+                ),
+                SystemCommand(
+                    (sys.executable, "-c", SLEEP), timeout=0.5, switches=["system"]
+                ),
+                ManagementCommand(("sleep", "1"), switches=["budget"]),
+                ManagementCommand(("track", "1")),
+            ],
+        ),
+    }
+)
+class TestTimeouts(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        if track_file.is_file():
+            os.remove(track_file)
+        self.failed = []
+        routine_failed.connect(self.routine_failed)
+        super().setUp()
+
+    def tearDown(self):
+        routine_failed.disconnect(self.routine_failed)
+        if track_file.is_file():
+            os.remove(track_file)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def routine_failed(self, sender, routine, failed_command, exception, **kwargs):
+        self.failed.append((failed_command, exception))
+
+    def run_routine(self, *args):
+        from django_routines.management.commands.routine import Command
+
+        command = Command()
+        start = time.monotonic()
+        try:
+            call_command(
+                command,
+                "--verbosity",
+                "0",
+                "--manage-script",
+                "./manage.py",
+                "timeout",
+                *args,
+            )
+        finally:
+            self.elapsed = time.monotonic() - start
+            self.invoked = (
+                json.loads(track_file.read_text())["invoked"]
+                if track_file.is_file()
+                else []
+            )
+        return command
+
+    def assertTimedOut(self, *args, message="timed out after 0.5 seconds"):
+        with self.assertRaisesMessage(CommandTimeout, message):
+            self.run_routine(*args)
+        self.assertLess(self.elapsed, 15)
+        self.assertEqual(self.invoked, [0])
+        self.assertEqual(len(self.failed), 1)
+        self.assertEqual(self.failed[0][0], 1)
+        self.assertIsInstance(self.failed[0][1], CommandTimeout)
+
+    def test_in_process(self):
+        self.assertTimedOut("--sleep")
+
+    def test_in_process_busy(self):
+        self.assertTimedOut("--busy")
+
+    def test_in_process_job(self):
+        # commands on worker threads fail after they finish if they ran out of time
+        self.assertTimedOut("--overrun", "--jobs", "2")
+
+    def test_subprocess(self):
+        self.assertTimedOut("--system")
+
+    def test_subprocess_management(self):
+        self.assertTimedOut("--sleep", "--subprocess")
+
+    def test_continue(self):
+        from django_routines.management.commands.routine import Status
+
+        command = self.run_routine("--system", "--continue")
+        self.assertEqual(self.invoked, [0, 1])
+        self.assertEqual(
+            [run.status for run in command.runs],
+            [Status.SUCCEEDED, Status.FAILED, Status.SUCCEEDED],
+        )
+
+    def test_time_budget(self):
+        # running out of time stops the routine even if it continues on errors
+        with self.assertRaisesMessage(
+            CommandTimeout, "exceeded the routine's time budget of 0.5 seconds"
+        ):
+            self.run_routine("--budget", "--continue", "--time-budget", "0.5")
+        self.assertEqual(self.invoked, [0])
+        self.assertEqual(len(self.failed), 1)
+        self.assertTrue(self.failed[0][1].budget)
+
+    def test_time_budget_spent(self):
+        from django_routines.management.commands.routine import Status
+
+        # a receiver that continues the routine fails the commands that have not
+        # started
+        routine_failed.connect(lambda **_: True, weak=False, dispatch_uid="continue")
+        try:
+            command = self.run_routine("--budget", "--time-budget", "0.5")
+        finally:
+            routine_failed.disconnect(dispatch_uid="continue")
+        self.assertEqual(self.invoked, [0])
+        self.assertEqual(
+            [run.status for run in command.runs],
+            [Status.SUCCEEDED, Status.FAILED, Status.FAILED],
+        )
+        self.assertEqual([idx for idx, _ in self.failed], [1, 2])
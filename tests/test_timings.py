@@ -0,0 +1,149 @@
+import importlib
+import os
+import sys
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from django_routines import ManagementCommand, Routine, SystemCommand, timings
+from django_routines.signals import routine_finished
+from tests import track_file
+
+SPIN = "import time; all(iter(lambda: time.process_time() < 0.2, False))"
+
+
+def slow_hook(routine, command, previous, options):
+    time.sleep(0.2)
+
+
+def test_timer():
+    timing = timings.Timing()
+    with timings.Timer(timing) as timed:
+        end = time.thread_time() + 0.05
+        while time.thread_time() < end:
+            pass
+    assert timed is timing
+    assert timing.wall >= 0.05
+    assert timing.cpu >= 0.05
+    assert timing.hooks == 0
+
+    # the timer accumulates
+    wall = timing.wall
+    with timings.Timer(timing):
+        time.sleep(0.05)
+    assert timing.wall >= wall + 0.05
+    assert timing.cpu < timing.wall
+
+
+def test_table():
+    lines = timings.table(
+        [
+            (0, "fast", "succeeded", timings.Timing(wall=0.5, cpu=0.25)),
+            (1, "slow", "failed", timings.Timing(wall=12.25, cpu=1, hooks=2)),
+            (2, "medium", "succeeded", timings.Timing(wall=1)),
+        ]
+    )
+    assert lines == [
+        "   #       Wall        CPU      Hooks  Status      Command",
+        "   1    12.250s     1.000s     2.000s  failed      slow",
+        "   2     1.000s     0.000s     0.000s  succeeded   medium",
+        "   0     0.500s     0.250s     0.000s  succeeded   fast",
+    ]
+    assert timings.table([], limit=1) == [lines[0]]
+
+
+@override_settings(
+    DJANGO_ROUTINES={
+        "timed": Routine(
+            "timed",
+            "Time the commands of a routine.",
+            commands=[
+                ManagementCommand(("track", "0")),
+                ManagementCommand(
+                    ("track", "1"), pre_hook="tests.test_timings.slow_hook"
+                ),
+                SystemCommand((sys.executable, "-c", SPIN)),
+                ManagementCommand(("track", "2"), switches=["skipped"]),
+            ],
+        ),
+    }
+)
+class TestTimings(TestCase):
+    def setUp(self):
+        from django_routines.management.commands import routine
+
+        importlib.reload(routine)
+        self.finished = []
+        routine_finished.connect(self.routine_finished)
+        super().setUp()
+
+    def tearDown(self):
+        routine_finished.disconnect(self.routine_finished)
+        if track_file.is_file():
+            os.remove(track_file)
+        # the routine command will be reimported with the default settings
+        from django_routines.management import commands
+
+        sys.modules.pop(f"{commands.__name__}.routine", None)
+        commands.__dict__.pop("routine", None)
+        super().tearDown()
+
+    def routine_finished(self, sender, routine, command_timings, **kwargs):
+        self.finished.append(command_timings)
+
+    def run_routine(self, *args, verbosity=1):
+        from django_routines.management.commands.routine import Command
+
+        command = Command()
+        self.out = StringIO()
+        call_command(
+            command,
+            "--no-color",
+            "--verbosity",
+            str(verbosity),
+            "timed",
+            *args,
+            stdout=self.out,
+        )
+        return command
+
+    def test_timings(self):
+        command = self.run_routine()
+        self.assertNotIn("Wall", self.out.getvalue())
+        self.assertEqual(len(self.finished), 1)
+        self.assertEqual(self.finished[0], [run.timing for run in command.runs])
+
+        track, hooked, system = (run.timing for run in command.runs)
+        self.assertEqual(track.hooks, 0)
+        self.assertGreaterEqual(hooked.hooks, 0.2)
+        self.assertGreaterEqual(hooked.wall, hooked.hooks)
+        # the CPU time of subprocesses is included when one job runs at a time
+        self.assertGreaterEqual(system.cpu, 0.2)
+        self.assertGreaterEqual(system.wall, system.cpu)
+
+    def test_timings_jobs(self):
+        command = self.run_routine("--jobs", "2")
+        self.assertGreaterEqual(command.runs[1].timing.hooks, 0.2)
+        self.assertGreater(command.runs[2].timing.wall, 0.2)
+
+    def test_report(self):
+        command = self.run_routine("--timings")
+        lines = self.out.getvalue().splitlines()
+        header = lines.index(
+            "   #       Wall        CPU      Hooks  Status      Command"
+        )
+        table = lines[header + 1 :]
+        self.assertEqual(len(table), 3)
+        self.assertEqual(
+            [int(line.split()[0]) for line in table],
+            sorted(
+                range(3), key=lambda idx: command.runs[idx].timing.wall, reverse=True
+            ),
+        )
+        self.assertTrue(table[-1].endswith("succeeded   track 0"))
+
+        # nothing is reported at verbosity 0
+        self.run_routine("--timings", verbosity=0)
+        self.assertNotIn("Wall", self.out.getvalue())